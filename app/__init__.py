@@ -0,0 +1,4 @@
+import time
+
+# Точка отсчета для замера времени импортов при старте (см. app.main.startup)
+IMPORT_STARTED = time.perf_counter()
@@ -1,26 +1,77 @@
+import hashlib
+import hmac
+import logging
 import os
 import secrets
 from datetime import datetime, timedelta
 from typing import Optional
+from uuid import uuid4
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
-from app.crud import crud_users
+from app.crud import crud_tokens, crud_users
 from app.database import get_db
+from app.revocation import revocation_list
+from app.token_cache import token_cache, token_versions
 
 # Настройки токена
 SECRET_KEY = os.environ.get("SECRET_KEY", secrets.token_hex(32))
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+
+_logger = logging.getLogger("auth")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/token")
 
 
+class Principal:
+    """Текущий пользователь из claims токена; ORM-объект грузится по требованию"""
+
+    __slots__ = ("id", "username", "token_version", "jti", "exp", "_db", "_user")
+
+    def __init__(
+        self,
+        id: int,
+        username: str,
+        token_version: int,
+        jti: Optional[str] = None,
+        exp: Optional[float] = None,
+        db=None,
+    ):
+        self.id = id
+        self.username = username
+        self.token_version = token_version
+        self.jti = jti
+        self.exp = exp
+        self._db = db
+        self._user = None
+
+    def bind(self, db: Session) -> "Principal":
+        # Закэшированный principal не держит сессию чужого запроса
+        return Principal(
+            self.id, self.username, self.token_version, self.jti, self.exp, db
+        )
+
+    @property
+    def user(self):
+        if self._user is None:
+            self._user = crud_users.get_user(self._db, self.id)
+        return self._user
+
+
+def token_claims(user) -> dict:
+    """Claims access-токена для пользователя"""
+    return {"sub": user.username, "uid": user.id, "ver": user.token_version or 0}
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Создает JWT-токен с заданными данными и сроком действия"""
+    # python-jose тянет cryptography: импортируем при первом токене, не при старте
+    from jose import jwt
+
     to_encode = data.copy()
 
     if expires_delta:
@@ -28,15 +79,65 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    to_encode.update({"exp": expire})
+    # jti — идентификатор токена для денайлиста (logout/revoke)
+    to_encode.update({"exp": expire, "jti": uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def hash_refresh_token(token: str) -> str:
+    # Токен высокоэнтропийный: HMAC достаточно, Argon2 здесь не нужен
+    return hmac.new(SECRET_KEY.encode(), token.encode(), hashlib.sha256).hexdigest()
+
+
+def issue_refresh_token(db: Session, user_id: int, family_id: Optional[str] = None):
+    """Выдает новый refresh-токен; в БД сохраняется только его HMAC"""
+    token = secrets.token_urlsafe(32)
+    crud_tokens.create_refresh_token(
+        db,
+        user_id=user_id,
+        token_hash=hash_refresh_token(token),
+        family_id=family_id or uuid4().hex,
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    return token
+
+
+def rotate_refresh_token(db: Session, token: str):
+    """Меняет refresh-токен на новую пару (access, refresh) или возвращает None"""
+    db_token = crud_tokens.get_refresh_token(db, hash_refresh_token(token))
+    if db_token is None or db_token.revoked:
+        return None
+    if db_token.expires_at <= datetime.utcnow():
+        return None
+    if not crud_tokens.mark_used(db, db_token):
+        # Повторное использование уже обмененного токена — вероятна кража,
+        # отзываем всю цепочку ротации
+        _logger.warning("Refresh token reuse detected: user_id=%s", db_token.user_id)
+        crud_tokens.revoke_family(db, db_token.family_id)
+        return None
+
+    user = crud_users.get_user(db, db_token.user_id)
+    if not user or not user.is_active:
+        return None
+    access_token = create_access_token(data=token_claims(user))
+    refresh_token = issue_refresh_token(db, user.id, family_id=db_token.family_id)
+    return access_token, refresh_token
+
+
+def revoke_refresh_family(db: Session, token: str, user_id: int):
+    """Отзывает цепочку refresh-токена, если он принадлежит пользователю"""
+    db_token = crud_tokens.get_refresh_token(db, hash_refresh_token(token))
+    if db_token is not None and db_token.user_id == user_id:
+        crud_tokens.revoke_family(db, db_token.family_id)
+
+
 def get_current_user(
     token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
 ):
-    """Проверяет JWT-токен и возвращает пользователя"""
+    """Проверяет JWT-токен и возвращает Principal текущего пользователя"""
+    from jose import JWTError, jwt
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail={
@@ -48,18 +149,67 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        # Декодируем токен
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    # Повторный запрос с тем же токеном: без jwt.decode
+    principal = token_cache.get(token)
+    if principal is None:
+        try:
+            # Декодируем токен
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            username: str = payload.get("sub")
+            if username is None:
+                raise credentials_exception
+        except JWTError:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
 
-    # Получаем пользователя
-    user = crud_users.get_user_by_username(db, username=username)
-    if not user:
+        user_id = payload.get("uid")
+        if user_id is None:
+            # Токены старого формата (только sub): одна загрузка пользователя
+            user = crud_users.get_user_by_username(db, username=username)
+            if not user or not user.is_active:
+                raise credentials_exception
+            principal = Principal(
+                user.id,
+                user.username,
+                user.token_version or 0,
+                payload.get("jti"),
+                payload.get("exp"),
+            )
+            token_versions.put(user.id, principal.token_version, True)
+        else:
+            principal = Principal(
+                user_id,
+                username,
+                payload.get("ver", 0),
+                payload.get("jti"),
+                payload.get("exp"),
+            )
+        token_cache.put(token, principal, payload.get("exp"))
+
+    _check_token_version(db, principal, credentials_exception)
+    # Отозванные jti: обычно отвечает Bloom-фильтр, в БД — только при попадании
+    if principal.jti and revocation_list.is_revoked(db, principal.jti):
         raise credentials_exception
+    return principal.bind(db)
 
-    return user
+
+def decode_access_token(token: str) -> Optional[dict]:
+    from jose import JWTError, jwt
+
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+
+def _check_token_version(db: Session, principal: Principal, credentials_exception):
+    # Отзыв токенов: сверяем версию (два столбца, а не вся строка users)
+    state = token_versions.get(principal.id)
+    if state is None:
+        row = crud_users.get_token_state(db, principal.id)
+        if row is None:
+            raise credentials_exception
+        state = (row.token_version or 0, bool(row.is_active))
+        token_versions.put(principal.id, *state)
+    version, is_active = state
+    if not is_active or version != principal.token_version:
+        raise credentials_exception
@@ -0,0 +1,151 @@
+import os
+import time
+from collections import deque
+from typing import Dict
+
+# Circuit breaker для внешних хостов
+BREAKER_WINDOW_SECONDS = float(os.getenv("HTTP_CLIENT_BREAKER_WINDOW", "30"))
+BREAKER_MIN_CALLS = int(os.getenv("HTTP_CLIENT_BREAKER_MIN_CALLS", "5"))
+BREAKER_FAILURE_RATE = float(os.getenv("HTTP_CLIENT_BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("HTTP_CLIENT_BREAKER_OPEN_SECONDS", "5"))
+BREAKER_MAX_OPEN_SECONDS = float(
+    os.getenv("HTTP_CLIENT_BREAKER_MAX_OPEN_SECONDS", "60")
+)
+_MAX_TRACKED_HOSTS = 1024
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Хост признан недоступным: запрос отклонен без обращения к сети"""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"circuit open for {host}, retry in {retry_after:.1f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self):
+        self.state = CLOSED
+        self._outcomes: deque = deque()  # (ts, ok) за окно
+        self.opened_at = 0.0
+        self.open_seconds = BREAKER_OPEN_SECONDS
+        self._probe_in_flight = False
+        self.rejected = 0
+
+    def _trim(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > BREAKER_WINDOW_SECONDS:
+            self._outcomes.popleft()
+
+    def failures(self) -> int:
+        return sum(1 for _, ok in self._outcomes if not ok)
+
+    def retry_after(self, now: float) -> float:
+        return max(0.0, self.opened_at + self.open_seconds - now)
+
+    def allow(self, now: float):
+        """None — отказ; иначе признак того, что вызов является пробой"""
+        if self.state == OPEN:
+            if now - self.opened_at < self.open_seconds:
+                self.rejected += 1
+                return None
+            # Остывание прошло — пропускаем одну пробу
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                return None
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record(self, ok: bool, now: float, probe: bool = False):
+        if probe:
+            self._probe_in_flight = False
+            if ok:
+                self.state = CLOSED
+                self.open_seconds = BREAKER_OPEN_SECONDS
+                self._outcomes.clear()
+            else:
+                # Проба не удалась: снова открываем, с удвоенным остыванием
+                self.state = OPEN
+                self.opened_at = now
+                self.open_seconds = min(BREAKER_MAX_OPEN_SECONDS, self.open_seconds * 2)
+            return
+        if self.state != CLOSED:
+            # Результат запроса, начатого до открытия, уже ничего не меняет
+            return
+
+        self._outcomes.append((now, ok))
+        self._trim(now)
+        total = len(self._outcomes)
+        if (
+            total >= BREAKER_MIN_CALLS
+            and self.failures() / total >= BREAKER_FAILURE_RATE
+        ):
+            self.state = OPEN
+            self.opened_at = now
+
+    def release_probe(self):
+        # Проба оборвалась без результата (например, отмена запроса)
+        self._probe_in_flight = False
+
+
+class CircuitBreakers:
+    """Набор breaker'ов по хостам"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def _now(self) -> float:
+        return time.monotonic()
+
+    def get(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            if len(self._breakers) >= _MAX_TRACKED_HOSTS:
+                self._evict_idle()
+            breaker = self._breakers[host] = CircuitBreaker()
+        return breaker
+
+    def _evict_idle(self):
+        now = self._now()
+        for host, breaker in list(self._breakers.items()):
+            breaker._trim(now)
+            if breaker.state == CLOSED and not breaker._outcomes:
+                del self._breakers[host]
+
+    def before_call(self, host: str) -> bool:
+        """Пропускает вызов или бросает CircuitOpenError; True — вызов-проба"""
+        breaker = self.get(host)
+        now = self._now()
+        probe = breaker.allow(now)
+        if probe is None:
+            raise CircuitOpenError(host, breaker.retry_after(now))
+        return probe
+
+    def record(self, host: str, ok: bool, probe: bool = False):
+        self.get(host).record(ok, self._now(), probe)
+
+    def release_probe(self, host: str):
+        self.get(host).release_probe()
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Состояние по хостам для мониторинга"""
+        now = self._now()
+        result = {}
+        for host, breaker in self._breakers.items():
+            breaker._trim(now)
+            result[host] = {
+                "state": breaker.state,
+                "calls": len(breaker._outcomes),
+                "failures": breaker.failures(),
+                "rejected": breaker.rejected,
+                "retry_after": (
+                    round(breaker.retry_after(now), 2) if breaker.state == OPEN else 0.0
+                ),
+            }
+        return result
@@ -1,26 +1,139 @@
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
-from sqlalchemy.sql import case, func
+from sqlalchemy.sql import case, func, true
 
-from app import models, schemas
+from app import models, schemas, webhooks
 from app.domain import VoteType
 
+# Горячие запросы собираются один раз при импорте, значения передаются через
+# bindparam: без сборки цепочки на каждый вызов, ключ кэша компиляции SQLAlchemy
+# у каждого запроса один
+_UP_VOTES = func.count(case((models.Vote.value == VoteType.UP, 1)))
+_DOWN_VOTES = func.count(case((models.Vote.value == VoteType.DOWN, 1)))
+_ABSTAIN_VOTES = func.count(case((models.Vote.value == VoteType.ABSTAIN, 1)))
+_SCORE = _UP_VOTES - _DOWN_VOTES
+_VOTE_COUNTS = (
+    _UP_VOTES.label("up_votes"),
+    _DOWN_VOTES.label("down_votes"),
+    _ABSTAIN_VOTES.label("abstain_votes"),
+)
+_IDEA_COLUMNS = (
+    models.Idea.id,
+    models.Idea.title,
+    models.Idea.description,
+    models.Idea.owner_id,
+)
+
+_GET_IDEA = select(models.Idea).where(models.Idea.id == bindparam("idea_id"))
+_GET_IDEA_VERSION = select(models.Idea.version).where(
+    models.Idea.id == bindparam("idea_id")
+)
+
+_IDEAS_WITH_SCORES = (
+    select(*_IDEA_COLUMNS, *_VOTE_COUNTS)
+    .outerjoin(models.Vote, models.Idea.id == models.Vote.idea_id)
+    .group_by(models.Idea.id)
+    .order_by(_SCORE.desc())
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+
+# Одна идея: голоса — по индексу votes(idea_id, value)
+_IDEA_COUNTS = (
+    select(*_VOTE_COUNTS).where(models.Vote.idea_id == bindparam("idea_id")).subquery()
+)
+_IDEA_WITH_SCORES = (
+    select(*_IDEA_COLUMNS, models.Idea.version, *_IDEA_COUNTS.c)
+    .join(_IDEA_COUNTS, true())
+    .where(models.Idea.id == bindparam("idea_id"))
+)
+# Место: 1 + число идей с большим счетом (идеи без голосов — со счетом 0)
+_SCORES_BY_IDEA = (
+    select(models.Vote.idea_id, _SCORE.label("score"))
+    .group_by(models.Vote.idea_id)
+    .subquery()
+)
+_IDEA_RANK = (
+    select(func.count(models.Idea.id))
+    .outerjoin(_SCORES_BY_IDEA, _SCORES_BY_IDEA.c.idea_id == models.Idea.id)
+    .where(
+        func.coalesce(_SCORES_BY_IDEA.c.score, 0)
+        > _IDEA_COUNTS.c.up_votes - _IDEA_COUNTS.c.down_votes
+    )
+    .correlate(_IDEA_COUNTS)
+    .scalar_subquery()
+)
+_IDEA_WITH_RANK = _IDEA_WITH_SCORES.add_columns((_IDEA_RANK + 1).label("rank"))
+
 
 def get_idea(db: Session, idea_id: int):
-    return db.query(models.Idea).filter(models.Idea.id == idea_id).first()
+    return db.scalars(_GET_IDEA, {"idea_id": idea_id}).first()
+
+
+def get_idea_version(db: Session, idea_id: int):
+    return db.scalar(_GET_IDEA_VERSION, {"idea_id": idea_id})
+
+
+def get_idea_with_scores(db: Session, idea_id: int, with_rank: bool = False):
+    """
+    Идея с голосами одной строкой. rank — место по счету (при равном счете
+    место общее); для него агрегируются голоса всех идей, поэтому он по запросу.
+    """
+    stmt = _IDEA_WITH_RANK if with_rank else _IDEA_WITH_SCORES
+    row = db.execute(stmt, {"idea_id": idea_id}).first()
+    if row is None:
+        return None
+    result = dict(row._mapping)
+    result["score"] = row.up_votes - row.down_votes
+    return result
 
 
 def get_ideas(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Idea).offset(skip).limit(limit).all()
 
 
+def get_user_ideas(db: Session, owner_id: int, before_id=None, limit: int = 50):
+    """Идеи пользователя от новых к старым; before_id — курсор (keyset)"""
+    query = db.query(models.Idea).filter(models.Idea.owner_id == owner_id)
+    if before_id is not None:
+        query = query.filter(models.Idea.id < before_id)
+    return query.order_by(models.Idea.id.desc()).limit(limit).all()
+
+
+def get_user_votes(db: Session, user_id: int, before_id=None, limit: int = 50):
+    """Голоса пользователя с названием идеи одним запросом (без ORM-объектов)"""
+    query = (
+        db.query(
+            models.Vote.id,
+            models.Vote.value,
+            models.Vote.idea_id,
+            models.Idea.title.label("idea_title"),
+        )
+        .join(models.Idea, models.Idea.id == models.Vote.idea_id)
+        .filter(models.Vote.user_id == user_id)
+    )
+    if before_id is not None:
+        query = query.filter(models.Vote.id < before_id)
+    return query.order_by(models.Vote.id.desc()).limit(limit).all()
+
+
 def create_idea(db: Session, idea: schemas.IdeaCreate, owner_id: int):
     db_idea = models.Idea(**idea.dict(), owner_id=owner_id)
     db.add(db_idea)
     db.commit()
     db.refresh(db_idea)
+    _publish_idea("idea.created", db_idea)
     return db_idea
 
 
+def _publish_idea(event_type: str, db_idea):
+    webhooks.publish(
+        event_type,
+        {"idea_id": db_idea.id, "owner_id": db_idea.owner_id, "title": db_idea.title},
+        key=(event_type, db_idea.id),
+    )
+
+
 def update_idea(
     db: Session, idea_id: int, idea: schemas.IdeaCreate, current_user_id: int
 ):
@@ -30,9 +143,11 @@ def update_idea(
 
     for key, value in idea.dict().items():
         setattr(db_idea, key, value)
+    db_idea.version = models.Idea.version + 1
 
     db.commit()
     db.refresh(db_idea)
+    _publish_idea("idea.updated", db_idea)
     return db_idea
 
 
@@ -41,8 +156,10 @@ def delete_idea(db: Session, idea_id: int, current_user_id: int):
     if not db_idea or db_idea.owner_id != current_user_id:
         return False
 
+    event = {"idea_id": db_idea.id, "owner_id": db_idea.owner_id}
     db.delete(db_idea)
     db.commit()
+    webhooks.publish("idea.deleted", event, key=("idea.deleted", idea_id))
     return True
 
 
@@ -58,6 +175,7 @@ def vote_idea(db: Session, idea_id: int, user_id: int, vote_value: VoteType):
         # Обновляем существующий голос
         existing_vote.value = vote_value
         db.commit()
+        _publish_vote(idea_id, user_id, vote_value)
         return existing_vote
 
     # Создаем новый голос
@@ -65,42 +183,24 @@ def vote_idea(db: Session, idea_id: int, user_id: int, vote_value: VoteType):
     db.add(db_vote)
     db.commit()
     db.refresh(db_vote)
+    _publish_vote(idea_id, user_id, vote_value)
     return db_vote
 
 
-def get_ideas_with_scores(db: Session, skip: int = 0, limit: int = 100):
-    # Запрос, который подсчитывает голоса для каждой идеи
-    ideas_with_scores = (
-        db.query(
-            models.Idea,
-            func.count(case((models.Vote.value == VoteType.UP, 1))).label("up_votes"),
-            func.count(case((models.Vote.value == VoteType.DOWN, 1))).label(
-                "down_votes"
-            ),
-            func.count(case((models.Vote.value == VoteType.ABSTAIN, 1))).label(
-                "abstain_votes"
-            ),
-        )
-        .outerjoin(models.Vote, models.Idea.id == models.Vote.idea_id)
-        .group_by(models.Idea.id)
-        .order_by(
-            (
-                func.count(case((models.Vote.value == VoteType.UP, 1)))
-                - func.count(case((models.Vote.value == VoteType.DOWN, 1)))
-            ).desc()
-        )
-        .offset(skip)
-        .limit(limit)
-        .all()
+def _publish_vote(idea_id: int, user_id: int, vote_value: VoteType):
+    # Подписаться на "*" может любой: кто голосовал, в событие не попадает.
+    # Повторные голоса пользователя за идею в одном батче схлопываются в последний
+    webhooks.publish(
+        "idea.voted",
+        {"idea_id": idea_id, "value": vote_value.value},
+        key=("idea.voted", idea_id, user_id),
     )
 
-    result = []
-    for idea, up_votes, down_votes, abstain_votes in ideas_with_scores:
-        idea_dict = schemas.Idea.model_validate(idea, from_attributes=True).model_dump()
-        idea_dict["score"] = up_votes - down_votes  # Простой подсчёт: за минус против
-        idea_dict["up_votes"] = up_votes
-        idea_dict["down_votes"] = down_votes
-        idea_dict["abstain_votes"] = abstain_votes
-        result.append(schemas.IdeaWithScore(**idea_dict))
 
-    return result
+def get_ideas_with_scores(db: Session, skip: int = 0, limit: int = 100):
+    # Голоса по каждой идее одним запросом, по убыванию счета (за минус против)
+    rows = db.execute(_IDEAS_WITH_SCORES, {"skip": skip, "limit": limit})
+    return [
+        schemas.IdeaWithScore(**row._mapping, score=row.up_votes - row.down_votes)
+        for row in rows
+    ]
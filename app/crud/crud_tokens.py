@@ -0,0 +1,111 @@
+from datetime import datetime
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+
+
+def create_refresh_token(
+    db: Session, user_id: int, token_hash: str, family_id: str, expires_at: datetime
+):
+    db_token = models.RefreshToken(
+        user_id=user_id,
+        token_hash=token_hash,
+        family_id=family_id,
+        expires_at=expires_at,
+    )
+    db.add(db_token)
+    db.commit()
+    return db_token
+
+
+def get_refresh_token(db: Session, token_hash: str):
+    return (
+        db.query(models.RefreshToken)
+        .filter(models.RefreshToken.token_hash == token_hash)
+        .first()
+    )
+
+
+def mark_used(db: Session, db_token: models.RefreshToken) -> bool:
+    """Атомарно помечает токен использованным; False — если его уже использовали"""
+    updated = (
+        db.query(models.RefreshToken)
+        .filter(
+            models.RefreshToken.id == db_token.id,
+            models.RefreshToken.used.is_(False),
+        )
+        .update({models.RefreshToken.used: True}, synchronize_session=False)
+    )
+    db.commit()
+    return updated == 1
+
+
+def revoke_family(db: Session, family_id: str):
+    db.query(models.RefreshToken).filter(
+        models.RefreshToken.family_id == family_id
+    ).update({models.RefreshToken.revoked: True}, synchronize_session=False)
+    db.commit()
+
+
+def revoke_user_refresh_tokens(db: Session, user_id: int):
+    # Только действующие: уже отозванные и истекшие переписывать незачем
+    db.query(models.RefreshToken).filter(
+        models.RefreshToken.user_id == user_id,
+        models.RefreshToken.revoked.is_(False),
+        models.RefreshToken.expires_at > datetime.utcnow(),
+    ).update({models.RefreshToken.revoked: True}, synchronize_session=False)
+    db.commit()
+
+
+def prune_refresh_tokens(db: Session, now: datetime):
+    """Удаляет истекшие и отозванные refresh-токены и использованные из цепочек,
+    в которых не осталось действующего токена: повтор таких уже не отличить от
+    неизвестного токена"""
+    token = models.RefreshToken
+    live_families = db.query(token.family_id).filter(
+        token.used.is_(False), token.revoked.is_(False), token.expires_at > now
+    )
+    db.query(token).filter(
+        or_(
+            token.expires_at <= now,
+            token.revoked.is_(True),
+            token.used.is_(True) & token.family_id.not_in(live_families),
+        )
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def revoke_jti(db: Session, jti: str, user_id: int, expires_at: datetime):
+    db.add(models.RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Уже отозван
+        db.rollback()
+
+
+def is_jti_revoked(db: Session, jti: str) -> bool:
+    return (
+        db.query(models.RevokedToken.id).filter(models.RevokedToken.jti == jti).first()
+        is not None
+    )
+
+
+def get_revoked_since(db: Session, last_id: int, now: datetime):
+    """(id, jti) неистекших отозванных токенов, добавленных после last_id"""
+    return (
+        db.query(models.RevokedToken.id, models.RevokedToken.jti)
+        .filter(models.RevokedToken.id > last_id, models.RevokedToken.expires_at > now)
+        .order_by(models.RevokedToken.id)
+        .all()
+    )
+
+
+def prune_revoked(db: Session, now: datetime):
+    db.query(models.RevokedToken).filter(models.RevokedToken.expires_at <= now).delete(
+        synchronize_session=False
+    )
+    db.commit()
@@ -1,31 +1,71 @@
-from passlib.context import CryptContext
+import os
+
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 
 from app import models, schemas
+from app.crud import crud_tokens
+from app.token_cache import invalidate_user
+
+# Запросы пути аутентификации собраны один раз (см. crud_ideas)
+_GET_USER = select(models.User).where(models.User.id == bindparam("user_id"))
+_GET_USER_BY_USERNAME = select(models.User).where(
+    models.User.username == bindparam("username")
+)
+_GET_TOKEN_STATE = select(models.User.token_version, models.User.is_active).where(
+    models.User.id == bindparam("user_id")
+)
 
 
 def get_user(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    return db.scalars(_GET_USER, {"user_id": user_id}).first()
 
 
 def get_user_by_username(db: Session, username: str):
-    return db.query(models.User).filter(models.User.username == username).first()
+    return db.scalars(_GET_USER_BY_USERNAME, {"username": username}).first()
 
 
-pwd_context = CryptContext(
-    schemes=["argon2"],
-    deprecated="auto",
-    # Argon2: t=3, m=256MB, p=1
-    argon2__type="ID",
-    argon2__time_cost=3,
-    argon2__memory_cost=262144,
-    argon2__parallelism=1,
-)
+def get_token_state(db: Session, user_id: int):
+    """(token_version, is_active) без загрузки всей строки users"""
+    return db.execute(_GET_TOKEN_STATE, {"user_id": user_id}).first()
+
+
+# Параметры Argon2 (подбираются через scripts/calibrate_argon2.py)
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "262144"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "1"))
+
+
+def build_pwd_context(time_cost: int, memory_cost: int, parallelism: int):
+    # passlib/argon2 импортируются при первом хэшировании, а не при старте воркера
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__type="ID",
+        argon2__time_cost=time_cost,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=parallelism,
+    )
+
+
+_pwd_context = None
+
+
+def get_pwd_context():
+    # По умолчанию Argon2: t=3, m=256MB, p=1
+    global _pwd_context
+    if _pwd_context is None:
+        _pwd_context = build_pwd_context(
+            ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM
+        )
+    return _pwd_context
 
 
 def create_user(db: Session, user: schemas.UserCreate):
     password = user.password or ""
-    hashed_password = pwd_context.hash(password)
+    hashed_password = get_pwd_context().hash(password)
     db_user = models.User(
         username=user.username, email=user.email, hashed_password=hashed_password
     )
@@ -35,8 +75,34 @@ def create_user(db: Session, user: schemas.UserCreate):
     return db_user
 
 
+def revoke_tokens(db: Session, user: models.User):
+    """Отзывает все выданные пользователю токены"""
+    user.token_version = (user.token_version or 0) + 1
+    # Коммит вместе с отзывом refresh-токенов
+    crud_tokens.revoke_user_refresh_tokens(db, user.id)
+    # Локальные кэши сбрасываем сразу; в других воркерах — по TTL версии
+    invalidate_user(user.id)
+    return user
+
+
+def deactivate_user(db: Session, user: models.User):
+    user.is_active = False
+    return revoke_tokens(db, user)
+
+
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def verify_and_rehash(db: Session, user: models.User, plain_password: str) -> bool:
+    """Проверяет пароль и перехэширует его, если параметры Argon2 изменились"""
+    if not verify_password(plain_password, user.hashed_password):
+        return False
+    pwd_context = get_pwd_context()
+    if pwd_context.needs_update(user.hashed_password):
+        user.hashed_password = pwd_context.hash(plain_password)
+        db.commit()
+    return True
 
 
 def authenticate_user(db: Session, user_id: int, password: str):
@@ -0,0 +1,62 @@
+import secrets
+
+from sqlalchemy.orm import Session
+
+from app import models
+
+
+def create_subscription(db: Session, owner_id: int, url: str, events):
+    db_sub = models.WebhookSubscription(
+        owner_id=owner_id,
+        url=url,
+        secret=secrets.token_urlsafe(32),
+        events=",".join(sorted(set(events))) or "*",
+    )
+    db.add(db_sub)
+    db.commit()
+    db.refresh(db_sub)
+    return db_sub
+
+
+def get_user_subscriptions(db: Session, owner_id: int):
+    return (
+        db.query(models.WebhookSubscription)
+        .filter(models.WebhookSubscription.owner_id == owner_id)
+        .order_by(models.WebhookSubscription.id)
+        .all()
+    )
+
+
+def count_user_subscriptions(db: Session, owner_id: int) -> int:
+    return (
+        db.query(models.WebhookSubscription)
+        .filter(models.WebhookSubscription.owner_id == owner_id)
+        .count()
+    )
+
+
+def delete_subscription(db: Session, sub_id: int, owner_id: int) -> bool:
+    deleted = (
+        db.query(models.WebhookSubscription)
+        .filter(
+            models.WebhookSubscription.id == sub_id,
+            models.WebhookSubscription.owner_id == owner_id,
+        )
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted > 0
+
+
+def get_active_subscriptions(db: Session):
+    """(id, url, secret, events) активных подписок — для диспетчера доставки"""
+    return (
+        db.query(
+            models.WebhookSubscription.id,
+            models.WebhookSubscription.url,
+            models.WebhookSubscription.secret,
+            models.WebhookSubscription.events,
+        )
+        .filter(models.WebhookSubscription.is_active.is_(True))
+        .all()
+    )
@@ -1,8 +1,18 @@
+import hashlib
+import hmac
+import itertools
+import logging
+import math
 import os
+import re
+import time
+from typing import Dict, List, Optional
 
-from sqlalchemy import create_engine
+from fastapi import Depends, Request, Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 # Настройка подключения к MySQL с переменными окружения
 DB_USER = os.getenv("DB_USER", "root")
@@ -11,8 +21,72 @@ DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "3306")
 DB_NAME = os.getenv("DB_NAME", "ideavoting")
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./local.db")
+# Реплики только для чтения (через запятую); пусто — все идет в основную БД
+DATABASE_REPLICA_URLS = [
+    u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()
+]
+# На сколько секунд реплика выводится из ротации после ошибки соединения
+DATABASE_REPLICA_EJECT_SECONDS = float(
+    os.getenv("DATABASE_REPLICA_EJECT_SECONDS", "30")
+)
+# Сколько секунд после записи клиент читает из основной БД (0 — выкл.)
+DATABASE_READ_YOUR_WRITES_SECONDS = float(
+    os.getenv("DATABASE_READ_YOUR_WRITES_SECONDS", "5")
+)
+# Подписанная метка последней записи: клиент возвращает ее cookie или
+# заголовком, поэтому read-your-writes работает при любом числе воркеров и подов
+READ_YOUR_WRITES_COOKIE = "last_write"
+READ_YOUR_WRITES_HEADER = "X-Last-Write"
 
-engine = create_engine(DATABASE_URL)
+# Профиль SQLite (dev и небольшие установки на одном узле). Пустое значение —
+# оставить умолчание SQLite. busy_timeout первым: переход в WAL берет блокировку
+SQLITE_PRAGMAS = {
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+    # WAL: читатели не блокируют писателя и наоборот
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    # В WAL режим NORMAL не делает fsync на каждый коммит, только на checkpoint
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    # Отрицательное значение — в KiB (64 MiB на соединение)
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+_PRAGMA_VALUE = re.compile(r"-?[A-Za-z0-9_]+")
+
+logger = logging.getLogger("database")
+
+
+def install_sqlite_pragmas(target, pragmas=None) -> bool:
+    """Выставляет PRAGMA на каждом новом соединении SQLite-движка"""
+    if target.dialect.name != "sqlite":
+        return False
+    statements = []
+    for name, value in (SQLITE_PRAGMAS if pragmas is None else pragmas).items():
+        if value is None or str(value) == "":
+            continue
+        if not _PRAGMA_VALUE.fullmatch(str(value)):
+            raise ValueError(f"Invalid SQLite pragma value: {name}={value!r}")
+        statements.append(f"PRAGMA {name}={value}")
+
+    @event.listens_for(target, "connect")
+    def _apply_pragmas(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    return True
+
+
+def _create_engine(url: str, **kwargs):
+    db_engine = create_engine(url, **kwargs)
+    install_sqlite_pragmas(db_engine)
+    return db_engine
+
+
+engine = _create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -25,3 +99,149 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+class ReplicaSet:
+    """
+    Реплики для чтения: выбор по кругу, реплика, к которой не удалось
+    подключиться или соединение с которой оборвалось, выводится из ротации на
+    eject_seconds. Ошибки самих запросов (блокировки, SQL) реплику не выводят.
+    Если здоровых реплик нет, читаем из основной БД. После записи ответ несет
+    подписанную метку времени (cookie и заголовок X-Last-Write); с ней клиент
+    read_your_writes секунд читает из основной БД.
+    """
+
+    def __init__(
+        self,
+        engines,
+        *,
+        eject_seconds: float = DATABASE_REPLICA_EJECT_SECONDS,
+        read_your_writes: float = DATABASE_READ_YOUR_WRITES_SECONDS,
+    ):
+        self.engines = list(engines)
+        self.eject_seconds = eject_seconds
+        self.read_your_writes = read_your_writes
+        self._sessions = [
+            sessionmaker(autocommit=False, autoflush=False, bind=e)
+            for e in self.engines
+        ]
+        self._counter = itertools.count()
+        self._ejected_until: Dict[int, float] = {}
+        for index, replica in enumerate(self.engines):
+            event.listen(replica, "handle_error", self._error_listener(index))
+
+    def _now(self) -> float:
+        return time.monotonic()
+
+    def _wall_now(self) -> float:
+        # Метка сверяется в других процессах — нужны общие часы, а не monotonic
+        return time.time()
+
+    def _error_listener(self, index: int):
+        def on_error(context):
+            # Разрыв соединения или неудачное подключение (connection еще нет)
+            if context.is_disconnect or context.connection is None:
+                self.eject(index)
+
+        return on_error
+
+    def eject(self, index: int):
+        if index not in self._ejected_until:
+            logger.warning("Read replica %s ejected", index)
+        self._ejected_until[index] = self._now() + self.eject_seconds
+
+    def healthy(self) -> List[int]:
+        now = self._now()
+        return [
+            i
+            for i in range(len(self.engines))
+            if self._ejected_until.get(i, 0.0) <= now
+        ]
+
+    def choose(self) -> Optional[int]:
+        """Индекс следующей здоровой реплики или None"""
+        healthy = self.healthy()
+        if not healthy:
+            return None
+        index = healthy[next(self._counter) % len(healthy)]
+        self._ejected_until.pop(index, None)  # срок вывода истек — снова в ротации
+        return index
+
+    @staticmethod
+    def _sign(stamp: str) -> str:
+        from app.auth import SECRET_KEY
+
+        message = f"last-write.{stamp}".encode()
+        return hmac.new(SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+    def note_write(self, response: Response):
+        """Кладет в ответ метку записи (cookie и заголовок)"""
+        if not self.engines or self.read_your_writes <= 0:
+            return
+        stamp = str(int(self._wall_now() * 1000))
+        mark = f"{stamp}.{self._sign(stamp)}"
+        response.headers[READ_YOUR_WRITES_HEADER] = mark
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            mark,
+            max_age=math.ceil(self.read_your_writes),
+            httponly=True,
+            samesite="lax",
+        )
+
+    def wants_primary(self, mark: Optional[str]) -> bool:
+        """Свежая метка записи — читать из основной БД"""
+        if not mark or self.read_your_writes <= 0:
+            return False
+        stamp, _, signature = mark.partition(".")
+        # Подпись: подделанной меткой нельзя увести все чтения в основную БД
+        if not stamp.isdigit() or not hmac.compare_digest(signature, self._sign(stamp)):
+            return False
+        age = self._wall_now() - int(stamp) / 1000
+        # Отрицательный возраст — часы узлов расходятся; в пределах окна это ок
+        return abs(age) < self.read_your_writes
+
+    def session(self, index: int) -> Session:
+        return self._sessions[index]()
+
+
+replicas = ReplicaSet(
+    _create_engine(url, pool_pre_ping=True) for url in DATABASE_REPLICA_URLS
+)
+
+
+def get_read_db(request: Request, db: Session = Depends(get_db)):
+    """
+    Сессия для чтения: реплика, если они настроены, иначе основная БД
+    (сессия get_db без подключения к БД ничего не стоит).
+    """
+    if not replicas.engines:
+        yield db
+        return
+    mark = request.headers.get(READ_YOUR_WRITES_HEADER) or request.cookies.get(
+        READ_YOUR_WRITES_COOKIE
+    )
+    if replicas.wants_primary(mark):
+        yield db
+        return
+    # Соединение с репликой открываем до передачи сессии обработчику: если оно
+    # не устанавливается, реплика выводится из ротации, а чтение уходит на
+    # следующую здоровую реплику или на основную БД
+    for _ in replicas.engines:
+        index = replicas.choose()
+        if index is None:
+            break
+        replica_db = replicas.session(index)
+        try:
+            replica_db.connection()
+        except DBAPIError:
+            # Запросов еще не было: любая ошибка здесь — ошибка подключения
+            replica_db.close()
+            replicas.eject(index)
+            continue
+        try:
+            yield replica_db
+        finally:
+            replica_db.close()
+        return
+    yield db
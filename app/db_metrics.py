@@ -0,0 +1,98 @@
+import contextvars
+import logging
+import os
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Учет SQL-запросов: число и время на запрос HTTP, лог медленных запросов
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+# Заголовки X-DB-Queries / X-DB-Time в ответах (для отладки, не для прода)
+DB_DEBUG_HEADERS = os.getenv("DB_DEBUG_HEADERS", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+_MAX_STATEMENT_CHARS = 1000
+
+logger = logging.getLogger("db")
+
+
+class QueryStats:
+    __slots__ = ("correlation_id", "count", "seconds")
+
+    def __init__(self, correlation_id: Optional[str] = None):
+        self.correlation_id = correlation_id
+        self.count = 0
+        self.seconds = 0.0
+
+    @property
+    def total_ms(self) -> float:
+        return self.seconds * 1000
+
+
+# Контекст копируется в задачи и в пул потоков sync-обработчиков, а объект
+# статистики общий — поэтому запросы из обработчика учитываются в запросе HTTP
+_current: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar(
+    "db_query_stats", default=None
+)
+
+
+def begin_request(correlation_id: str):
+    stats = QueryStats(correlation_id)
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def redact(parameters):
+    """Параметры в логе заменяются на '?': там бывают пароли, токены, email"""
+    if isinstance(parameters, dict):
+        return {key: "?" for key in parameters}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            return f"<{len(parameters)} parameter sets>"
+        return ["?"] * len(parameters)
+    return "?" if parameters is not None else None
+
+
+def _short(statement: str) -> str:
+    statement = " ".join(statement.split())
+    if len(statement) > _MAX_STATEMENT_CHARS:
+        return statement[:_MAX_STATEMENT_CHARS] + "..."
+    return statement
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._db_metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_db_metrics_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+    if elapsed * 1000 >= DB_SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query %.1f ms cid=%s: %s params=%s",
+            elapsed * 1000,
+            stats.correlation_id if stats is not None else "-",
+            _short(statement),
+            redact(parameters),
+        )
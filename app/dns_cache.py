@@ -0,0 +1,206 @@
+import asyncio
+import ipaddress
+import logging
+import os
+import socket
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpcore
+
+from app.single_flight import SingleFlight
+
+# Кэш DNS для SafeHttpClient: системный резолвер TTL не отдает, поэтому он фиксированный
+# Выключен по умолчанию: подключается через приватный атрибут httpcore (версия
+# закреплена в requirements.txt)
+HTTP_CLIENT_DNS_CACHE = os.getenv("HTTP_CLIENT_DNS_CACHE", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+HTTP_CLIENT_DNS_TTL = float(os.getenv("HTTP_CLIENT_DNS_TTL", "30"))  # секунды
+HTTP_CLIENT_DNS_NEGATIVE_TTL = float(os.getenv("HTTP_CLIENT_DNS_NEGATIVE_TTL", "5"))
+HTTP_CLIENT_DNS_MAX_ENTRIES = int(os.getenv("HTTP_CLIENT_DNS_MAX_ENTRIES", "1024"))
+
+Resolve = Callable[[str, int], Awaitable[List[str]]]
+
+_logger = logging.getLogger("http_client")
+
+
+async def system_resolve(host: str, port: int) -> List[str]:
+    infos = await asyncio.get_running_loop().getaddrinfo(
+        host, port, type=socket.SOCK_STREAM
+    )
+    # Порядок getaddrinfo сохраняем (предпочтения системы), дубли убираем
+    return list(dict.fromkeys(info[4][0] for info in infos))
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+class CachingResolver:
+    """
+    Кэш адресов по имени хоста: положительные ответы живут ttl, ошибки
+    резолва — negative_ttl. Параллельные промахи по одному имени ждут
+    один общий запрос к резолверу.
+    """
+
+    def __init__(
+        self,
+        resolve: Optional[Resolve] = None,
+        *,
+        max_entries: int = HTTP_CLIENT_DNS_MAX_ENTRIES,
+        ttl: float = HTTP_CLIENT_DNS_TTL,
+        negative_ttl: float = HTTP_CLIENT_DNS_NEGATIVE_TTL,
+    ):
+        self._resolve = resolve or system_resolve
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # host -> (expires_at, addresses или исключение)
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+
+    def _now(self) -> float:
+        return time.monotonic()
+
+    def _store(self, host: str, ttl: float, value):
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        self._items[host] = (self._now() + ttl, value)
+        self._items.move_to_end(host)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    async def resolve(self, host: str, port: int) -> List[str]:
+        key = host.lower()
+        item = self._items.get(key)
+        if item is not None:
+            expires_at, value = item
+            if expires_at > self._now():
+                self._items.move_to_end(key)
+                if isinstance(value, Exception):
+                    self.negative_hits += 1
+                    raise value
+                self.hits += 1
+                return value
+            del self._items[key]
+
+        return await self._inflight.do(key, lambda: self._lookup(key, host, port))
+
+    async def _lookup(self, key: str, host: str, port: int) -> List[str]:
+        self.misses += 1
+        try:
+            addresses = await self._resolve(host, port)
+            if not addresses:
+                raise socket.gaierror(socket.EAI_NONAME, "no addresses")
+        except (socket.gaierror, UnicodeError) as exc:
+            error = httpcore.ConnectError(f"DNS lookup failed for {host}: {exc}")
+            self._store(key, self.negative_ttl, error)
+            raise error from exc
+        self._store(key, self.ttl, addresses)
+        return addresses
+
+    def invalidate(self, host: str):
+        self._items.pop(host.lower(), None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "negative_hits": self.negative_hits,
+        }
+
+
+class CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """
+    Сетевой backend httpcore, который резолвит имена через CachingResolver.
+    address_filter(address) -> bool отбрасывает запрещенные адреса уже после
+    резолва: подключение идет только к проверенному IP, и DNS rebinding между
+    проверкой и подключением невозможен.
+    """
+
+    def __init__(
+        self,
+        resolver: CachingResolver,
+        backend: Optional[httpcore.AsyncNetworkBackend] = None,
+        address_filter: Optional[Callable[[str], bool]] = None,
+    ):
+        self.resolver = resolver
+        self._backend = backend or httpcore.AnyIOBackend()
+        self._address_filter = address_filter
+
+    def _allowed(self, host: str, addresses: List[str]) -> List[str]:
+        if self._address_filter is None:
+            return addresses
+        allowed = [a for a in addresses if self._address_filter(a)]
+        if not allowed:
+            raise httpcore.ConnectError(f"{host} resolves to no permitted address")
+        return allowed
+
+    async def connect_tcp(
+        self, host, port, timeout=None, local_address=None, socket_options=None
+    ):
+        if _is_ip(host):
+            (address,) = self._allowed(host, [host])
+            return await self._backend.connect_tcp(
+                address, port, timeout, local_address, socket_options
+            )
+        try:
+            async with asyncio.timeout(timeout):
+                addresses = await self.resolver.resolve(host, port)
+        except TimeoutError:
+            raise httpcore.ConnectTimeout(f"DNS lookup timed out for {host}")
+        addresses = self._allowed(host, addresses)
+
+        # TLS (SNI и проверка сертификата) по-прежнему идет по имени хоста:
+        # httpcore передает server_hostname отдельно от адреса подключения
+        error = None
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(
+                    address, port, timeout, local_address, socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as exc:
+                error = exc
+        # Все адреса недоступны — возможно, запись устарела: резолвим заново
+        self.resolver.invalidate(host)
+        raise error
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float):
+        await self._backend.sleep(seconds)
+
+
+def install_resolver(
+    transport,
+    resolver: CachingResolver,
+    address_filter: Optional[Callable[[str], bool]] = None,
+):
+    """Подключает кэширующий резолвер к пулу соединений httpx-транспорта"""
+    pool = getattr(transport, "_pool", None)
+    backend = getattr(pool, "_network_backend", None)
+    # httpx не пробрасывает network_backend наружу, меняем его у пула. Если в
+    # другой версии httpcore атрибута нет — не трогаем пул, DNS идет как обычно
+    if not isinstance(pool, httpcore.AsyncConnectionPool) or not isinstance(
+        backend, httpcore.AsyncNetworkBackend
+    ):
+        _logger.warning(
+            "DNS cache not installed: unsupported httpcore %s",
+            getattr(httpcore, "__version__", "?"),
+        )
+        return False
+    pool._network_backend = CachingNetworkBackend(resolver, backend, address_filter)
+    return True
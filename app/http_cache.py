@@ -0,0 +1,235 @@
+import os
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.single_flight import SingleFlight
+
+# Кэш ответов SafeHttpClient (только безопасные методы)
+HTTP_CLIENT_CACHE_ENABLED = os.getenv("HTTP_CLIENT_CACHE_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+HTTP_CLIENT_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CLIENT_CACHE_MAX_ENTRIES", "1024"))
+HTTP_CLIENT_CACHE_MAX_BYTES = int(
+    os.getenv("HTTP_CLIENT_CACHE_MAX_BYTES", str(16 * 1024 * 1024))
+)
+
+CACHEABLE_METHODS = ("GET", "HEAD")
+# Статусы, которые можно хранить при явных указаниях свежести (RFC 9111)
+_CACHEABLE_STATUS = {200, 203, 204, 300, 301, 404, 410}
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('" ') or None
+    return directives
+
+
+def _seconds(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def freshness_lifetime(headers) -> Optional[float]:
+    """
+    Сколько секунд ответ свеж для общего кэша; None — хранить нельзя.
+    0 — можно хранить, но перед отдачей нужна ревалидация.
+    """
+    cc = parse_cache_control(headers.get("cache-control"))
+    # Кэш общий для всех пользователей приложения: private тоже не храним
+    if "no-store" in cc or "private" in cc or headers.get("vary", "").strip() == "*":
+        return None
+    has_validator = "etag" in headers or "last-modified" in headers
+    if "no-cache" in cc:
+        return 0.0 if has_validator else None
+
+    # s-maxage=0 — явное "устарело для общего кэша", а не отсутствие директивы
+    lifetime = _seconds(cc.get("s-maxage"))
+    if lifetime is None:
+        lifetime = _seconds(cc.get("max-age"))
+    if lifetime is None and "expires" in headers:
+        try:
+            expires = parsedate_to_datetime(headers["expires"])
+            date = parsedate_to_datetime(headers["date"]) if "date" in headers else None
+            lifetime = (expires - date).total_seconds() if date else None
+        except (TypeError, ValueError):
+            lifetime = 0.0  # невалидный Expires = уже истек
+    if lifetime is None:
+        return 0.0 if has_validator else None
+    return max(0.0, lifetime - (_seconds(headers.get("age")) or 0.0))
+
+
+def vary_names(headers) -> tuple:
+    """Имена заголовков запроса из Vary (в нижнем регистре, без повторов)"""
+    names = {n.strip().lower() for n in headers.get("vary", "").split(",")}
+    names.discard("")
+    return tuple(sorted(names))
+
+
+def _variant_key(key: str, names: tuple, request_headers: Dict[str, str]) -> str:
+    if not names:
+        return key
+    lowered = {k.lower(): v for k, v in request_headers.items()}
+    return key + "".join(f" {name}={lowered.get(name, '')}" for name in names)
+
+
+class CachedEntry:
+    __slots__ = ("value", "size", "expires_at", "etag", "last_modified")
+
+    def __init__(self, value, size: int, expires_at: float, etag, last_modified):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def validators(self) -> Dict[str, str]:
+        conditional = {}
+        if self.etag:
+            conditional["If-None-Match"] = self.etag
+        if self.last_modified:
+            conditional["If-Modified-Since"] = self.last_modified
+        return conditional
+
+
+class ResponseCache:
+    """
+    LRU-кэш ответов с лимитом по числу записей и по байтам тела.
+    Параллельные промахи по одному ключу схлопываются в один запрос.
+    Ответы с Vary хранятся отдельно для каждого набора значений перечисленных
+    заголовков запроса.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, CachedEntry]" = OrderedDict()
+        # Ключ запроса -> имена заголовков из Vary последнего ответа (LRU)
+        self._vary: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight = SingleFlight()
+        self.bytes = 0
+        # Метрики
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.coalesced = 0
+        self.bytes_saved = 0
+
+    def _now(self) -> float:
+        return time.monotonic()
+
+    def _evict(self, key: str):
+        entry = self._items.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def _store(self, key: str, value, size: int, headers):
+        self._evict(key)
+        lifetime = freshness_lifetime(headers)
+        if lifetime is None or size > self.max_bytes or self.max_entries <= 0:
+            return
+        self._items[key] = CachedEntry(
+            value,
+            size,
+            self._now() + lifetime,
+            headers.get("etag"),
+            headers.get("last-modified"),
+        )
+        self.bytes += size
+        while len(self._items) > self.max_entries or self.bytes > self.max_bytes:
+            self._evict(next(iter(self._items)))
+
+    async def fetch(
+        self,
+        key: str,
+        headers: Dict[str, str],
+        load: Callable[[Dict[str, str]], Awaitable[Any]],
+        size_of: Callable[[Any], int],
+    ):
+        """
+        Отдает ответ из кэша или через load(headers). Устаревшая запись с
+        ETag/Last-Modified ревалидируется условным запросом; ответ 304
+        продлевает ее без передачи тела.
+        """
+        base_key = key
+        key = _variant_key(base_key, self._vary.get(base_key, ()), headers)
+        entry = self._items.get(key)
+        if entry is not None and entry.expires_at > self._now():
+            self._items.move_to_end(key)
+            self.hits += 1
+            self.bytes_saved += entry.size
+            return entry.value
+
+        if key in self._inflight:
+            self.coalesced += 1
+        return await self._inflight.do(
+            key, lambda: self._load(base_key, key, entry, headers, load, size_of)
+        )
+
+    async def _load(self, base_key, key, entry, headers, load, size_of):
+        conditional = entry.validators() if entry is not None else {}
+        resp = await load({**headers, **conditional})
+        if resp.status_code == 304 and entry is not None:
+            self.revalidated += 1
+            self.bytes_saved += entry.size
+            # Новые заголовки 304 задают свежесть, тело остается прежним
+            lifetime = freshness_lifetime(resp.headers)
+            if lifetime is None:
+                self._evict(key)
+            else:
+                entry.expires_at = self._now() + lifetime
+                self._items.move_to_end(key)
+            return entry.value
+        self.misses += 1
+        if resp.status_code in _CACHEABLE_STATUS:
+            store_key = self._remember_vary(base_key, headers, resp.headers)
+            if store_key != key:
+                self._evict(key)
+            self._store(store_key, resp, size_of(resp), resp.headers)
+        else:
+            self._evict(key)
+        return resp
+
+    def _remember_vary(self, base_key: str, request_headers, response_headers):
+        """Ключ, под которым хранить ответ с учетом его Vary"""
+        names = vary_names(response_headers)
+        if names:
+            self._vary[base_key] = names
+            self._vary.move_to_end(base_key)
+            while len(self._vary) > max(1, self.max_entries):
+                self._vary.popitem(last=False)
+        else:
+            self._vary.pop(base_key, None)
+        return _variant_key(base_key, names, request_headers)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            "entries": len(self._items),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+        }
+
+    def clear(self):
+        self._items.clear()
+        self._vary.clear()
+        self.bytes = 0
+
+
+def build_response_cache() -> Optional[ResponseCache]:
+    if not HTTP_CLIENT_CACHE_ENABLED:
+        return None
+    return ResponseCache(HTTP_CLIENT_CACHE_MAX_ENTRIES, HTTP_CLIENT_CACHE_MAX_BYTES)
@@ -1,26 +1,390 @@
 import asyncio
+import logging
 import os
-from typing import Any, Dict, Iterable, Optional
+import random
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, Dict, List, Optional
 
 import httpx
 
+from app.circuit_breaker import CircuitBreakers
+from app.dns_cache import HTTP_CLIENT_DNS_CACHE, CachingResolver, install_resolver
+from app.http_cache import CACHEABLE_METHODS, ResponseCache, build_response_cache
+
 # Базовые настройки из окружения
 _TIMEOUT_TOTAL = float(os.getenv("HTTP_CLIENT_TIMEOUT_TOTAL", "10.0"))
 _MAX_RETRIES = int(os.getenv("HTTP_CLIENT_MAX_RETRIES", "3"))
 _BACKOFF_BASE = float(os.getenv("HTTP_CLIENT_BACKOFF_BASE", "0.25"))  # секунды
 _CONCURRENCY_LIMIT = int(os.getenv("HTTP_CLIENT_CONCURRENCY", "10"))
+# Общий дедлайн на вызов (все попытки + backoff), а не на одну попытку
+_CALL_DEADLINE = float(os.getenv("HTTP_CLIENT_CALL_DEADLINE", "15.0"))
+# Меньше этого на попытку не оставляем — такой ретрай бессмысленен
+_MIN_ATTEMPT_SECONDS = float(os.getenv("HTTP_CLIENT_MIN_ATTEMPT_SECONDS", "0.2"))
+# Бюджет ретраев: ratio токена за каждый вызов, ретрай стоит 1 токен
+_RETRY_BUDGET_RATIO = float(os.getenv("HTTP_CLIENT_RETRY_BUDGET_RATIO", "0.1"))
+_RETRY_BUDGET_MIN = float(os.getenv("HTTP_CLIENT_RETRY_BUDGET_MIN", "10"))
+# Сколько элементов пакета (map/gather) обрабатывается одновременно
+_FANOUT_CONCURRENCY = int(os.getenv("HTTP_CLIENT_FANOUT_CONCURRENCY", "10"))
+# Не больше N одновременных запросов к одному хосту: медленный хост не съест все слоты
+_PER_HOST_CONCURRENCY = int(os.getenv("HTTP_CLIENT_PER_HOST_CONCURRENCY", "4"))
+
+# Пул соединений httpx
+_MAX_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "100"))
+_MAX_KEEPALIVE = int(os.getenv("HTTP_CLIENT_MAX_KEEPALIVE", "20"))
+_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY", "30.0"))  # секунды
+_HTTP2 = os.getenv("HTTP_CLIENT_HTTP2", "false").lower() in ("1", "true", "yes")
+
+# Потоковое чтение: лимит байт тела и общий дедлайн на чтение
+_STREAM_MAX_BYTES = int(os.getenv("HTTP_CLIENT_STREAM_MAX_BYTES", str(1024 * 1024)))
+_STREAM_READ_DEADLINE = float(os.getenv("HTTP_CLIENT_STREAM_DEADLINE", "5.0"))
 
 _RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+_DEFAULT_RETRY_METHODS = ("GET", "HEAD", "OPTIONS", "DELETE", "PUT")
+
+# Входящий заголовок с оставшимся бюджетом времени клиента, мс
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+
+
+class DeadlineExceeded(httpx.TimeoutException):
+    """Истек общий дедлайн вызова"""
+
+
+def deadline_from_headers(headers) -> Optional[float]:
+    """Дедлайн (в секундах) из заголовка входящего запроса, если он задан"""
+    raw = headers.get(DEADLINE_HEADER)
+    if not raw:
+        return None
+    try:
+        value = float(raw) / 1000
+    except ValueError:
+        return None
+    return value if value > 0 else None
+
+
+class RetryBudget:
+    """
+    Token bucket для ретраев: каждый вызов пополняет бюджет на ratio,
+    каждый ретрай тратит 1 токен. В устойчивом режиме ретраев не больше
+    ratio от трафика, min_tokens — запас на всплески.
+    """
+
+    def __init__(self, ratio: float, min_tokens: float):
+        self.ratio = ratio
+        self.capacity = max(1.0, min_tokens)
+        self.tokens = self.capacity
+        self.retries = 0
+        self.denied = 0
+
+    def deposit(self):
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            self.retries += 1
+            return True
+        self.denied += 1
+        return False
+
+
+class StreamedBody:
+    """Результат потокового чтения: начало тела и число прочитанных байт"""
+
+    __slots__ = (
+        "status_code",
+        "headers",
+        "encoding",
+        "prefix",
+        "bytes_read",
+        "truncated",
+    )
+
+    def __init__(self, status_code, headers, encoding, prefix, bytes_read, truncated):
+        self.status_code = status_code
+        self.headers = headers
+        self.encoding = encoding
+        self.prefix = prefix
+        self.bytes_read = bytes_read
+        self.truncated = truncated
+
+    def text_prefix(self, max_chars: int) -> str:
+        # Префикс мог оборваться посреди многобайтного символа
+        return self.prefix.decode(self.encoding or "utf-8", errors="ignore")[:max_chars]
+
+
+class FanoutResult:
+    """Результат одного элемента пакета: ответ или ошибка"""
+
+    __slots__ = ("index", "url", "response", "error", "elapsed")
+
+    def __init__(self, index, url, response=None, error=None, elapsed=0.0):
+        self.index = index
+        self.url = url
+        self.response = response
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+_logger = logging.getLogger("http_client")
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_async_client(
+    limits: Optional[httpx.Limits] = None,
+    http2: Optional[bool] = None,
+    resolver: Optional[CachingResolver] = None,
+    address_filter: Optional[Callable[[str], bool]] = None,
+) -> httpx.AsyncClient:
+    """
+    AsyncClient с настроенным пулом соединений, (опционально) HTTP/2 и
+    кэширующим резолвером DNS (по умолчанию — если включен в окружении).
+    address_filter ограничивает IP, к которым разрешено подключаться.
+    """
+    if limits is None:
+        limits = httpx.Limits(
+            max_connections=_MAX_CONNECTIONS,
+            max_keepalive_connections=_MAX_KEEPALIVE,
+            keepalive_expiry=_KEEPALIVE_EXPIRY,
+        )
+    http2 = _HTTP2 if http2 is None else http2
+    if http2 and not _http2_available():
+        _logger.warning(
+            "HTTP/2 requested but 'h2' is not installed "
+            "(pip install -r requirements-http2.txt); using HTTP/1.1"
+        )
+        http2 = False
+    if resolver is None and HTTP_CLIENT_DNS_CACHE:
+        resolver = CachingResolver()
+    if resolver is None and address_filter is not None:
+        # Фильтру нужен резолв внутри пула; без кэша — с нулевым TTL
+        resolver = CachingResolver(ttl=0, negative_ttl=0)
+    transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+    if resolver is not None:
+        installed = install_resolver(transport, resolver, address_filter)
+        if not installed and address_filter is not None:
+            raise RuntimeError("cannot restrict target addresses with this httpcore")
+    return httpx.AsyncClient(
+        follow_redirects=False,
+        limits=limits,
+        http2=http2,
+        transport=transport,
+        # Прокси из окружения подключался бы в обход фильтра адресов
+        trust_env=address_filter is None,
+    )
+
+
+class _HostSlots:
+    """Семафоры по хостам; запись живет, пока к хосту есть запросы"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._sems: Dict[str, asyncio.Semaphore] = {}
+        self._users: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, host: str):
+        sem = self._sems.get(host)
+        if sem is None:
+            sem = self._sems[host] = asyncio.Semaphore(self.limit)
+        self._users[host] = self._users.get(host, 0) + 1
+        try:
+            async with sem:
+                yield
+        finally:
+            self._users[host] -= 1
+            if self._users[host] == 0:
+                del self._users[host]
+                del self._sems[host]
+
+
+def _deadline_at(deadline: Optional[float]) -> float:
+    # Дедлайн вызывающего не может превышать наш собственный потолок
+    budget = _CALL_DEADLINE if deadline is None else min(deadline, _CALL_DEADLINE)
+    return time.monotonic() + budget
+
+
+def _host_key(url: httpx.URL) -> str:
+    return f"{url.host}:{url.port or (443 if url.scheme == 'https' else 80)}"
 
 
 class SafeHttpClient:
-    def __init__(self, client: Optional[httpx.AsyncClient] = None):
-        self._client = client or httpx.AsyncClient(follow_redirects=False)
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        *,
+        limits: Optional[httpx.Limits] = None,
+        http2: Optional[bool] = None,
+        per_host_limit: Optional[int] = None,
+        cache: Optional[ResponseCache] = None,
+        resolver: Optional[CachingResolver] = None,
+    ):
+        self._client = client or build_async_client(
+            limits=limits, http2=http2, resolver=resolver
+        )
         self._sem = asyncio.Semaphore(_CONCURRENCY_LIMIT)
+        self._host_slots = _HostSlots(per_host_limit or _PER_HOST_CONCURRENCY)
+        self._breakers = CircuitBreakers()
+        self._retry_budget = RetryBudget(_RETRY_BUDGET_RATIO, _RETRY_BUDGET_MIN)
+        # Кэш ответов выключен, пока не передан явно или не включен в окружении
+        self._cache = cache if cache is not None else build_response_cache()
+
+    def breaker_states(self) -> Dict[str, dict]:
+        """Состояние circuit breaker'ов по хостам (для мониторинга)"""
+        return self._breakers.snapshot()
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Метрики кэша ответов; None, если кэш выключен"""
+        return self._cache.stats() if self._cache is not None else None
+
+    def _cache_key(self, method_u, url, params, headers, body) -> Optional[str]:
+        # Кэшируем только безопасные запросы без тела и без учетных данных
+        if (
+            self._cache is None
+            or method_u not in CACHEABLE_METHODS
+            or body is not None
+            or any(h.lower() in ("authorization", "cookie") for h in headers or {})
+        ):
+            return None
+        return f"{method_u} {httpx.URL(url, params=params)}"
+
+    @asynccontextmanager
+    async def _slot(self, host: str):
+        # Сначала слот хоста, потом глобальный: ожидание занятого хоста
+        # не держит глобальный слот
+        async with self._host_slots.hold(host):
+            async with self._sem:
+                yield
 
     async def aclose(self):
         await self._client.aclose()
 
+    def _retry_delay(
+        self, method_u: str, retry_methods: set, attempt: int, deadline_at: float
+    ) -> Optional[float]:
+        """Пауза перед следующей попыткой или None, если ретраить нельзя"""
+        if method_u not in retry_methods or attempt >= _MAX_RETRIES:
+            return None
+        backoff = _BACKOFF_BASE * (2**attempt)
+        # Джиттер, чтобы ретраи разных вызовов не синхронизировались
+        delay = random.uniform(backoff / 2, backoff)
+        if deadline_at - time.monotonic() - delay < _MIN_ATTEMPT_SECONDS:
+            return None
+        if not self._retry_budget.try_withdraw():
+            return None
+        return delay
+
+    @asynccontextmanager
+    async def _send(
+        self,
+        method_u: str,
+        url: str,
+        *,
+        headers: Optional[Dict[str, str]],
+        params: Optional[Dict[str, Any]],
+        json: Any,
+        data: Any,
+        content: Any = None,
+        timeout_val: float,
+        retry_methods: set,
+        correlation_id: Optional[str],
+        stream: bool,
+        deadline_at: float,
+    ):
+        """
+        Отправляет запрос с ретраями и отдает ответ, удерживая слоты
+        конкурентности, пока вызывающий код читает тело. Между попытками
+        (backoff) слоты отпускаются. deadline_at (time.monotonic) ограничивает
+        все попытки вместе с паузами.
+        """
+        req_headers = dict(headers or {})
+        if correlation_id and "X-Correlation-ID" not in req_headers:
+            req_headers["X-Correlation-ID"] = correlation_id
+
+        self._retry_budget.deposit()
+        attempt = 0
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded("call deadline exceeded")
+            req = self._client.build_request(
+                method_u,
+                url,
+                headers=req_headers,
+                params=params,
+                json=json,
+                data=data,
+                content=content,
+                # Попытка не может пережить общий дедлайн
+                timeout=min(timeout_val, remaining),
+            )
+            host = _host_key(req.url)
+            # Открытый breaker: отказываем сразу, без сети, слотов и backoff
+            probe = self._breakers.before_call(host)
+            slots = AsyncExitStack()
+            sending = False
+            try:
+                # Таймауты httpx — на каждую операцию: сервер, отдающий байты по
+                # одному, растянул бы попытку сколько угодно. Дедлайн покрывает и
+                # ожидание слота, и отправку, и чтение тела (при stream=False)
+                async with asyncio.timeout(remaining):
+                    await slots.enter_async_context(self._slot(host))
+                    sending = True
+                    resp = await self._client.send(req, stream=stream)
+            except TimeoutError:
+                await slots.aclose()
+                if sending:
+                    self._breakers.record(host, False, probe)
+                    raise DeadlineExceeded("call deadline exceeded")
+                if probe:
+                    self._breakers.release_probe(host)
+                raise DeadlineExceeded("call deadline exceeded waiting for a slot")
+            except (httpx.TimeoutException, httpx.TransportError):
+                await slots.aclose()
+                self._breakers.record(host, False, probe)
+                delay = self._retry_delay(method_u, retry_methods, attempt, deadline_at)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                await slots.aclose()
+                if probe:
+                    self._breakers.release_probe(host)
+                raise
+            self._breakers.record(host, resp.status_code < 500, probe)
+
+            if resp.status_code in _RETRY_STATUS_CODES:
+                delay = self._retry_delay(method_u, retry_methods, attempt, deadline_at)
+                if delay is not None:
+                    # Тело ретраимого ответа не читаем, соединение возвращаем в пул
+                    await resp.aclose()
+                    await slots.aclose()
+                    attempt += 1
+                    await asyncio.sleep(delay)
+                    continue
+            break
+
+        async with slots:
+            try:
+                yield resp
+            finally:
+                if stream:
+                    await resp.aclose()
+
     async def request(
         self,
         method: str,
@@ -30,55 +394,223 @@ class SafeHttpClient:
         params: Optional[Dict[str, Any]] = None,
         json: Any = None,
         data: Any = None,
+        content: Any = None,
         timeout: Optional[float] = None,
-        allowed_retry_methods: Iterable[str] = (
-            "GET",
-            "HEAD",
-            "OPTIONS",
-            "DELETE",
-            "PUT",
-        ),
+        allowed_retry_methods: Iterable[str] = _DEFAULT_RETRY_METHODS,
         correlation_id: Optional[str] = None,
+        deadline: Optional[float] = None,
     ) -> httpx.Response:
+        """deadline — общий бюджет вызова в секундах (все попытки и паузы)"""
+        method_u = method.upper()
         timeout_val = timeout if timeout is not None else _TIMEOUT_TOTAL
+        deadline_at = _deadline_at(deadline)
+
+        async def load(req_headers):
+            async with self._send(
+                method_u,
+                url,
+                headers=req_headers,
+                params=params,
+                json=json,
+                data=data,
+                content=content,
+                timeout_val=timeout_val,
+                retry_methods={m.upper() for m in allowed_retry_methods},
+                correlation_id=correlation_id,
+                stream=False,
+                deadline_at=deadline_at,
+            ) as resp:
+                return resp
+
+        body = next((b for b in (json, data, content) if b is not None), None)
+        key = self._cache_key(method_u, url, params, headers, body)
+        if key is None:
+            return await load(headers)
+        return await self._cache.fetch(
+            key, dict(headers or {}), load, lambda r: len(r.content)
+        )
+
+    async def stream_prefix(
+        self,
+        method: str,
+        url: str,
+        *,
+        prefix_bytes: int = 1024,
+        max_bytes: Optional[int] = None,
+        read_deadline: Optional[float] = None,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        allowed_retry_methods: Iterable[str] = _DEFAULT_RETRY_METHODS,
+        correlation_id: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> StreamedBody:
+        """
+        Читает тело потоком: хранит только первые prefix_bytes, остальное лишь
+        считает. Чтение обрывается на max_bytes или по истечении read_deadline
+        (но не позже общего дедлайна вызова). При включенном кэше повторные
+        GET отдаются из него или ревалидируются по ETag/Last-Modified.
+        """
+        timeout_val = timeout if timeout is not None else _TIMEOUT_TOTAL
+        max_bytes = max_bytes if max_bytes is not None else _STREAM_MAX_BYTES
+        read_deadline = (
+            read_deadline if read_deadline is not None else _STREAM_READ_DEADLINE
+        )
+        deadline_at = _deadline_at(deadline)
         method_u = method.upper()
-        retry_methods = {m.upper() for m in allowed_retry_methods}
 
-        attempt = 0
-        async with self._sem:
-            while True:
-                try:
-                    req_headers = dict(headers or {})
-                    if correlation_id and "X-Correlation-ID" not in req_headers:
-                        req_headers["X-Correlation-ID"] = correlation_id
-
-                    resp = await self._client.request(
-                        method_u,
-                        url,
-                        headers=req_headers,
-                        params=params,
-                        json=json,
-                        data=data,
-                        timeout=timeout_val,  # общий таймаут
-                    )
-
-                    if (
-                        method_u in retry_methods
-                        and attempt < _MAX_RETRIES
-                        and resp.status_code in _RETRY_STATUS_CODES
-                    ):
-                        attempt += 1
-                        await asyncio.sleep(_BACKOFF_BASE * (2 ** (attempt - 1)))
-                        continue
-
-                    return resp
-
-                except (httpx.TimeoutException, httpx.TransportError):
-                    if method_u in retry_methods and attempt < _MAX_RETRIES:
-                        attempt += 1
-                        await asyncio.sleep(_BACKOFF_BASE * (2 ** (attempt - 1)))
-                        continue
-                    raise
+        async def load(req_headers):
+            return await self._stream_prefix(
+                method_u,
+                url,
+                prefix_bytes=prefix_bytes,
+                max_bytes=max_bytes,
+                read_deadline=read_deadline,
+                headers=req_headers,
+                params=params,
+                timeout_val=timeout_val,
+                retry_methods={m.upper() for m in allowed_retry_methods},
+                correlation_id=correlation_id,
+                deadline_at=deadline_at,
+            )
+
+        key = self._cache_key(method_u, url, params, headers, None)
+        if key is None:
+            return await load(headers)
+        # Результат зависит от лимитов чтения — они входят в ключ
+        return await self._cache.fetch(
+            f"{key} prefix={prefix_bytes} max={max_bytes}",
+            dict(headers or {}),
+            load,
+            lambda b: len(b.prefix),
+        )
+
+    async def _stream_prefix(
+        self,
+        method_u: str,
+        url: str,
+        *,
+        prefix_bytes: int,
+        max_bytes: int,
+        read_deadline: float,
+        headers: Optional[Dict[str, str]],
+        params: Optional[Dict[str, Any]],
+        timeout_val: float,
+        retry_methods: set,
+        correlation_id: Optional[str],
+        deadline_at: float,
+    ) -> StreamedBody:
+        prefix = bytearray()
+        bytes_read = 0
+        truncated = False
+        # Слоты конкурентности держим до конца чтения тела
+        async with self._send(
+            method_u,
+            url,
+            headers=headers,
+            params=params,
+            json=None,
+            data=None,
+            timeout_val=timeout_val,
+            retry_methods=retry_methods,
+            correlation_id=correlation_id,
+            stream=True,
+            deadline_at=deadline_at,
+        ) as resp:
+            read_budget = min(read_deadline, deadline_at - time.monotonic())
+            try:
+                async with asyncio.timeout(max(0.0, read_budget)):
+                    async for chunk in resp.aiter_bytes():
+                        bytes_read += len(chunk)
+                        if len(prefix) < prefix_bytes:
+                            prefix += chunk[: prefix_bytes - len(prefix)]
+                        if bytes_read >= max_bytes:
+                            truncated = True
+                            break
+            except TimeoutError:
+                if time.monotonic() >= deadline_at:
+                    raise DeadlineExceeded("call deadline exceeded reading the body")
+                raise httpx.ReadTimeout(
+                    "stream read deadline exceeded", request=resp.request
+                )
+            # Непрочитанный остаток не буферизуем: _send закрывает ответ
+
+        return StreamedBody(
+            status_code=resp.status_code,
+            headers=resp.headers,
+            encoding=resp.encoding,
+            prefix=bytes(prefix),
+            bytes_read=bytes_read,
+            truncated=truncated,
+        )
+
+    async def map(
+        self,
+        items: Iterable[Any],
+        *,
+        concurrency: Optional[int] = None,
+        deadline: Optional[float] = None,
+        call: Optional[Callable[..., Awaitable[Any]]] = None,
+    ) -> AsyncIterator[FanoutResult]:
+        """
+        Выполняет пакет запросов и отдает результаты по мере готовности.
+
+        items — URL (GET) или dict аргументов request(); итерируется лениво,
+        одновременно в работе не больше concurrency элементов, так что память
+        не растет с размером пакета. deadline — бюджет каждого элемента.
+        call — чем выполнять элемент (по умолчанию request, можно stream_prefix).
+        Ошибки элемента не прерывают пакет, а попадают в FanoutResult.error.
+        """
+        call = call or self.request
+        limit = max(1, concurrency or _FANOUT_CONCURRENCY)
+        source = iter(enumerate(items))
+        pending: set = set()
+
+        async def run(index: int, item) -> FanoutResult:
+            kwargs = {"method": "GET", "url": item} if isinstance(item, str) else item
+            kwargs = {"method": "GET", **kwargs}
+            if deadline is not None:
+                kwargs.setdefault("deadline", deadline)
+            started = time.monotonic()
+            try:
+                response = await call(**kwargs)
+            except Exception as exc:
+                return FanoutResult(
+                    index, kwargs["url"], error=exc, elapsed=time.monotonic() - started
+                )
+            return FanoutResult(
+                index, kwargs["url"], response, elapsed=time.monotonic() - started
+            )
+
+        def fill():
+            while len(pending) < limit:
+                nxt = next(source, None)
+                if nxt is None:
+                    return
+                pending.add(asyncio.ensure_future(run(*nxt)))
+
+        try:
+            fill()
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                pending.difference_update(done)
+                # Новые элементы запускаем до отдачи: потребитель может быть медленным
+                fill()
+                for task in done:
+                    yield task.result()
+        finally:
+            # Потребитель прервал итерацию — незавершенные запросы отменяем
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def gather(self, items: Iterable[Any], **kwargs) -> List[FanoutResult]:
+        """map(), собранный в список в порядке входных элементов"""
+        results = [r async for r in self.map(items, **kwargs)]
+        return sorted(results, key=lambda r: r.index)
 
 
 # Зависимость для FastAPI
@@ -87,5 +619,11 @@ def get_http_client() -> SafeHttpClient:
     raise RuntimeError("Используйте Depends(injected_get_http_client)")
 
 
-def injected_get_http_client(request) -> SafeHttpClient:
-    return request.app.state.http_client
+async def injected_get_http_client(request) -> SafeHttpClient:
+    # Клиент создается при первом внешнем вызове; async — чтобы проверка и
+    # присваивание шли в event loop без гонки между потоками
+    client = getattr(request.app.state, "http_client", None)
+    if client is None:
+        client = SafeHttpClient()
+        request.app.state.http_client = client
+    return client
@@ -1,6 +1,9 @@
+import asyncio
+import hmac
 import logging
 import math
 import os
+import random
 import time
 from typing import Tuple
 from uuid import uuid4
@@ -9,14 +12,17 @@ from fastapi import FastAPI, HTTPException, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, PlainTextResponse, Response
-from sqlalchemy import text
-from sqlalchemy.exc import OperationalError
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.schema import CreateColumn
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
-from app import models
+from app import IMPORT_STARTED, db_metrics, models, profiling, webhooks
 from app.database import SessionLocal, engine
-from app.http_client import SafeHttpClient
 from app.routers import ideas, users
+from app.routers import webhooks as webhooks_router
+
+_IMPORTS_DONE = time.perf_counter()
 
 app = FastAPI(title="Idea Voting Board", version="0.2.0")
 
@@ -30,7 +36,13 @@ RATE_LIMIT_LOGIN_PER_10MIN_PER_IP = int(
 # Метрика блокировок
 rate_limiter_blocked_total = 0
 
+# Ожидание БД при старте: экспоненциальный backoff с джиттером
+DB_WAIT_TIMEOUT = float(os.getenv("DB_WAIT_TIMEOUT", "60"))
+DB_WAIT_BACKOFF_BASE = float(os.getenv("DB_WAIT_BACKOFF_BASE", "0.1"))
+DB_WAIT_BACKOFF_MAX = float(os.getenv("DB_WAIT_BACKOFF_MAX", "2.0"))
+
 logger = logging.getLogger("rate_limiter")
+startup_logger = logging.getLogger("startup")
 if not logger.handlers:
     logging.basicConfig(level=logging.INFO)
 
@@ -77,11 +89,16 @@ def sitemap():
 async def correlation_id_middleware(request: Request, call_next):
     cid = request.headers.get("X-Correlation-ID") or str(uuid4())
     request.state.correlation_id = cid
+    # SQL-запросы обработчика считаются в stats (см. app.db_metrics)
+    stats, token = db_metrics.begin_request(cid)
     try:
         response = await call_next(request)
-    except Exception:
-        raise
+    finally:
+        db_metrics.end_request(token)
     response.headers["X-Correlation-ID"] = cid
+    if db_metrics.DB_DEBUG_HEADERS:
+        response.headers["X-DB-Queries"] = str(stats.count)
+        response.headers["X-DB-Time"] = f"{stats.total_ms:.2f}"
     return response
 
 
@@ -379,38 +396,192 @@ app.add_middleware(
 )
 
 
-def wait_for_db():
-    max_retries = 30
-    retries = 0
+def _profile_token_ok(request: Request) -> bool:
+    token = request.headers.get(profiling.PROFILE_HEADER)
+    return bool(token) and hmac.compare_digest(
+        token.encode(), profiling.PROFILING_SECRET.encode()
+    )
+
+
+async def profiling_middleware(request: Request, call_next):
+    # Чтение профилей (с тем же заголовком) само не профилируется
+    internal = request.url.path.startswith("/internal/profiles")
+    if internal or not _profile_token_ok(request):
+        return await call_next(request)
+    # Уже идет профилирование другого запроса: этот выполняем как обычно
+    if not profiling.profiling_lock.acquire(blocking=False):
+        response = await call_next(request)
+        response.headers["X-Profile"] = "busy"
+        return response
+    sampler = profiling.StackSampler()
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        response = await call_next(request)
+    finally:
+        sampler.stop()
+        profiling.profiling_lock.release()
+    cid = response.headers.get("X-Correlation-ID") or str(uuid4())
+    profiling.profiles.add(
+        cid, profiling.build_profile(sampler, request, response, cid, started)
+    )
+    response.headers["X-Profile"] = f"/internal/profiles/{cid}"
+    return response
+
+
+async def list_profiles(request: Request):
+    if not _profile_token_ok(request):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return profiling.profiles.summaries()
+
+
+async def get_profile(correlation_id: str, request: Request):
+    """Collapsed stacks профиля — вход для flamegraph.pl / speedscope"""
+    profile = profiling.profiles.get(correlation_id)
+    if not _profile_token_ok(request) or profile is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(profile["collapsed"])
+
+
+def install_profiling(target: FastAPI):
+    """
+    Подключает профилирование по заголовку X-Profile-Token. Middleware внешний
+    (добавлен последним), поэтому в профиль попадают и остальные middleware.
+    """
+    target.middleware("http")(profiling_middleware)
+    target.add_api_route("/internal/profiles", list_profiles, include_in_schema=False)
+    target.add_api_route(
+        "/internal/profiles/{correlation_id}", get_profile, include_in_schema=False
+    )
+
+
+# Выключенное профилирование не стоит ничего: middleware просто не регистрируется
+if profiling.PROFILING_ENABLED:
+    if profiling.PROFILING_SECRET:
+        install_profiling(app)
+    else:
+        startup_logger.warning("PROFILING_ENABLED set without PROFILING_SECRET")
+
+
+def _probe_db():
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+    finally:
+        db.close()
+
+
+async def wait_for_db():
+    deadline = time.monotonic() + DB_WAIT_TIMEOUT
+    attempt = 0
 
-    while retries < max_retries:
+    while True:
         try:
-            db = SessionLocal()
-            db.execute(text("SELECT 1"))
-            db.close()
+            # Синхронный драйвер — в пуле потоков, чтобы не блокировать event loop
+            await asyncio.to_thread(_probe_db)
             return True
         except OperationalError:
-            retries += 1
-            print(f"База данных недоступна, попытка {retries} из {max_retries}")
-            time.sleep(2)
-
-    return False
+            attempt += 1
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            delay = min(
+                DB_WAIT_BACKOFF_MAX, DB_WAIT_BACKOFF_BASE * (2 ** (attempt - 1))
+            )
+            # Джиттер, чтобы поды не долбили БД синхронно
+            delay = min(remaining, random.uniform(delay / 2, delay))
+            startup_logger.info(
+                "База данных недоступна, попытка %s, повтор через %.2f с",
+                attempt,
+                delay,
+            )
+            await asyncio.sleep(delay)
+
+
+def _add_missing_columns(bind):
+    """ALTER TABLE ADD COLUMN для новых колонок (у NOT NULL должен быть server_default)"""
+    for table in models.Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspect(bind).get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = CreateColumn(column).compile(dialect=bind.dialect)
+            try:
+                with bind.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+            except (OperationalError, ProgrammingError):
+                # Параллельный воркер успел добавить колонку — это не ошибка
+                columns = {c["name"] for c in inspect(bind).get_columns(table.name)}
+                if column.name not in columns:
+                    raise
+
+
+def ensure_schema(bind=engine) -> bool:
+    """Выполняет DDL, только если версия схемы в БД отстает. True — если был DDL"""
+    try:
+        with bind.connect() as conn:
+            current = conn.execute(
+                text("SELECT version FROM schema_version WHERE id = 1")
+            ).scalar()
+    except (OperationalError, ProgrammingError):
+        # Таблицы версий еще нет
+        current = None
+    if current == models.SCHEMA_VERSION:
+        return False
+
+    models.Base.metadata.create_all(bind=bind)
+    # create_all не трогает существующие таблицы: новые колонки и индексы — сами
+    _add_missing_columns(bind)
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+    # Один UPSERT (SQLite 3.24+, Postgres): воркеры, стартующие одновременно, не
+    # гоняются, и версия никогда не откатывается назад
+    with bind.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO schema_version (id, version) VALUES (1, :v) "
+                "ON CONFLICT (id) DO UPDATE SET version = excluded.version "
+                "WHERE schema_version.version < excluded.version"
+            ),
+            {"v": models.SCHEMA_VERSION},
+        )
+    return True
 
 
 # Инициализация БД при старте
 @app.on_event("startup")
 async def startup():
-    if wait_for_db():
-        models.Base.metadata.create_all(bind=engine)
-        print("База данных готова и таблицы созданы")
+    timings = {"imports": (_IMPORTS_DONE - IMPORT_STARTED) * 1000}
+
+    t0 = time.perf_counter()
+    db_ready = await wait_for_db()
+    timings["db_wait"] = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    if db_ready:
+        if await asyncio.to_thread(ensure_schema):
+            startup_logger.info("База данных готова, схема обновлена")
+        else:
+            startup_logger.info("База данных готова, схема актуальна")
     else:
-        print("Не удалось подключиться к базе данных")
-    # Инициализация безопасного HTTP‑клиента
-    app.state.http_client = SafeHttpClient()
+        startup_logger.error("Не удалось подключиться к базе данных")
+    timings["schema"] = (time.perf_counter() - t0) * 1000
+
+    # Безопасный HTTP‑клиент (и httpx) создается лениво при первом внешнем вызове,
+    # см. app.http_client.injected_get_http_client
+    await webhooks.dispatcher.start()
+
+    app.state.startup_timings = {k: round(v, 1) for k, v in timings.items()}
+    startup_logger.info(
+        "Startup timings (ms): %s",
+        " ".join(f"{k}={v}" for k, v in app.state.startup_timings.items()),
+    )
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    await webhooks.dispatcher.stop()
     client = getattr(app.state, "http_client", None)
     if client:
         await client.aclose()
@@ -419,3 +590,4 @@ async def shutdown():
 # api пути
 app.include_router(ideas.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
+app.include_router(webhooks_router.router, prefix="/api")
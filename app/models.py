@@ -1,9 +1,20 @@
-from sqlalchemy import Boolean, Column, Enum, ForeignKey, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, Enum, ForeignKey, Integer, String
 from sqlalchemy.orm import relationship
+from sqlalchemy.schema import Index
 
 from app.database import Base
 from app.domain import VoteType
 
+# Увеличивать при любом изменении таблиц/индексов: иначе старт пропустит DDL
+SCHEMA_VERSION = 4
+
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+
 
 class User(Base):
     __tablename__ = "users"
@@ -13,6 +24,8 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
+    # Увеличивается при отзыве токенов: токены со старой версией перестают работать
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     ideas = relationship("Idea", back_populates="owner")
     votes = relationship("Vote", back_populates="user")
@@ -25,10 +38,15 @@ class Idea(Base):
     title = Column(String, index=True)
     description = Column(String)
     owner_id = Column(Integer, ForeignKey("users.id"))
+    # Растет при изменении идеи (ETag в GET /ideas/{id}); голоса строку не трогают
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     owner = relationship("User", back_populates="ideas")
     votes = relationship("Vote", back_populates="idea")
 
+    # Идеи пользователя постранично (keyset по id): фильтр и порядок из индекса
+    __table_args__ = (Index("ix_ideas_owner_id_id", "owner_id", "id"),)
+
 
 class Vote(Base):
     __tablename__ = "votes"
@@ -40,3 +58,47 @@ class Vote(Base):
 
     user = relationship("User", back_populates="votes")
     idea = relationship("Idea", back_populates="votes")
+
+    __table_args__ = (
+        # Голоса пользователя постранично (keyset по id)
+        Index("ix_votes_user_id_id", "user_id", "id"),
+        # Подсчет голосов идеи по значению без чтения строк таблицы
+        Index("ix_votes_idea_id_value", "idea_id", "value"),
+    )
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Храним только HMAC от токена, сам токен знает лишь клиент
+    token_hash = Column(String, unique=True, index=True, nullable=False)
+    # Все токены одной цепочки ротации; при повторном использовании отзываем всю цепочку
+    family_id = Column(String, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    used = Column(Boolean, default=False, nullable=False)
+    revoked = Column(Boolean, default=False, nullable=False)
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String, unique=True, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # После истечения токена запись больше не нужна и вычищается
+    expires_at = Column(DateTime, index=True, nullable=False)
+
+
+class WebhookSubscription(Base):
+    __tablename__ = "webhook_subscriptions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    url = Column(String, nullable=False)
+    # Секрет для HMAC-подписи доставок; нужен в открытом виде, чтобы подписывать
+    secret = Column(String, nullable=False)
+    # Типы событий через запятую, "*" — все
+    events = Column(String, nullable=False, default="*")
+    is_active = Column(Boolean, default=True, nullable=False)
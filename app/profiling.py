@@ -0,0 +1,144 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Профилирование отдельных запросов (staging): выключено по умолчанию, и тогда
+# middleware вообще не регистрируется в app.main
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Значение заголовка X-Profile-Token, включающее профилирование запроса
+PROFILING_SECRET = os.getenv("PROFILING_SECRET", "")
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "2"))
+PROFILING_MAX_RESULTS = int(os.getenv("PROFILING_MAX_RESULTS", "50"))
+
+PROFILE_HEADER = "X-Profile-Token"
+
+# Листовые кадры простаивающих потоков: event loop в select, воркеры пула в wait
+_IDLE_LEAVES = {("selectors.py", "select"), ("threading.py", "wait")}
+
+
+def _short_path(filename: str) -> str:
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    cwd = os.getcwd() + os.sep
+    if filename.startswith(cwd):
+        return filename[len(cwd) :]
+    return os.path.basename(filename)
+
+
+class StackSampler:
+    """
+    Сэмплирующий профайлер: фоновый поток раз в interval снимает стеки всех
+    потоков процесса (sys._current_frames) и считает одинаковые стеки.
+    Видит и event loop, и пул потоков, где FastAPI выполняет sync-обработчики.
+    Запросы, идущие параллельно с профилируемым, тоже попадают в выборку.
+    """
+
+    def __init__(self, interval: float = PROFILING_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._labels: Dict[Any, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = (
+                f"{code.co_name} ({_short_path(code.co_filename)}:"
+                f"{code.co_firstlineno})"
+            )
+        return label
+
+    def sample(self):
+        me = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[";".join(stack)] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        """Формат collapsed stacks (flamegraph.pl, speedscope, inferno)"""
+        return "".join(f"{stack} {n}\n" for stack, n in sorted(self.stacks.items()))
+
+
+class ProfileStore:
+    """Последние профили по X-Correlation-ID (LRU)"""
+
+    def __init__(self, max_entries: int = PROFILING_MAX_RESULTS):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, correlation_id: str, profile: Dict[str, Any]):
+        with self._lock:
+            self._items[correlation_id] = profile
+            self._items.move_to_end(correlation_id)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def get(self, correlation_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._items.get(correlation_id)
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            profiles = list(self._items.values())
+        return [
+            {k: v for k, v in p.items() if k != "collapsed"} for p in reversed(profiles)
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+profiles = ProfileStore()
+# Профилируем по одному запросу за раз: стеки параллельных профилей смешались бы
+profiling_lock = threading.Lock()
+
+
+def build_profile(
+    sampler: StackSampler, request, response, correlation_id: str, started: float
+):
+    return {
+        "correlation_id": correlation_id,
+        "method": request.method,
+        "path": request.url.path,
+        "status": response.status_code,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "interval_ms": round(sampler.interval * 1000, 3),
+        "samples": sampler.samples,
+        "created_at": time.time(),
+        "collapsed": sampler.collapsed(),
+    }
@@ -0,0 +1,140 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.crud import crud_tokens
+
+# Денайлист отозванных jti: Bloom-фильтр в памяти + подтверждение в БД
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+REVOCATION_BLOOM_FP_RATE = float(os.getenv("REVOCATION_BLOOM_FP_RATE", "0.01"))
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "10"))
+# Автоинкрементные id коммитятся не по порядку: меньший id может появиться после
+# большего. Инкрементальная синхронизация перечитывает столько последних id
+REVOCATION_SYNC_OVERLAP_IDS = int(os.getenv("REVOCATION_SYNC_OVERLAP_IDS", "1000"))
+# Полная пересборка выкидывает из фильтра истекшие jti
+REVOCATION_REBUILD_SECONDS = float(os.getenv("REVOCATION_REBUILD_SECONDS", "600"))
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        # Двойное хэширование: k позиций из одного blake2b
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key)
+        )
+
+
+class RevocationList:
+    def __init__(self, capacity: int, fp_rate: float):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self._bloom = BloomFilter(capacity, fp_rate)
+        self._last_id = 0
+        self._synced_at = 0.0
+        self._rebuilt_at = 0.0
+        self._lock = threading.Lock()
+        # Метрики: сколько проверок отсекли без БД и сколько ложных срабатываний
+        self.bloom_negatives = 0
+        self.db_checks = 0
+        self.false_positives = 0
+
+    def _now(self) -> float:
+        return time.time()
+
+    def _rebuild(self, db: Session):
+        now = datetime.utcnow()
+        crud_tokens.prune_revoked(db, now)
+        crud_tokens.prune_refresh_tokens(db, now)
+        bloom = BloomFilter(self.capacity, self.fp_rate)
+        last_id = 0
+        for row_id, jti in crud_tokens.get_revoked_since(db, 0, now):
+            bloom.add(jti)
+            last_id = max(last_id, row_id)
+        self._bloom = bloom
+        self._last_id = last_id
+        self._rebuilt_at = self._now()
+
+    def sync(self, db: Session, force: bool = False):
+        """Подтягивает jti, отозванные другими воркерами"""
+        now = self._now()
+        if not force and now - self._synced_at < REVOCATION_SYNC_SECONDS:
+            return
+        # Синхронизирует один поток, остальные работают со старым фильтром
+        if not self._lock.acquire(blocking=force):
+            return
+        try:
+            overfull = self._bloom.count > self.capacity
+            if (
+                force
+                or overfull
+                or now - self._rebuilt_at >= REVOCATION_REBUILD_SECONDS
+            ):
+                self._rebuild(db)
+            else:
+                since = max(0, self._last_id - REVOCATION_SYNC_OVERLAP_IDS)
+                for row_id, jti in crud_tokens.get_revoked_since(
+                    db, since, datetime.utcnow()
+                ):
+                    # Окно перекрывается с прошлой синхронизацией: не раздуваем count
+                    if jti not in self._bloom:
+                        self._bloom.add(jti)
+                    self._last_id = max(self._last_id, row_id)
+            self._synced_at = now
+        finally:
+            self._lock.release()
+
+    def is_revoked(self, db: Session, jti: str) -> bool:
+        self.sync(db)
+        if jti not in self._bloom:
+            self.bloom_negatives += 1
+            return False
+        self.db_checks += 1
+        revoked = crud_tokens.is_jti_revoked(db, jti)
+        if not revoked:
+            self.false_positives += 1
+        return revoked
+
+    def revoke(self, db: Session, jti: str, user_id: int, exp: Optional[float]):
+        expires_at = (
+            datetime.utcfromtimestamp(exp) if exp is not None else datetime.utcnow()
+        )
+        crud_tokens.revoke_jti(db, jti=jti, user_id=user_id, expires_at=expires_at)
+        # В своем воркере — сразу, в остальных — на следующей синхронизации
+        self._bloom.add(jti)
+
+    def reset(self):
+        with self._lock:
+            self._bloom = BloomFilter(self.capacity, self.fp_rate)
+            self._last_id = 0
+            self._synced_at = 0.0
+            self._rebuilt_at = 0.0
+            self.bloom_negatives = 0
+            self.db_checks = 0
+            self.false_positives = 0
+
+
+revocation_list = RevocationList(REVOCATION_BLOOM_CAPACITY, REVOCATION_BLOOM_FP_RATE)
@@ -1,13 +1,17 @@
+import functools
+import json
+import math
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app import models, schemas
-from app.auth import get_current_user
+from app import schemas
+from app.auth import Principal, get_current_user
+from app.circuit_breaker import CircuitOpenError
 from app.crud import crud_ideas
-from app.database import get_db
-from app.http_client import SafeHttpClient, injected_get_http_client
+from app.database import get_db, get_read_db, replicas
 
 router = APIRouter(tags=["ideas"])
 
@@ -15,6 +19,7 @@ router = APIRouter(tags=["ideas"])
 _MAX_TITLE_LEN = 120
 _MAX_DESC_LEN = 2000
 _MIN_TITLE_LEN = 3
+_PING_SNIPPET_CHARS = 200
 
 
 def _clean_str(v: str) -> str:
@@ -45,41 +50,110 @@ def _validate_idea_input(idea):
     return idea
 
 
+async def _get_http_client(request: Request):
+    # httpx (~150 мс импорта) грузится только при первом внешнем вызове
+    from app.http_client import injected_get_http_client
+
+    return await injected_get_http_client(request)
+
+
 @router.get("/ideas", response_model=List[schemas.IdeaWithScore])
 def read_ideas_with_scores(
     skip: int = Query(0, ge=0, le=1000),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """Получение списка идей с рейтингом"""
     return crud_ideas.get_ideas_with_scores(db, skip=skip, limit=limit)
 
 
-@router.get("/ideas/{idea_id}", response_model=schemas.Idea)
-def read_idea(idea_id: int, db: Session = Depends(get_db)):
-    """Получение конкретной идеи по ID"""
-    db_idea = crud_ideas.get_idea(db, idea_id=idea_id)
-    if db_idea is None:
+def _idea_etag(idea_id: int, version: int, counts=None) -> str:
+    # Со scores в ETag входят сами счетчики: голос не обновляет строку идеи
+    suffix = "-s{}.{}.{}".format(*counts) if counts is not None else ""
+    return f'W/"idea-{idea_id}-v{version}{suffix}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = {t.strip() for t in if_none_match.split(",")}
+    # Слабое сравнение: W/"x" и "x" совпадают
+    return "*" in tags or etag in tags or etag[2:] in tags
+
+
+@router.get(
+    "/ideas/{idea_id}",
+    response_model=schemas.IdeaDetail,
+    response_model_exclude_none=True,
+)
+def read_idea(
+    idea_id: int,
+    request: Request,
+    response: Response,
+    scores: bool = Query(False, description="голоса и счет"),
+    rank: bool = Query(False, description="место в рейтинге (включает scores)"),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Получение конкретной идеи по ID. Ответ без rank кэшируется по ETag: версия
+    идеи (меняется при правке), а со scores — еще и счетчики голосов. Без
+    scores If-None-Match проверяется одним запросом версии, со scores — тем же
+    запросом, что строит ответ (тело не отдается). Место в рейтинге зависит
+    от голосов за другие идеи, поэтому с rank=true ETag нет.
+    """
+    scores = scores or rank
+    if_none_match = None if rank else request.headers.get("If-None-Match")
+    if if_none_match and not scores:
+        version = crud_ideas.get_idea_version(db, idea_id)
+        if version is not None:
+            etag = _idea_etag(idea_id, version)
+            if _etag_matches(if_none_match, etag):
+                return Response(
+                    status_code=304,
+                    headers={"ETag": etag, "Cache-Control": "no-cache"},
+                )
+
+    if scores:
+        idea = crud_ideas.get_idea_with_scores(db, idea_id, with_rank=rank)
+        if idea is not None:
+            counts = (idea["up_votes"], idea["down_votes"], idea["abstain_votes"])
+            etag = _idea_etag(idea_id, idea["version"], counts)
+    else:
+        idea = crud_ideas.get_idea(db, idea_id=idea_id)
+        if idea is not None:
+            etag = _idea_etag(idea_id, idea.version)
+    if idea is None:
         raise HTTPException(status_code=404, detail="Идея не найдена")
-    return db_idea
+    if rank:
+        return idea
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(
+            status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"}
+        )
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return idea
 
 
 @router.post("/ideas", response_model=schemas.Idea, status_code=status.HTTP_201_CREATED)
 def create_idea(
     idea: schemas.IdeaCreate,
-    current_user: models.User = Depends(get_current_user),
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     idea = _validate_idea_input(idea)
     """Создание новой идеи"""
-    return crud_ideas.create_idea(db=db, idea=idea, owner_id=current_user.id)
+    db_idea = crud_ideas.create_idea(db=db, idea=idea, owner_id=current_user.id)
+    # Следующие чтения автора — из основной БД, пока реплики догоняют
+    replicas.note_write(response)
+    return db_idea
 
 
 @router.put("/ideas/{idea_id}", response_model=schemas.Idea)
 def update_idea(
     idea_id: int,
     idea: schemas.IdeaCreate,
-    current_user: models.User = Depends(get_current_user),
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     idea = _validate_idea_input(idea)
@@ -91,13 +165,15 @@ def update_idea(
         raise HTTPException(
             status_code=404, detail="Идея не найдена или вы не владелец"
         )
+    replicas.note_write(response)
     return db_idea
 
 
 @router.delete("/ideas/{idea_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_idea(
     idea_id: int,
-    current_user: models.User = Depends(get_current_user),
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Удаление идеи"""
@@ -108,13 +184,15 @@ def delete_idea(
         raise HTTPException(
             status_code=404, detail="Идея не найдена или вы не владелец"
         )
+    replicas.note_write(response)
 
 
 @router.post("/ideas/{idea_id}/vote", response_model=dict)
 def vote_for_idea(
     idea_id: int,
     vote: schemas.VoteCreate,
-    current_user: models.User = Depends(get_current_user),
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Голосование за идею. Варианты: 'за', 'против', 'воздержаться'."""
@@ -125,26 +203,102 @@ def vote_for_idea(
     crud_ideas.vote_idea(
         db=db, idea_id=idea_id, user_id=current_user.id, vote_value=vote.value
     )
+    replicas.note_write(response)
     return {"status": "success", "message": f"Голос '{vote.value.value}' учтен"}
 
 
 @router.get("/external/ping")
 async def external_ping(
+    request: Request,
     url: str = Query(..., description="Полный URL для проверки"),
-    client: SafeHttpClient = Depends(injected_get_http_client),
+    client=Depends(_get_http_client),
 ):
     """
     Демонстрационный вызов безопасного HTTP‑клиента.
-    Возвращает статус и первые байты тела.
+    Возвращает статус, начало тела и его размер (до лимита потокового чтения).
     """
+    from app.http_client import deadline_from_headers
+
     try:
-        resp = await client.request("GET", url, headers={"Accept": "text/plain"})
+        # Тело читаем потоком: нужны только начало и размер
+        body = await client.stream_prefix(
+            "GET",
+            url,
+            headers={"Accept": "text/plain"},
+            prefix_bytes=_PING_SNIPPET_CHARS * 4,  # до 4 байт на символ UTF-8
+            # Бюджет времени вызывающего клиента, если он его передал
+            deadline=deadline_from_headers(request.headers),
+        )
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Внешний хост временно недоступен",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Ошибка внешнего запроса: {e}")
-    text_snippet = resp.text[:200] if resp.text else ""
+    return _ping_payload(url, body)
+
+
+def _ping_payload(url: str, body) -> dict:
     return {
         "url": url,
-        "status_code": resp.status_code,
-        "snippet": text_snippet,
-        "length": len(resp.content),
+        "status_code": body.status_code,
+        "snippet": body.text_prefix(_PING_SNIPPET_CHARS),
+        "length": body.bytes_read,
+        "truncated": body.truncated,
     }
+
+
+@router.post("/external/ping/batch")
+async def external_ping_batch(
+    request: Request,
+    payload: schemas.PingBatchRequest,
+    client=Depends(_get_http_client),
+):
+    """
+    Проверка пакета URL. Результаты отдаются потоком (NDJSON) по мере
+    готовности, поле index — позиция URL во входном списке.
+    """
+    from app.http_client import deadline_from_headers
+
+    ping = functools.partial(
+        client.stream_prefix,
+        headers={"Accept": "text/plain"},
+        prefix_bytes=_PING_SNIPPET_CHARS * 4,
+    )
+
+    async def lines():
+        async for result in client.map(
+            payload.urls, deadline=deadline_from_headers(request.headers), call=ping
+        ):
+            if result.ok:
+                item = _ping_payload(result.url, result.response)
+            elif isinstance(result.error, CircuitOpenError):
+                item = {"url": result.url, "error": "circuit_open"}
+            else:
+                item = {"url": result.url, "error": str(result.error) or "error"}
+            item["index"] = result.index
+            item["elapsed_ms"] = round(result.elapsed * 1000, 1)
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/external/breakers")
+def external_breakers(
+    request: Request, current_user: Principal = Depends(get_current_user)
+):
+    """Состояние circuit breaker'ов внешнего HTTP‑клиента по хостам"""
+    client = getattr(request.app.state, "http_client", None)
+    return client.breaker_states() if client is not None else {}
+
+
+@router.get("/external/cache")
+def external_cache(
+    request: Request, current_user: Principal = Depends(get_current_user)
+):
+    """Метрики кэша ответов внешнего HTTP‑клиента (hit ratio, сэкономленные байты)"""
+    client = getattr(request.app.state, "http_client", None)
+    stats = client.cache_stats() if client is not None else None
+    return stats or {"enabled": False}
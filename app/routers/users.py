@@ -3,16 +3,26 @@ import math
 import os
 import re
 import time
-from typing import Dict
+from typing import Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from app import schemas
-from app.auth import create_access_token, get_current_user
-from app.crud import crud_users
+from app.auth import (
+    Principal,
+    create_access_token,
+    decode_access_token,
+    get_current_user,
+    issue_refresh_token,
+    revoke_refresh_family,
+    rotate_refresh_token,
+    token_claims,
+)
+from app.crud import crud_ideas, crud_users
 from app.database import get_db
+from app.revocation import revocation_list
 
 router = APIRouter(tags=["users"])
 
@@ -176,9 +186,7 @@ def login_for_access_token(
     response.headers["X-RateLimit-Reset"] = str(reset_ts)
 
     user = crud_users.get_user_by_username(db, username=form_data.username)
-    if not user or not crud_users.verify_password(
-        form_data.password, user.hashed_password
-    ):
+    if not user or not crud_users.verify_and_rehash(db, user, form_data.password):
         # В 401 тоже добавим заголовки лимита (и WWW-Authenticate)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -190,10 +198,101 @@ def login_for_access_token(
                 "X-RateLimit-Reset": str(reset_ts),
             },
         )
-    access_token = create_access_token(data={"sub": user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
+    access_token = create_access_token(data=token_claims(user))
+    refresh_token = issue_refresh_token(db, user.id)
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+    }
+
+
+@router.post("/token/refresh")
+def refresh_access_token(
+    body: schemas.RefreshTokenRequest, db: Session = Depends(get_db)
+):
+    """Продление сессии по refresh-токену без проверки пароля (ротация)"""
+    tokens = rotate_refresh_token(db, body.refresh_token)
+    if tokens is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Недействительный refresh-токен",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    access_token, refresh_token = tokens
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+    }
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    body: Optional[schemas.LogoutRequest] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Отзыв текущего access-токена (и цепочки refresh-токена, если передан)"""
+    if current_user.jti:
+        revocation_list.revoke(db, current_user.jti, current_user.id, current_user.exp)
+    if body is not None and body.refresh_token:
+        revoke_refresh_family(db, body.refresh_token, current_user.id)
+
+
+@router.post("/token/revoke", status_code=status.HTTP_204_NO_CONTENT)
+def revoke_token(
+    body: schemas.TokenRevokeRequest,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Отзыв другого access-токена текущего пользователя (например, с другого устройства)"""
+    payload = decode_access_token(body.token)
+    # Невалидный или истекший токен отзывать незачем
+    if payload is None or not payload.get("jti"):
+        return
+    if payload.get("uid") != current_user.id:
+        raise HTTPException(
+            status_code=403, detail="Токен принадлежит другому пользователю"
+        )
+    revocation_list.revoke(db, payload["jti"], current_user.id, payload.get("exp"))
 
 
 @router.get("/users/me")
 def read_users_me(current_user=Depends(get_current_user)):
     return {"user_id": str(current_user.id), "username": current_user.username}
+
+
+def _page(rows, limit: int):
+    # Запрашиваем limit + 1 строку: лишняя говорит, что есть следующая страница
+    items = rows[:limit]
+    next_cursor = items[-1].id if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/users/me/ideas", response_model=schemas.IdeaPage)
+def read_my_ideas(
+    cursor: Optional[int] = Query(None, ge=1),
+    limit: int = Query(50, ge=1, le=100),
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Идеи текущего пользователя, от новых к старым"""
+    rows = crud_ideas.get_user_ideas(
+        db, current_user.id, before_id=cursor, limit=limit + 1
+    )
+    return _page(rows, limit)
+
+
+@router.get("/users/me/votes", response_model=schemas.UserVotePage)
+def read_my_votes(
+    cursor: Optional[int] = Query(None, ge=1),
+    limit: int = Query(50, ge=1, le=100),
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Голоса текущего пользователя с названиями идей, от новых к старым"""
+    rows = crud_ideas.get_user_votes(
+        db, current_user.id, before_id=cursor, limit=limit + 1
+    )
+    return _page(rows, limit)
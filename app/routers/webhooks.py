@@ -0,0 +1,105 @@
+import os
+from typing import List
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app import schemas, webhooks
+from app.auth import Principal, get_current_user
+from app.crud import crud_webhooks
+from app.database import get_db
+
+router = APIRouter(tags=["webhooks"])
+
+WEBHOOK_MAX_PER_USER = int(os.getenv("WEBHOOK_MAX_PER_USER", "10"))
+_MAX_URL_LEN = 2048
+
+
+def _validate_webhook_input(payload: schemas.WebhookCreate):
+    parts = urlsplit(payload.url)
+    if (
+        parts.scheme not in ("http", "https")
+        or not parts.hostname
+        or len(payload.url) > _MAX_URL_LEN
+    ):
+        raise HTTPException(status_code=422, detail="Некорректный URL вебхука")
+    if not webhooks.WEBHOOK_ALLOW_PRIVATE_TARGETS:
+        try:
+            webhooks.check_target(payload.url)
+        except ValueError:
+            raise HTTPException(
+                status_code=422, detail="URL вебхука должен вести на публичный адрес"
+            )
+    unknown = set(payload.events) - set(webhooks.EVENT_TYPES) - {"*"}
+    if not payload.events or unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Допустимые события: {', '.join(webhooks.EVENT_TYPES)} или *",
+        )
+    return payload
+
+
+def _to_schema(sub, with_secret: bool = False):
+    data = {
+        "id": sub.id,
+        "url": sub.url,
+        "events": sub.events.split(","),
+        "is_active": sub.is_active,
+    }
+    if with_secret:
+        return schemas.WebhookCreated(**data, secret=sub.secret)
+    return schemas.Webhook(**data)
+
+
+@router.post(
+    "/webhooks",
+    response_model=schemas.WebhookCreated,
+    status_code=status.HTTP_201_CREATED,
+)
+def create_webhook(
+    payload: schemas.WebhookCreate,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Подписка на события идей; секрет подписи возвращается один раз"""
+    payload = _validate_webhook_input(payload)
+    if crud_webhooks.count_user_subscriptions(db, current_user.id) >= (
+        WEBHOOK_MAX_PER_USER
+    ):
+        raise HTTPException(status_code=409, detail="Слишком много подписок")
+    sub = crud_webhooks.create_subscription(
+        db, owner_id=current_user.id, url=payload.url, events=payload.events
+    )
+    webhooks.dispatcher.invalidate_subscriptions()
+    return _to_schema(sub, with_secret=True)
+
+
+@router.get("/webhooks", response_model=List[schemas.Webhook])
+def list_webhooks(
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Подписки текущего пользователя"""
+    return [
+        _to_schema(sub)
+        for sub in crud_webhooks.get_user_subscriptions(db, current_user.id)
+    ]
+
+
+@router.delete("/webhooks/{webhook_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_webhook(
+    webhook_id: int,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Удаление подписки"""
+    if not crud_webhooks.delete_subscription(db, webhook_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Подписка не найдена")
+    webhooks.dispatcher.invalidate_subscriptions()
+
+
+@router.get("/webhooks/stats")
+def webhook_stats(current_user: Principal = Depends(get_current_user)):
+    """Глубина очереди, схлопывания и задержка доставки вебхуков"""
+    return webhooks.dispatcher.stats()
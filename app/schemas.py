@@ -1,6 +1,6 @@
-from typing import List
+from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.domain import VoteType
 
@@ -46,6 +46,32 @@ class IdeaWithScore(Idea):
     abstain_votes: int
 
 
+class IdeaDetail(Idea):
+    # Заполняются с ?scores=true; rank — с ?rank=true
+    score: Optional[int] = None
+    up_votes: Optional[int] = None
+    down_votes: Optional[int] = None
+    abstain_votes: Optional[int] = None
+    rank: Optional[int] = None
+
+
+class IdeaPage(BaseModel):
+    items: List[Idea]
+    # id для следующей страницы (?cursor=...), None — страниц больше нет
+    next_cursor: Optional[int] = None
+
+
+class UserVote(VoteBase):
+    id: int
+    idea_id: int
+    idea_title: str
+
+
+class UserVotePage(BaseModel):
+    items: List[UserVote]
+    next_cursor: Optional[int] = None
+
+
 class UserBase(BaseModel):
     username: str
     email: str
@@ -62,3 +88,36 @@ class User(UserBase):
 
     class Config:
         from_attributes = True
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
+
+class TokenRevokeRequest(BaseModel):
+    token: str
+
+
+class PingBatchRequest(BaseModel):
+    urls: List[str] = Field(..., min_length=1, max_length=100)
+
+
+class WebhookCreate(BaseModel):
+    url: str
+    events: List[str] = ["*"]
+
+
+class Webhook(BaseModel):
+    id: int
+    url: str
+    events: List[str]
+    is_active: bool
+
+
+class WebhookCreated(Webhook):
+    # Секрет для проверки подписи отдается только при создании
+    secret: str
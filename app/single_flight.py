@@ -0,0 +1,47 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Склеивает одновременные вызовы с одним ключом: работа идет отдельной
+    задачей, которую ждут все вызывающие. Отмена одного из них (дедлайн,
+    отключившийся клиент) не задевает остальных; задача отменяется, только
+    когда ее перестали ждать все.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._tasks
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+            del self._waiters[key]
+
+    async def do(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(work())
+            self._tasks[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t: self._forget(key, t))
+            # Ошибку получат ждущие; если их не осталось — без warning в лог
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._tasks.get(key) is task and not task.done():
+                self._waiters[key] -= 1
+                if self._waiters[key] == 0:
+                    # Новые вызовы не должны попасть на отменяемую задачу
+                    self._forget(key, task)
+                    task.cancel()
+            raise
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+# Кэш проверенных токенов: экономит jwt.decode на каждый запрос
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_TOKEN_CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "30"))  # секунды
+# Как долго доверяем закэшированной версии токенов пользователя (отзыв/деактивация)
+AUTH_TOKEN_VERSION_TTL = float(os.getenv("AUTH_TOKEN_VERSION_TTL", "5"))  # секунды
+
+
+class VerifiedTokenCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # digest -> (expires_at, principal); порядок = LRU
+        self._items: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _now(self) -> float:
+        return time.time()
+
+    @staticmethod
+    def _digest(token: str) -> str:
+        # Храним не сам токен, а его хэш
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Any]:
+        key = self._digest(token)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, principal = item
+            if expires_at <= self._now():
+                del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return principal
+
+    def put(self, token: str, principal: Any, token_exp: Optional[float]):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        # Запись живет не дольше самого токена
+        expires_at = self._now() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, float(token_exp))
+        key = self._digest(token)
+        with self._lock:
+            self._items[key] = (expires_at, principal)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            stale = [k for k, (_, u) in self._items.items() if u.id == user_id]
+            for k in stale:
+                del self._items[k]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class TokenVersionCache:
+    """user_id -> (token_version, is_active) с коротким TTL"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items: "OrderedDict[int, tuple[float, int, bool]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _now(self) -> float:
+        return time.time()
+
+    def get(self, user_id: int) -> Optional[tuple[int, bool]]:
+        with self._lock:
+            item = self._items.get(user_id)
+            if item is None:
+                return None
+            expires_at, version, is_active = item
+            if expires_at <= self._now():
+                del self._items[user_id]
+                return None
+            self._items.move_to_end(user_id)
+            return version, is_active
+
+    def put(self, user_id: int, version: int, is_active: bool):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._items[user_id] = (self._now() + self.ttl, version, is_active)
+            self._items.move_to_end(user_id)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            self._items.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+token_cache = VerifiedTokenCache(AUTH_TOKEN_CACHE_SIZE, AUTH_TOKEN_CACHE_TTL)
+token_versions = TokenVersionCache(AUTH_TOKEN_CACHE_SIZE, AUTH_TOKEN_VERSION_TTL)
+
+
+def invalidate_user(user_id: int):
+    """Сбрасывает все локальные кэши пользователя (после отзыва/деактивации)"""
+    token_cache.invalidate_user(user_id)
+    token_versions.invalidate_user(user_id)
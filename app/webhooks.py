@@ -0,0 +1,402 @@
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+from uuid import uuid4
+
+from app.database import SessionLocal
+
+# Исходящие вебхуки: очередь в процессе, батчи и схлопывание по подписчику
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "50"))
+# Сколько ждать добора батча после первого события, секунды
+WEBHOOK_LINGER_SECONDS = float(os.getenv("WEBHOOK_LINGER_SECONDS", "1.0"))
+WEBHOOK_QUEUE_MAX = int(os.getenv("WEBHOOK_QUEUE_MAX", "10000"))
+WEBHOOK_SUBSCRIPTIONS_TTL = float(os.getenv("WEBHOOK_SUBSCRIPTIONS_TTL", "5"))
+# Общий дедлайн доставки одного батча (все ретраи)
+WEBHOOK_DELIVERY_DEADLINE = float(os.getenv("WEBHOOK_DELIVERY_DEADLINE", "10"))
+# Доставка на loopback/частные/link-local адреса (только для локальной разработки)
+WEBHOOK_ALLOW_PRIVATE_TARGETS = os.getenv(
+    "WEBHOOK_ALLOW_PRIVATE_TARGETS", "false"
+).lower() in ("1", "true", "yes")
+
+EVENT_TYPES = ("idea.created", "idea.updated", "idea.deleted", "idea.voted")
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+TIMESTAMP_HEADER = "X-Webhook-Timestamp"
+DELIVERY_HEADER = "X-Webhook-Id"
+
+_LATENCY_SAMPLES = 1000
+_STOP = object()
+
+logger = logging.getLogger("webhooks")
+
+
+def sign(secret: str, timestamp: str, body: bytes) -> str:
+    # Метка времени входит в подпись: получатель может отсечь повторы
+    mac = hmac.new(secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256)
+    return "sha256=" + mac.hexdigest()
+
+
+def is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def check_target(url: str):
+    """
+    ValueError, если хост URL не резолвится или хотя бы один его адрес не
+    публичный (loopback, частные сети, link-local, метаданные облака...)
+    """
+    parts = urlsplit(url)
+    if not parts.hostname:
+        raise ValueError("URL without a host")
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    try:
+        infos = socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as exc:
+        raise ValueError(f"cannot resolve {parts.hostname}") from exc
+    addresses = {info[4][0] for info in infos}
+    blocked = sorted(a for a in addresses if not is_public_address(a))
+    if not addresses or blocked:
+        raise ValueError(f"{parts.hostname} resolves to a non-public address")
+
+
+class WebhookEvent:
+    __slots__ = ("id", "type", "data", "key", "occurred_at", "published_at", "merged")
+
+    def __init__(self, event_type: str, data: Dict[str, Any], key):
+        self.id = str(uuid4())
+        self.type = event_type
+        self.data = data
+        # События с одинаковым ключом в одном батче схлопываются в последнее
+        self.key = key
+        self.occurred_at = datetime.now(timezone.utc).isoformat()
+        self.published_at = time.monotonic()
+        self.merged = 1
+
+    def replacing(self, previous: "WebhookEvent") -> "WebhookEvent":
+        """
+        Копия события, заменяющая previous в батче. Копия — потому что одно
+        событие лежит в буферах нескольких подписчиков. Задержку доставки
+        считаем от первого схлопнутого события.
+        """
+        merged = WebhookEvent.__new__(WebhookEvent)
+        for attr in self.__slots__:
+            setattr(merged, attr, getattr(self, attr))
+        merged.published_at = previous.published_at
+        merged.merged = previous.merged + 1
+        return merged
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "occurred_at": self.occurred_at,
+            "data": self.data,
+            "coalesced": self.merged,
+        }
+
+
+class Subscription:
+    __slots__ = ("id", "url", "secret", "events")
+
+    def __init__(self, id: int, url: str, secret: str, events: str):
+        self.id = id
+        self.url = url
+        self.secret = secret
+        self.events = frozenset(e for e in events.split(",") if e)
+
+    def wants(self, event_type: str) -> bool:
+        return "*" in self.events or event_type in self.events
+
+
+class _Outbox:
+    """Буфер событий одного подписчика и его задача-отправитель"""
+
+    __slots__ = ("sub", "events", "first_at", "full", "task")
+
+    def __init__(self, sub: Subscription):
+        self.sub = sub
+        self.events: "OrderedDict[Any, WebhookEvent]" = OrderedDict()
+        self.first_at = 0.0
+        self.full = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+
+def _load_subscriptions_from_db(session_factory) -> List[Subscription]:
+    from app.crud import crud_webhooks
+
+    db = session_factory()
+    try:
+        return [
+            Subscription(*row) for row in crud_webhooks.get_active_subscriptions(db)
+        ]
+    finally:
+        db.close()
+
+
+class WebhookDispatcher:
+    """
+    publish() потокобезопасен и не блокирует: событие кладется в очередь
+    event loop'а, а при переполнении или остановленном диспетчере
+    отбрасывается (считается в dropped). Доставка идет в фоне через
+    SafeHttpClient, по одной отправке на подписчика за раз.
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_size: int = WEBHOOK_BATCH_SIZE,
+        linger: float = WEBHOOK_LINGER_SECONDS,
+        queue_max: int = WEBHOOK_QUEUE_MAX,
+        client=None,
+        load_subscriptions: Optional[Callable[[], Awaitable[List]]] = None,
+        allow_private_targets: bool = WEBHOOK_ALLOW_PRIVATE_TARGETS,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.allow_private_targets = allow_private_targets
+        self.linger = linger
+        self.queue_max = queue_max
+        self.session_factory = SessionLocal
+        self._client = client
+        self._own_client = client is None
+        self._load = load_subscriptions
+        self._subs: List[Subscription] = []
+        self._subs_loaded_at: Optional[float] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._outboxes: Dict[int, _Outbox] = {}
+        self._closing = False
+        # Событий в очереди (включая еще не переданные в loop из других потоков)
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=_LATENCY_SAMPLES)
+        self.published = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.delivered_events = 0
+        self.delivered_batches = 0
+        self.failed_batches = 0
+
+    def publish(self, event_type: str, data: Dict[str, Any], key=None):
+        loop, queue = self._loop, self._queue
+        if loop is None or queue is None or self._closing or loop.is_closed():
+            self.dropped += 1
+            return
+        with self._pending_lock:
+            if self._pending >= self.queue_max:
+                self.dropped += 1
+                return
+            self._pending += 1
+            self.published += 1
+        event = WebhookEvent(event_type, data, key or (event_type, uuid4().hex))
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+        except RuntimeError:  # loop уже закрыт
+            with self._pending_lock:
+                self._pending -= 1
+                self.published -= 1
+                self.dropped += 1
+
+    async def start(self):
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._pending = 0
+        self._outboxes = {}
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 5.0):
+        """Останавливает прием и пытается дослать накопленное за timeout"""
+        if self._task is None:
+            return
+        self._closing = True
+        self._queue.put_nowait(_STOP)
+        senders = []
+        try:
+            async with asyncio.timeout(timeout):
+                await self._task
+                for outbox in self._outboxes.values():
+                    outbox.full.set()  # досылаем без ожидания добора батча
+                senders = [o.task for o in self._outboxes.values() if o.task]
+                await asyncio.gather(*senders, return_exceptions=True)
+        except TimeoutError:
+            logger.warning("Webhook dispatcher stopped with undelivered events")
+            for task in [self._task, *senders]:
+                task.cancel()
+        self._task = None
+        self._loop = None
+        if self._own_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def invalidate_subscriptions(self):
+        self._subs_loaded_at = None
+
+    async def _subscriptions(self) -> List[Subscription]:
+        now = time.monotonic()
+        if (
+            self._subs_loaded_at is None
+            or now - self._subs_loaded_at >= WEBHOOK_SUBSCRIPTIONS_TTL
+        ):
+            try:
+                if self._load is not None:
+                    self._subs = list(await self._load())
+                else:
+                    self._subs = await asyncio.to_thread(
+                        _load_subscriptions_from_db, self.session_factory
+                    )
+            except Exception:
+                # Оставляем прежний список, попробуем на следующем событии
+                logger.exception("Failed to load webhook subscriptions")
+            self._subs_loaded_at = now
+        return self._subs
+
+    async def _run(self):
+        while True:
+            event = await self._queue.get()
+            if event is _STOP:
+                return
+            with self._pending_lock:
+                self._pending -= 1
+            for sub in await self._subscriptions():
+                if sub.wants(event.type):
+                    self._enqueue(sub, event)
+
+    def _enqueue(self, sub: Subscription, event: WebhookEvent):
+        outbox = self._outboxes.get(sub.id)
+        if outbox is None:
+            outbox = self._outboxes[sub.id] = _Outbox(sub)
+        outbox.sub = sub  # URL/секрет могли обновиться
+        if not outbox.events:
+            outbox.first_at = time.monotonic()
+        previous = outbox.events.pop(event.key, None)
+        if previous is not None:
+            self.coalesced += 1
+            event = event.replacing(previous)
+        outbox.events[event.key] = event
+        if len(outbox.events) >= self.batch_size:
+            outbox.full.set()
+        if outbox.task is None or outbox.task.done():
+            outbox.task = asyncio.create_task(self._send_loop(outbox))
+
+    async def _send_loop(self, outbox: _Outbox):
+        while outbox.events:
+            wait = outbox.first_at + self.linger - time.monotonic()
+            if wait > 0 and not outbox.full.is_set() and not self._closing:
+                try:
+                    async with asyncio.timeout(wait):
+                        await outbox.full.wait()
+                except TimeoutError:
+                    pass
+            batch = []
+            while outbox.events and len(batch) < self.batch_size:
+                batch.append(outbox.events.popitem(last=False)[1])
+            if len(outbox.events) < self.batch_size and not self._closing:
+                outbox.full.clear()
+            outbox.first_at = time.monotonic()
+            await self._deliver(outbox.sub, batch)
+        if not self._closing:
+            self._outboxes.pop(outbox.sub.id, None)
+
+    async def _get_client(self):
+        if self._client is None:
+            from app.http_client import SafeHttpClient, build_async_client
+
+            # Адрес проверяется при каждом подключении, уже после резолва:
+            # DNS мог поменяться после подписки
+            address_filter = None if self.allow_private_targets else is_public_address
+            self._client = SafeHttpClient(
+                client=build_async_client(address_filter=address_filter)
+            )
+        return self._client
+
+    async def _deliver(self, sub: Subscription, batch: List[WebhookEvent]):
+        body = json.dumps(
+            {"subscription_id": sub.id, "events": [e.as_dict() for e in batch]},
+            ensure_ascii=False,
+        ).encode()
+        timestamp = str(int(time.time()))
+        delivery_id = str(uuid4())
+        headers = {
+            "Content-Type": "application/json",
+            DELIVERY_HEADER: delivery_id,
+            TIMESTAMP_HEADER: timestamp,
+            SIGNATURE_HEADER: sign(sub.secret, timestamp, body),
+        }
+        client = await self._get_client()
+        try:
+            # Повтор POST безопасен: получатель дедуплицирует по X-Webhook-Id
+            resp = await client.request(
+                "POST",
+                sub.url,
+                headers=headers,
+                content=body,
+                allowed_retry_methods=("POST",),
+                deadline=WEBHOOK_DELIVERY_DEADLINE,
+                correlation_id=delivery_id,
+            )
+            ok = resp.status_code < 300
+            reason = f"HTTP {resp.status_code}"
+        except Exception as exc:
+            ok, reason = False, repr(exc)
+        if not ok:
+            self.failed_batches += 1
+            logger.warning(
+                "Webhook delivery %s to subscription %s failed: %s",
+                delivery_id,
+                sub.id,
+                reason,
+            )
+            return
+        now = time.monotonic()
+        self.delivered_batches += 1
+        self.delivered_events += len(batch)
+        self._latencies.extend(now - e.published_at for e in batch)
+
+    def queue_depth(self) -> int:
+        return self._pending + sum(len(o.events) for o in list(self._outboxes.values()))
+
+    def stats(self) -> Dict[str, Any]:
+        samples = sorted(self._latencies)
+
+        def pct(p: float) -> float:
+            if not samples:
+                return 0.0
+            return round(
+                samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1
+            )
+
+        return {
+            "queue_depth": self.queue_depth(),
+            "published": self.published,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "delivered_events": self.delivered_events,
+            "delivered_batches": self.delivered_batches,
+            "failed_batches": self.failed_batches,
+            "latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "max": pct(1.0)},
+        }
+
+
+dispatcher = WebhookDispatcher()
+
+
+def publish(event_type: str, data: Dict[str, Any], key=None):
+    """Публикует событие для подписчиков; никогда не блокирует вызывающего"""
+    dispatcher.publish(event_type, data, key)
@@ -0,0 +1,141 @@
+"""Подбор параметров Argon2 под целевую задержку и бюджет памяти.
+
+Пример:
+    python -m scripts.calibrate_argon2 --target-ms 300 --memory-budget-mib 128
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+
+from app.crud.crud_users import build_pwd_context
+from scripts.stats import percentile
+
+try:  # на Windows модуля resource нет
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+_PASSWORD = "calibration-Pa55word!"
+
+
+def parse_grid(value: str):
+    return [int(x) for x in value.split(",") if x.strip()]
+
+
+def _max_rss_mib():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает KiB, macOS — байты
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def bench_params(time_cost: int, memory_cost: int, parallelism: int, iterations: int):
+    """Замеряет hash/verify для одной комбинации параметров в текущем процессе"""
+    ctx = build_pwd_context(time_cost, memory_cost, parallelism)
+    rss_before = _max_rss_mib()
+
+    hash_ms, verify_ms = [], []
+    hashed = None
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        hashed = ctx.hash(_PASSWORD)
+        hash_ms.append((time.perf_counter() - t0) * 1000)
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        ctx.verify(_PASSWORD, hashed)
+        verify_ms.append((time.perf_counter() - t0) * 1000)
+
+    rss_after = _max_rss_mib()
+    return {
+        "time_cost": time_cost,
+        "memory_cost": memory_cost,
+        "parallelism": parallelism,
+        "hash_p50_ms": round(percentile(hash_ms, 50), 2),
+        "hash_p99_ms": round(percentile(hash_ms, 99), 2),
+        "verify_p50_ms": round(percentile(verify_ms, 50), 2),
+        "verify_p99_ms": round(percentile(verify_ms, 99), 2),
+        "peak_rss_mib": round(rss_after, 1) if rss_after is not None else None,
+        # Прирост пикового RSS — сколько памяти съедает один хэш
+        "hash_rss_mib": (
+            round(rss_after - rss_before, 1)
+            if rss_after is not None and rss_before is not None
+            else None
+        ),
+    }
+
+
+def _bench_isolated(args):
+    # Отдельный процесс на комбинацию: иначе ru_maxrss копит пик прошлых замеров
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(bench_params, args)
+
+
+def memory_mib(result) -> float:
+    # Без resource (Windows) оцениваем по memory_cost: Argon2 аллоцирует ровно m KiB
+    if result.get("hash_rss_mib"):
+        return max(result["hash_rss_mib"], result["memory_cost"] / 1024)
+    return result["memory_cost"] / 1024
+
+
+def recommend(results, target_ms: float, memory_budget_mib: float):
+    """Выбирает самую дорогую для атакующего комбинацию, укладывающуюся в бюджеты"""
+    fitting = [
+        r
+        for r in results
+        if r["verify_p99_ms"] <= target_ms and memory_mib(r) <= memory_budget_mib
+    ]
+    if not fitting:
+        return None
+    return max(
+        fitting,
+        key=lambda r: (
+            r["memory_cost"] * r["time_cost"],
+            r["memory_cost"],
+            -r["parallelism"],
+        ),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--time-costs", default="1,2,3,4")
+    parser.add_argument("--memory-costs", default="65536,131072,262144", help="KiB")
+    parser.add_argument("--parallelism", default="1,2")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--target-ms", type=float, default=300.0, help="verify p99")
+    parser.add_argument("--memory-budget-mib", type=float, default=300.0)
+    parser.add_argument("--json", action="store_true", help="вывод в JSON")
+    args = parser.parse_args(argv)
+
+    results = []
+    for t in parse_grid(args.time_costs):
+        for m in parse_grid(args.memory_costs):
+            for p in parse_grid(args.parallelism):
+                results.append(_bench_isolated((t, m, p, args.iterations)))
+                if not args.json:
+                    r = results[-1]
+                    print(
+                        f"t={t} m={m} p={p}: hash p99={r['hash_p99_ms']}ms "
+                        f"verify p50={r['verify_p50_ms']}ms p99={r['verify_p99_ms']}ms "
+                        f"rss={r['peak_rss_mib']}MiB"
+                    )
+
+    best = recommend(results, args.target_ms, args.memory_budget_mib)
+    if args.json:
+        print(json.dumps({"results": results, "recommended": best}, indent=2))
+    elif best is None:
+        sys.stderr.write("ERROR: no parameters fit the latency/memory budget.\n")
+    else:
+        print("\nRecommended:")
+        print(f"ARGON2_TIME_COST={best['time_cost']}")
+        print(f"ARGON2_MEMORY_COST={best['memory_cost']}")
+        print(f"ARGON2_PARALLELISM={best['parallelism']}")
+    return 0 if best is not None else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
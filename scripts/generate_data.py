@@ -0,0 +1,302 @@
+"""Генератор синтетических данных: пользователи, идеи и голоса в масштабе прода.
+
+Пишет напрямую в таблицы app.models пакетными INSERT'ами из нескольких
+процессов. Голоса распределены по идеям по закону Ципфа (немного очень
+популярных идей и длинный хвост); у каждого пользователя не больше одного
+голоса за идею. Пароль хэшируется один раз (Argon2 с параметрами приложения),
+и этот хэш получают все пользователи — войти можно под любым genN с --password.
+
+Данные дописываются к существующим: id продолжают текущие максимумы.
+
+Пример:
+    python -m scripts.generate_data --users 1000000 --ideas 100000 --votes 5000000
+    python -m scripts.generate_data --database-url postgresql://u:p@localhost/scale \\
+        --users 2000000 --ideas 200000 --votes 20000000 --workers 8
+"""
+
+import argparse
+import itertools
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import create_engine, event, func, insert, select
+
+from app import models
+from app.domain import VoteType
+from scripts.microbench import sync_sequences
+
+DEFAULT_PASSWORD = "generated-Pa55word"
+_BATCH = 10000
+_VOTE_VALUES = (VoteType.UP, VoteType.DOWN, VoteType.ABSTAIN)
+_VOTE_WEIGHTS = (60, 30, 10)
+
+# Состояние процесса-воркера (заполняет _init_worker)
+_engine = None
+_ranks = None
+_cum_weights = None
+
+
+def make_engine(url: str):
+    if not url.startswith("sqlite"):
+        return create_engine(url)
+    # SQLite: один писатель, остальные процессы ждут блокировку, а не падают
+    engine = create_engine(url, connect_args={"timeout": 300})
+
+    @event.listens_for(engine, "connect")
+    def _fast_load(dbapi_conn, _record):
+        # Только для этого загрузчика: без fsync на каждый коммит
+        dbapi_conn.execute("PRAGMA synchronous=OFF")
+
+    return engine
+
+
+def zipf_cum_weights(n: int, s: float):
+    """Накопленные веса 1/r^s для рангов 1..n (для random.choices)"""
+    return list(itertools.accumulate(1.0 / (r**s) for r in range(1, n + 1)))
+
+
+def rank_permutation(n: int):
+    """
+    Множитель a, взаимно простой с n: ранг r -> (r * a) % n. Популярные идеи
+    разбросаны по id, а не собраны в начале таблицы; массив перестановки не нужен.
+    """
+    a = max(1, int(n * 0.618034)) | 1
+    while math.gcd(a, n) != 1:
+        a += 2
+    return a
+
+
+def _init_worker(url: str, ideas: int, zipf_s: float):
+    global _engine, _ranks, _cum_weights
+    _engine = make_engine(url)
+    if ideas:
+        _ranks = range(ideas)
+        _cum_weights = zipf_cum_weights(ideas, zipf_s)
+
+
+def _insert(table, rows):
+    with _engine.begin() as conn:
+        conn.execute(insert(table), rows)
+    return len(rows)
+
+
+def _users_task(args):
+    first, last, password_hash = args
+    return _insert(
+        models.User,
+        [
+            {
+                "id": i,
+                "username": f"gen{i}",
+                "email": f"gen{i}@example.test",
+                "hashed_password": password_hash,
+                "is_active": True,
+                "token_version": 0,
+            }
+            for i in range(first, last)
+        ],
+    )
+
+
+def _ideas_task(args):
+    first, last, user_base, users, seed = args
+    rng = random.Random(f"ideas:{seed}:{first}")
+    return _insert(
+        models.Idea,
+        [
+            {
+                "id": i,
+                "title": f"Generated idea {i}",
+                "description": f"Synthetic idea #{i} for scale testing",
+                "owner_id": user_base + rng.randint(1, users),
+            }
+            for i in range(first, last)
+        ],
+    )
+
+
+def _pick_ranks(rng: random.Random, k: int, n: int):
+    """k различных рангов идей, выбранных по Ципфу"""
+    if k >= n:
+        return list(range(n))
+    chosen = {}
+    for _ in range(8):
+        need = k - len(chosen)
+        if need <= 0:
+            break
+        chosen.update(
+            dict.fromkeys(rng.choices(_ranks, cum_weights=_cum_weights, k=need * 2))
+        )
+    # Хвост добираем равномерно: у активных пользователей голосов больше, чем
+    # различных популярных идей
+    while len(chosen) < k:
+        chosen[rng.randrange(n)] = None
+    return list(itertools.islice(chosen, k))
+
+
+def votes_per_user(votes: int, users: int, index: int) -> int:
+    """Голоса раскладываются поровну, остаток — первым пользователям"""
+    return votes // users + (1 if index < votes % users else 0)
+
+
+def _votes_task(args):
+    first, last, user_base, idea_base, users, ideas, votes, seed = args
+    rng = random.Random(f"votes:{seed}:{first}")
+    step = rank_permutation(ideas)
+    rows = []
+    for index in range(first, last):
+        k = votes_per_user(votes, users, index)
+        values = rng.choices(_VOTE_VALUES, weights=_VOTE_WEIGHTS, k=k)
+        for rank, value in zip(_pick_ranks(rng, k, ideas), values):
+            rows.append(
+                {
+                    "user_id": user_base + index + 1,
+                    "idea_id": idea_base + (rank * step) % ideas + 1,
+                    "value": value,
+                }
+            )
+    for i in range(0, len(rows), _BATCH):
+        _insert(models.Vote, rows[i : i + _BATCH])
+    return len(rows)
+
+
+def _ranges(first: int, count: int, size: int):
+    for start in range(first, first + count, size):
+        yield start, min(start + size, first + count)
+
+
+def _phase(name: str, executor, fn, tasks, total: int):
+    if total <= 0:
+        return 0
+    t0 = time.perf_counter()
+    done = 0
+    for n in executor.map(fn, tasks):
+        done += n
+    elapsed = time.perf_counter() - t0
+    print(
+        f"{name:<6} {done:>11} rows in {elapsed:7.1f}s "
+        f"({done / elapsed if elapsed else 0:,.0f} rows/s)",
+        flush=True,
+    )
+    return done
+
+
+def generate(
+    url: str,
+    *,
+    users: int,
+    ideas: int,
+    votes: int,
+    workers: int,
+    zipf_s: float = 1.1,
+    seed: int = 1,
+    password_hash: str,
+):
+    """Возвращает число вставленных строк по таблицам"""
+    if votes and (not users or not ideas):
+        raise ValueError("votes need at least one user and one idea")
+    votes = min(votes, users * ideas)  # один голос на пару (пользователь, идея)
+
+    engine = make_engine(url)
+    try:
+        models.Base.metadata.create_all(bind=engine)
+        with engine.connect() as conn:
+            user_base = conn.scalar(select(func.coalesce(func.max(models.User.id), 0)))
+            idea_base = conn.scalar(select(func.coalesce(func.max(models.Idea.id), 0)))
+    finally:
+        engine.dispose()
+
+    # Задача по голосам — примерно _BATCH строк
+    users_per_task = max(1, _BATCH * users // votes) if votes else users
+    result = {}
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(url, ideas, zipf_s)
+    ) as executor:
+        result["users"] = _phase(
+            "users",
+            executor,
+            _users_task,
+            ((a, b, password_hash) for a, b in _ranges(user_base + 1, users, _BATCH)),
+            users,
+        )
+        result["ideas"] = _phase(
+            "ideas",
+            executor,
+            _ideas_task,
+            (
+                (a, b, user_base, users, seed)
+                for a, b in _ranges(idea_base + 1, ideas, _BATCH)
+            ),
+            ideas,
+        )
+        result["votes"] = _phase(
+            "votes",
+            executor,
+            _votes_task,
+            (
+                (a, b, user_base, idea_base, users, ideas, votes, seed)
+                for a, b in _ranges(0, users, users_per_task)
+            ),
+            votes,
+        )
+
+    engine = make_engine(url)
+    try:
+        with engine.begin() as conn:
+            sync_sequences(conn)
+    finally:
+        engine.dispose()
+    return result
+
+
+def main(argv=None):
+    from app.database import DATABASE_URL
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--ideas", type=int, default=10000)
+    parser.add_argument("--votes", type=int, default=1000000)
+    parser.add_argument(
+        "--zipf", type=float, default=1.1, help="показатель s распределения Ципфа"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    args = parser.parse_args(argv)
+
+    if min(args.users, args.ideas, args.votes) < 0 or args.workers < 1:
+        parser.error("counts must be non-negative and --workers at least 1")
+
+    from app.crud.crud_users import get_pwd_context
+
+    t0 = time.perf_counter()
+    password_hash = get_pwd_context().hash(args.password)
+    print(f"Password hashed once in {time.perf_counter() - t0:.2f}s")
+
+    t0 = time.perf_counter()
+    try:
+        result = generate(
+            args.database_url,
+            users=args.users,
+            ideas=args.ideas,
+            votes=args.votes,
+            workers=args.workers,
+            zipf_s=args.zipf,
+            seed=args.seed,
+            password_hash=password_hash,
+        )
+    except ValueError as exc:
+        parser.error(str(exc))
+    print(
+        f"Done in {time.perf_counter() - t0:.1f}s: "
+        + ", ".join(f"{n} {table}" for table, n in result.items())
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,84 @@
+"""Профиль времени импорта app.main (по данным python -X importtime).
+
+Пример:
+    python -m scripts.importtime --top 25 --budget-ms 1500
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Тяжелые модули, которые должны грузиться лениво (при первом использовании)
+LAZY_MODULES = ("httpx", "passlib", "argon2", "jose", "cryptography")
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+
+
+def collect(module: str = "app.main"):
+    """Импортирует module в чистом интерпретаторе и разбирает вывод -X importtime"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            }
+        )
+    return rows
+
+
+def total_ms(rows, module: str = "app.main") -> float:
+    return next(r["cumulative_ms"] for r in rows if r["module"] == module)
+
+
+def imported_lazy_modules(rows):
+    names = {r["module"] for r in rows}
+    return [m for m in LAZY_MODULES if m in names]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    rows = collect(args.module)
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for r in sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[: args.top]:
+        print(
+            f"{r['cumulative_ms']:>14.1f} {r['self_ms']:>9.1f}  "
+            f"{'  ' * r['depth']}{r['module']}"
+        )
+
+    code = 0
+    total = total_ms(rows, args.module)
+    print(f"\nTotal {args.module}: {total:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if total > args.budget_ms:
+        sys.stderr.write("ERROR: import time budget exceeded.\n")
+        code = 1
+    eager = imported_lazy_modules(rows)
+    if eager:
+        sys.stderr.write(f"ERROR: modules imported eagerly: {', '.join(eager)}\n")
+        code = 1
+    return code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,357 @@
+"""Нагрузочный тест API: смесь чтений, голосов, логинов и создания идей.
+
+По умолчанию гоняет приложение в процессе (httpx.ASGITransport) на временной
+SQLite; с --url — уже запущенный сервер (лимиты запросов на нем нужно ослабить,
+см. RATE_LIMIT_* в .env.example). Сравнивает p50/p95/p99 и пропускную
+способность по маршрутам с бюджетами из scripts/loadtest_budgets.json.
+
+Пример:
+    python -m scripts.loadtest --duration 20 --concurrency 8
+    python -m scripts.loadtest --url http://localhost:8080 --json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from scripts.stats import percentile
+
+ROOT = Path(__file__).resolve().parents[1]
+BUDGETS_PATH = ROOT / "scripts" / "loadtest_budgets.json"
+
+# Доли операций в смеси (веса)
+DEFAULT_MIX = {
+    "list_ideas": 50,
+    "get_idea": 15,
+    "vote": 20,
+    "create_idea": 10,
+    "login": 5,
+}
+ROUTES = {
+    "list_ideas": "GET /api/ideas",
+    "get_idea": "GET /api/ideas/{idea_id}",
+    "vote": "POST /api/ideas/{idea_id}/vote",
+    "create_idea": "POST /api/ideas",
+    "login": "POST /api/token",
+}
+_VOTES = ("за", "против", "воздержаться")
+_PASSWORD = "load-Test-pa55"
+# Лимиты запросов меряем не здесь: в процессе отключаем их, чтобы мерить сам API
+_RELAXED_LIMITS = {
+    "RATE_LIMIT_POST_PER_MIN_PER_IP": "1000000",
+    "RATE_LIMIT_LOGIN_PER_10MIN_PER_IP": "1000000",
+    "RATE_LIMIT_LOGIN_PER_10MIN_PER_ACCOUNT": "1000000",
+    # Дешевый Argon2: иначе логин (~1 с на хэш) занимает весь CPU и бюджеты
+    # меряют хэширование, а не API. Стоимость Argon2 — scripts.calibrate_argon2
+    "ARGON2_TIME_COST": "1",
+    "ARGON2_MEMORY_COST": "8192",
+    "ARGON2_PARALLELISM": "1",
+}
+
+
+def parse_mix(value: str):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ROUTES:
+            raise argparse.ArgumentTypeError(f"unknown operation: {name}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+class VirtualUser:
+    __slots__ = ("client", "username", "token")
+
+    def __init__(self, client, username: str):
+        self.client = client
+        self.username = username
+        self.token = None
+
+    def auth(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+    async def login(self):
+        r = await self.client.post(
+            "/api/token", data={"username": self.username, "password": _PASSWORD}
+        )
+        if r.status_code == 200:
+            self.token = r.json()["access_token"]
+        return r
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {route: [] for route in ROUTES.values()}
+        self.errors = {route: 0 for route in ROUTES.values()}
+
+    def add(self, route: str, seconds: float, ok: bool):
+        self.latencies[route].append(seconds * 1000)
+        if not ok:
+            self.errors[route] += 1
+
+    def report(self, elapsed: float):
+        routes = {}
+        for route, samples in self.latencies.items():
+            if not samples:
+                continue
+            routes[route] = {
+                "count": len(samples),
+                "errors": self.errors[route],
+                "error_rate": round(self.errors[route] / len(samples), 4),
+                "rps": round(len(samples) / elapsed, 1),
+                "p50_ms": round(percentile(samples, 50), 2),
+                "p95_ms": round(percentile(samples, 95), 2),
+                "p99_ms": round(percentile(samples, 99), 2),
+            }
+        total = sum(r["count"] for r in routes.values())
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "requests": total,
+            "rps": round(total / elapsed, 1) if elapsed else 0.0,
+            "routes": routes,
+        }
+
+
+async def _operation(op: str, user: VirtualUser, idea_ids, rng: random.Random):
+    client = user.client
+    if op == "list_ideas":
+        return await client.get(
+            "/api/ideas", params={"skip": rng.randrange(0, 50), "limit": 20}
+        )
+    if op == "get_idea":
+        return await client.get(f"/api/ideas/{rng.choice(idea_ids)}")
+    if op == "vote":
+        return await client.post(
+            f"/api/ideas/{rng.choice(idea_ids)}/vote",
+            json={"value": rng.choice(_VOTES)},
+            headers=user.auth(),
+        )
+    if op == "create_idea":
+        r = await client.post(
+            "/api/ideas",
+            json={"title": f"Load idea {rng.random():.6f}", "description": "load"},
+            headers=user.auth(),
+        )
+        if r.status_code == 201:
+            idea_ids.append(r.json()["id"])
+        return r
+    return await user.login()
+
+
+async def _setup(users, ideas: int):
+    """Регистрирует и логинит виртуальных пользователей, создает стартовые идеи"""
+    for user in users:
+        r = await user.client.post(
+            "/api/users/new",
+            json={
+                "username": user.username,
+                "email": f"{user.username}@load.test",
+                "password": _PASSWORD,
+            },
+        )
+        if r.status_code != 201:
+            raise RuntimeError(f"registration failed: {r.status_code} {r.text}")
+        r = await user.login()
+        if r.status_code != 200:
+            raise RuntimeError(f"login failed: {r.status_code} {r.text}")
+    idea_ids = []
+    for i in range(ideas):
+        user = users[i % len(users)]
+        r = await user.client.post(
+            "/api/ideas",
+            json={"title": f"Seed idea {i}", "description": "seed"},
+            headers=user.auth(),
+        )
+        if r.status_code != 201:
+            raise RuntimeError(f"idea seeding failed: {r.status_code} {r.text}")
+        idea_ids.append(r.json()["id"])
+    return idea_ids
+
+
+async def run_load(
+    make_client,
+    *,
+    concurrency: int = 8,
+    duration: float = 10.0,
+    requests=None,
+    ideas: int = 50,
+    mix=None,
+    seed: int = 1,
+):
+    """
+    make_client(i) — httpx.AsyncClient для i-го виртуального пользователя.
+    Останавливается по duration секунд или после requests запросов.
+    """
+    mix = mix or DEFAULT_MIX
+    ops, weights = list(mix), list(mix.values())
+    run_id = f"{seed}{int(time.time() * 1000) % 10**8}"
+    users = [
+        VirtualUser(make_client(i), f"load{run_id}u{i}") for i in range(concurrency)
+    ]
+    recorder = Recorder()
+    try:
+        idea_ids = await _setup(users, ideas)
+        budget = {"left": requests if requests is not None else float("inf")}
+        stop_at = time.monotonic() + duration
+
+        async def worker(index: int, user: VirtualUser):
+            rng = random.Random(seed * 1000 + index)
+            while time.monotonic() < stop_at and budget["left"] > 0:
+                budget["left"] -= 1
+                op = rng.choices(ops, weights)[0]
+                t0 = time.perf_counter()
+                try:
+                    r = await _operation(op, user, idea_ids, rng)
+                    ok = r.status_code < 400
+                except Exception:
+                    ok = False
+                recorder.add(ROUTES[op], time.perf_counter() - t0, ok)
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker(i, u) for i, u in enumerate(users)))
+        return recorder.report(time.monotonic() - started)
+    finally:
+        for user in users:
+            await user.client.aclose()
+
+
+def check_budgets(report, budgets):
+    """Список нарушений бюджета (пустой — все в норме)"""
+    violations = []
+    defaults = budgets.get("default", {})
+    for route, limits in budgets.get("routes", {}).items():
+        stats = report["routes"].get(route)
+        if stats is None:
+            continue
+        limits = {**defaults, **limits}
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if metric in limits and stats[metric] > limits[metric]:
+                violations.append(
+                    f"{route}: {metric}={stats[metric]} > {limits[metric]}"
+                )
+        if (
+            "max_error_rate" in limits
+            and stats["error_rate"] > limits["max_error_rate"]
+        ):
+            violations.append(
+                f"{route}: error_rate={stats['error_rate']} > {limits['max_error_rate']}"
+            )
+        if "min_rps" in limits and stats["rps"] < limits["min_rps"]:
+            violations.append(f"{route}: rps={stats['rps']} < {limits['min_rps']}")
+    if "min_total_rps" in budgets and report["rps"] < budgets["min_total_rps"]:
+        violations.append(f"total: rps={report['rps']} < {budgets['min_total_rps']}")
+    return violations
+
+
+def _in_process_clients():
+    """Фабрика клиентов к приложению в этом процессе (на временной SQLite)"""
+    for key, value in _RELAXED_LIMITS.items():
+        os.environ.setdefault(key, value)
+    if "DATABASE_URL" not in os.environ:
+        db_path = Path(tempfile.mkdtemp(prefix="loadtest-")) / "load.db"
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    from app.main import app
+
+    return app, asgi_clients(app)
+
+
+def asgi_clients(app):
+    import httpx
+
+    def make_client(i: int):
+        # Свой адрес у каждого пользователя — как у реальных клиентов
+        ip = f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}"
+        transport = httpx.ASGITransport(app=app, client=(ip, 40000))
+        return httpx.AsyncClient(transport=transport, base_url="http://loadtest")
+
+    return make_client
+
+
+async def _run(args):
+    mix = args.mix or DEFAULT_MIX
+    if args.url:
+        import httpx
+
+        def make_client(i: int):
+            return httpx.AsyncClient(base_url=args.url, timeout=30)
+
+        return await run_load(
+            make_client,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            requests=args.requests,
+            ideas=args.ideas,
+            mix=mix,
+            seed=args.seed,
+        )
+
+    app, make_client = _in_process_clients()
+    # ASGITransport не шлет lifespan-события: запускаем startup/shutdown сами
+    await app.router.startup()
+    try:
+        return await run_load(
+            make_client,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            requests=args.requests,
+            ideas=args.ideas,
+            mix=mix,
+            seed=args.seed,
+        )
+    finally:
+        await app.router.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="базовый URL запущенного сервера")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=15.0, help="секунды")
+    parser.add_argument("--requests", type=int, help="остановиться после N запросов")
+    parser.add_argument("--ideas", type=int, default=50, help="стартовых идей")
+    parser.add_argument("--mix", type=parse_mix, help="list_ideas=50,vote=20,...")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--budgets", type=Path, default=BUDGETS_PATH)
+    parser.add_argument("--no-budgets", action="store_true", help="только отчет")
+    parser.add_argument("--json", action="store_true", help="вывод в JSON")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(_run(args))
+    violations = []
+    if not args.no_budgets:
+        violations = check_budgets(report, json.loads(args.budgets.read_text()))
+    report["budget_violations"] = violations
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print(
+            f"{'route':<32} {'count':>6} {'err':>4} {'rps':>7} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+        for route, s in report["routes"].items():
+            print(
+                f"{route:<32} {s['count']:>6} {s['errors']:>4} {s['rps']:>7} "
+                f"{s['p50_ms']:>8} {s['p95_ms']:>8} {s['p99_ms']:>8}"
+            )
+        print(
+            f"\nTotal: {report['requests']} requests in {report['elapsed_s']}s "
+            f"({report['rps']} rps)"
+        )
+    if violations:
+        sys.stderr.write("ERROR: performance budget exceeded:\n")
+        for v in violations:
+            sys.stderr.write(f"  {v}\n")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
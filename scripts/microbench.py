@@ -0,0 +1,335 @@
+"""Микробенчмарки горячих функций на заполненной БД (SQLite или Postgres).
+
+Для каждого размера (идеи x пользователи x голоса) пересоздает таблицы,
+заполняет их и замеряет функции; результаты пишет в JSON для сравнения
+между прогонами.
+
+Пример:
+    python -m scripts.microbench --sizes 100x50x1000,1000x500x20000
+    python -m scripts.microbench --database-url postgresql://u:p@localhost/bench \\
+        --output reports/bench-pg.json --compare reports/bench-prev.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app import models, schemas
+from app.domain import VoteType
+from scripts.stats import percentile
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_OUTPUT = ROOT / "reports" / "microbench.json"
+# Хэш-заглушка: бенчмарки не проверяют пароль, Argon2 тут не нужен
+_PLACEHOLDER_HASH = "$argon2id$v=19$m=65536,t=3,p=1$bench$bench"
+_VOTE_VALUES = (VoteType.UP, VoteType.DOWN, VoteType.ABSTAIN)
+_BATCH = 5000
+
+
+def parse_sizes(value: str):
+    """'100x50x1000,1000x500x20000' -> [(ideas, users, votes), ...]"""
+    sizes = []
+    for part in value.split(","):
+        ideas, users, votes = (int(x) for x in part.lower().split("x"))
+        sizes.append((ideas, users, votes))
+    return sizes
+
+
+def _chunks(rows, size: int = _BATCH):
+    for i in range(0, len(rows), size):
+        yield rows[i : i + size]
+
+
+def seed(engine, ideas: int, users: int, votes: int, rng: random.Random):
+    """Пересоздает таблицы и заполняет их пакетными INSERT'ами"""
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    votes = min(votes, ideas * users)  # один голос на пару (пользователь, идея)
+    with engine.begin() as conn:
+        user_rows = [
+            {
+                "id": i + 1,
+                "username": f"user{i + 1}",
+                "email": f"user{i + 1}@bench.test",
+                "hashed_password": _PLACEHOLDER_HASH,
+                "is_active": True,
+                "token_version": 0,
+            }
+            for i in range(users)
+        ]
+        for chunk in _chunks(user_rows):
+            conn.execute(insert(models.User), chunk)
+        idea_rows = [
+            {
+                "id": i + 1,
+                "title": f"Idea {i + 1}",
+                "description": "benchmark",
+                "owner_id": rng.randint(1, users),
+            }
+            for i in range(ideas)
+        ]
+        for chunk in _chunks(idea_rows):
+            conn.execute(insert(models.Idea), chunk)
+        pairs = set()
+        while len(pairs) < votes:
+            pairs.add((rng.randint(1, users), rng.randint(1, ideas)))
+        vote_rows = [
+            {"user_id": u, "idea_id": i, "value": rng.choice(_VOTE_VALUES)}
+            for u, i in pairs
+        ]
+        for chunk in _chunks(vote_rows):
+            conn.execute(insert(models.Vote), chunk)
+        sync_sequences(conn)
+
+
+def sync_sequences(conn):
+    """Postgres: id вставлены явно — двигаем последовательности за максимум"""
+    if conn.dialect.name != "postgresql":
+        return
+    for table in ("users", "ideas", "votes"):
+        conn.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+            )
+        )
+
+
+def measure(fn, *, iterations: int, warmup: int):
+    """fn(i) вызывается warmup + iterations раз; возвращает статистику в мкс"""
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    for i in range(iterations):
+        t0 = time.perf_counter_ns()
+        fn(i)
+        samples.append((time.perf_counter_ns() - t0) / 1000)
+    return {
+        "iterations": iterations,
+        "mean_us": round(statistics.fmean(samples), 2),
+        "median_us": round(statistics.median(samples), 2),
+        "p95_us": round(percentile(samples, 95), 2),
+        "min_us": round(min(samples), 2),
+    }
+
+
+def bench_size(engine, ideas: int, users: int, votes: int, args, rng):
+    from app.crud import crud_ideas, crud_users
+    from app.main import InMemoryTokenBuckets
+    from app.routers.ideas import _validate_idea_input
+
+    votes = min(votes, ideas * users)
+    t0 = time.perf_counter()
+    seed(engine, ideas, users, votes, rng)
+    seed_s = time.perf_counter() - t0
+
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    results = {}
+    n, warmup = args.iterations, args.warmup
+
+    with Session() as db:
+        results["crud_ideas.get_ideas_with_scores"] = measure(
+            lambda i: crud_ideas.get_ideas_with_scores(db, skip=0, limit=100),
+            iterations=max(1, n // 10),
+            warmup=min(warmup, 3),
+        )
+        usernames = [f"user{rng.randint(1, users)}" for _ in range(n + warmup)]
+        results["crud_users.get_user_by_username"] = measure(
+            lambda i: crud_users.get_user_by_username(db, usernames[i]),
+            iterations=n,
+            warmup=warmup,
+        )
+        targets = [
+            (rng.randint(1, ideas), rng.randint(1, users), rng.choice(_VOTE_VALUES))
+            for _ in range(n + warmup)
+        ]
+        results["crud_ideas.vote_idea"] = measure(
+            lambda i: crud_ideas.vote_idea(db, *targets[i]),
+            iterations=n,
+            warmup=warmup,
+        )
+
+    # Без БД: ключей столько же, сколько пользователей (IP/аккаунтов)
+    buckets = InMemoryTokenBuckets()
+    keys = [f"rl:post:ip:10.0.{i // 256}.{i % 256}" for i in range(users)]
+    results["InMemoryTokenBuckets.try_acquire"] = measure(
+        lambda i: buckets.try_acquire(keys[i % len(keys)], 12, 10 / 60),
+        iterations=n * 10,
+        warmup=warmup,
+    )
+    payloads = [
+        schemas.IdeaCreate(
+            title=f"  Idea   {i}  title ", description=" some  text " * 20
+        )
+        for i in range(n * 10 + warmup)
+    ]
+    results["routers.ideas._validate_idea_input"] = measure(
+        lambda i: _validate_idea_input(payloads[i]),
+        iterations=n * 10,
+        warmup=warmup,
+    )
+    return {
+        "ideas": ideas,
+        "users": users,
+        "votes": votes,
+        "seed_seconds": round(seed_s, 2),
+        "functions": results,
+    }
+
+
+def bench_overhead(args):
+    """
+    Накладные расходы Python на вызов (сборка запроса, кэш компиляции,
+    обработка строк): крошечная БД в памяти, сам SQL почти ничего не стоит.
+    compiled_cache_growth — новые записи кэша компиляции после прогрева;
+    для готовых запросов с bindparam должен быть 0.
+    """
+    from sqlalchemy.pool import StaticPool
+
+    from app.crud import crud_ideas, crud_users
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    seed(engine, ideas=20, users=5, votes=40, rng=random.Random(0))
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    with Session() as db:
+        calls = {
+            "crud_ideas.get_idea": lambda i: crud_ideas.get_idea(db, i % 20 + 1),
+            "crud_users.get_user_by_username": lambda i: (
+                crud_users.get_user_by_username(db, f"user{i % 5 + 1}")
+            ),
+            "crud_ideas.get_ideas_with_scores": lambda i: (
+                crud_ideas.get_ideas_with_scores(db, skip=0, limit=20)
+            ),
+            "crud_ideas.get_idea_with_scores": lambda i: (
+                crud_ideas.get_idea_with_scores(db, i % 20 + 1)
+            ),
+            "crud_ideas.get_idea_with_scores(rank)": lambda i: (
+                crud_ideas.get_idea_with_scores(db, i % 20 + 1, with_rank=True)
+            ),
+        }
+        for fn in calls.values():
+            for i in range(max(args.warmup, 1)):
+                fn(i)
+        cache_size = len(engine._compiled_cache)
+        results = {
+            name: measure(fn, iterations=args.iterations, warmup=0)
+            for name, fn in calls.items()
+        }
+        growth = len(engine._compiled_cache) - cache_size
+    engine.dispose()
+    return {"functions": results, "compiled_cache_growth": growth}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous):
+    """Строки вида 'size fn: median X -> Y us (+Z%)' для общих замеров"""
+
+    def sections(report):
+        for r in report.get("runs", []):
+            yield f"{r['ideas']}x{r['users']}x{r['votes']}", r["functions"]
+        if "overhead" in report:
+            yield "overhead", report["overhead"]["functions"]
+
+    prev = {
+        (size, fn): stats["median_us"]
+        for size, functions in sections(previous)
+        for fn, stats in functions.items()
+    }
+    lines = []
+    for size, functions in sections(current):
+        for fn, stats in functions.items():
+            before = prev.get((size, fn))
+            if not before:
+                continue
+            delta = (stats["median_us"] - before) / before * 100
+            lines.append(
+                f"{size} {fn}: median "
+                f"{before} -> {stats['median_us']} us ({delta:+.1f}%)"
+            )
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=parse_sizes, default=parse_sizes("100x50x1000,1000x500x20000")
+    )
+    parser.add_argument(
+        "--database-url",
+        help="по умолчанию временная SQLite; ВНИМАНИЕ: таблицы пересоздаются",
+    )
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--compare", type=Path, help="JSON прошлого прогона")
+    args = parser.parse_args(argv)
+
+    url = args.database_url
+    if url is None:
+        url = f"sqlite:///{Path(tempfile.mkdtemp(prefix='microbench-')) / 'bench.db'}"
+    engine = create_engine(url)
+    rng = random.Random(args.seed)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "dialect": engine.dialect.name,
+        "runs": [],
+    }
+    try:
+        report["overhead"] = overhead = bench_overhead(args)
+        print("\nPython overhead per call (in-memory SQLite)")
+        for fn, s in overhead["functions"].items():
+            print(f"  {fn:<40} median {s['median_us']:>10} us")
+        print(f"  compiled cache growth: {overhead['compiled_cache_growth']}")
+        for ideas, users, votes in args.sizes:
+            run = bench_size(engine, ideas, users, votes, args, rng)
+            report["runs"].append(run)
+            print(f"\n{ideas} ideas x {users} users x {votes} votes")
+            for fn, s in run["functions"].items():
+                print(
+                    f"  {fn:<40} median {s['median_us']:>10} us  "
+                    f"p95 {s['p95_us']:>10} us"
+                )
+    finally:
+        engine.dispose()
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {args.output}")
+    if args.compare:
+        if not args.compare.exists():
+            sys.stderr.write(f"ERROR: {args.compare} not found.\n")
+            return 1
+        for line in compare(report, json.loads(args.compare.read_text())):
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,183 @@
+"""Конкурентный бенчмарк SQLite: читатели и писатели одновременно.
+
+Для каждого профиля PRAGMA создает файл БД, заполняет его и на duration
+секунд запускает потоки-читатели (рейтинг идей) и потоки-писатели (голоса).
+Каждая операция — своя сессия, как у запроса HTTP. Печатает пропускную
+способность, p50/p95/p99 и ошибки ("database is locked") по ролям.
+
+Профили: rollback — журнал по умолчанию (DELETE, synchronous=FULL),
+tuned — профиль приложения (SQLITE_* из окружения, см. app/database.py).
+
+Пример:
+    python -m scripts.sqlite_bench --readers 8 --writers 2 --duration 10
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import SQLITE_PRAGMAS, install_sqlite_pragmas
+from app.domain import VoteType
+from scripts.microbench import seed
+from scripts.stats import percentile
+
+PROFILES = {
+    # Тот же busy_timeout, чтобы сравнивать журналы, а не мгновенные отказы
+    "rollback": {
+        "busy_timeout": SQLITE_PRAGMAS["busy_timeout"],
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+    },
+    "tuned": SQLITE_PRAGMAS,
+}
+_VOTE_VALUES = (VoteType.UP, VoteType.DOWN, VoteType.ABSTAIN)
+
+
+def _stats(samples, errors, elapsed):
+    return {
+        "ops": len(samples),
+        "ops_per_s": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "errors": errors,
+        "p50_ms": round(percentile(samples, 50), 2) if samples else None,
+        "p95_ms": round(percentile(samples, 95), 2) if samples else None,
+        "p99_ms": round(percentile(samples, 99), 2) if samples else None,
+    }
+
+
+def run_profile(
+    path: Path,
+    pragmas,
+    *,
+    readers: int,
+    writers: int,
+    duration: float,
+    ideas: int = 200,
+    users: int = 100,
+    votes: int = 5000,
+    seed_value: int = 1,
+):
+    from app.crud import crud_ideas
+
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        pool_size=readers + writers,
+    )
+    install_sqlite_pragmas(engine, pragmas)
+    seed(engine, ideas, users, votes, random.Random(seed_value))
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    latencies = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+    lock = threading.Lock()
+    start = threading.Barrier(readers + writers + 1)
+    stop_at = [0.0]
+
+    def worker(role: str, index: int):
+        rng = random.Random(seed_value * 1000 + index)
+        own, failed = [], 0
+        start.wait()
+        while time.monotonic() < stop_at[0]:
+            t0 = time.perf_counter()
+            try:
+                with Session() as db:
+                    if role == "read":
+                        crud_ideas.get_ideas_with_scores(db, skip=0, limit=20)
+                    else:
+                        crud_ideas.vote_idea(
+                            db,
+                            rng.randint(1, ideas),
+                            rng.randint(1, users),
+                            rng.choice(_VOTE_VALUES),
+                        )
+                own.append((time.perf_counter() - t0) * 1000)
+            except OperationalError:
+                failed += 1
+        with lock:
+            latencies[role].extend(own)
+            errors[role] += failed
+
+    threads = [
+        threading.Thread(target=worker, args=("read", i)) for i in range(readers)
+    ] + [
+        threading.Thread(target=worker, args=("write", readers + i))
+        for i in range(writers)
+    ]
+    for thread in threads:
+        thread.start()
+    stop_at[0] = time.monotonic() + duration
+    started = time.monotonic()
+    start.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    with engine.connect() as conn:
+        journal_mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+    engine.dispose()
+    return {
+        "journal_mode": journal_mode,
+        "readers": readers,
+        "writers": writers,
+        "read": _stats(latencies["read"], errors["read"], elapsed),
+        "write": _stats(latencies["write"], errors["write"], elapsed),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=10.0, help="секунды")
+    parser.add_argument("--ideas", type=int, default=200)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--votes", type=int, default=5000)
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="rollback,tuned")
+    parser.add_argument("--json", action="store_true", help="вывод в JSON")
+    args = parser.parse_args(argv)
+
+    names = [p.strip() for p in args.profiles.split(",") if p.strip()]
+    unknown = [p for p in names if p not in PROFILES]
+    if unknown:
+        parser.error(f"unknown profiles: {', '.join(unknown)}")
+
+    workdir = Path(tempfile.mkdtemp(prefix="sqlite-bench-"))
+    results = {}
+    for name in names:
+        results[name] = run_profile(
+            workdir / f"{name}.db",
+            PROFILES[name],
+            readers=args.readers,
+            writers=args.writers,
+            duration=args.duration,
+            ideas=args.ideas,
+            users=args.users,
+            votes=args.votes,
+        )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(
+        f"{'profile':<10} {'role':<6} {'ops/s':>8} {'errors':>7} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    for name, result in results.items():
+        for role in ("read", "write"):
+            s = result[role]
+            print(
+                f"{name:<10} {role:<6} {s['ops_per_s']:>8} {s['errors']:>7} "
+                f"{s['p50_ms']!s:>8} {s['p95_ms']!s:>8} {s['p99_ms']!s:>8}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
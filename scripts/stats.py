@@ -0,0 +1,12 @@
+"""Общие статистики для скриптов замеров (без зависимостей от app)."""
+
+import math
+
+
+def percentile(samples, pct: float) -> float:
+    # Nearest-rank: для p99 на малых выборках берем максимум, а не интерполяцию
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    k = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[k]
@@ -17,7 +17,9 @@ if str(ROOT) not in sys.path:
 from app.crud.crud_users import create_user  # noqa: E402
 from app.database import Base, get_db  # noqa: E402
 from app.main import app  # noqa: E402
+from app.revocation import revocation_list  # noqa: E402
 from app.schemas import UserCreate  # noqa: E402
+from app.token_cache import token_cache, token_versions  # noqa: E402
 
 # SQLite в памяти для тестов
 SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///:memory:"
@@ -44,6 +46,10 @@ def reset_rate_limiter():
     # Account-based login лимит
     users_router._account_buckets.clear()
     users_router._blocked_accounts.clear()
+    # Кэш проверенных токенов не должен переживать пересоздание БД
+    token_cache.clear()
+    token_versions.clear()
+    revocation_list.reset()
     yield
 
 
@@ -88,6 +94,10 @@ def client(db_session):
         def app(self):
             return self._c.app
 
+        @property
+        def cookies(self):
+            return self._c.cookies
+
         def request(self, method, url, retry_on_429=False, **kwargs):
             headers = kwargs.pop("headers", None) or {}
             # Можно оставить X-Forwarded-For, лимитер его не использует
@@ -155,3 +165,23 @@ def auth_token(client, test_user):
     )
     assert response.status_code == 200
     return response.json()["access_token"]
+
+
+@pytest.fixture(scope="function")
+def assert_queries(monkeypatch):
+    """
+    assert_queries(response, n): обработчик выполнил ровно n SQL-запросов
+    (по заголовку X-DB-Queries). Ловит N+1 и лишние запросы в эндпоинтах.
+    """
+    from app import db_metrics
+
+    monkeypatch.setattr(db_metrics, "DB_DEBUG_HEADERS", True)
+
+    def check(response, expected: int):
+        actual = int(response.headers["X-DB-Queries"])
+        assert actual == expected, (
+            f"{response.request.method} {response.request.url.path}: "
+            f"{actual} SQL queries, expected {expected}"
+        )
+
+    return check
@@ -44,3 +44,58 @@ def test_protected_endpoint_without_token(client):
     """Тест доступа к защищенному эндпоинту без токена"""
     response = client.get("/api/users/me")
     assert response.status_code == 401
+
+
+def test_token_carries_user_id_and_version(client, auth_token, test_user):
+    from jose import jwt
+
+    from app.auth import ALGORITHM, SECRET_KEY
+
+    payload = jwt.decode(auth_token, SECRET_KEY, algorithms=[ALGORITHM])
+    assert payload["uid"] == test_user["user_id"]
+    assert payload["ver"] == 0
+
+
+def test_write_route_does_not_load_user_row(client, auth_token, monkeypatch):
+    from app.crud import crud_users
+
+    def fail_lookup(*args, **kwargs):
+        raise AssertionError("full users row loaded")
+
+    monkeypatch.setattr(crud_users, "get_user", fail_lookup)
+    monkeypatch.setattr(crud_users, "get_user_by_username", fail_lookup)
+
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    r = client.post(
+        "/api/ideas", json={"title": "Идея", "description": "d"}, headers=headers
+    )
+    assert r.status_code == 201
+
+
+def test_revoked_token_rejected(client, auth_token, db_session):
+    from app.crud import crud_users
+
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    assert client.get("/api/users/me", headers=headers).status_code == 200
+
+    user = crud_users.get_user_by_username(db_session, "testuser")
+    crud_users.revoke_tokens(db_session, user)
+
+    assert client.get("/api/users/me", headers=headers).status_code == 401
+
+
+def test_legacy_token_without_uid_still_accepted(client, test_user):
+    from app.auth import create_access_token
+
+    token = create_access_token(data={"sub": "testuser"})
+    r = client.get("/api/users/me", headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 200
+    assert r.json()["user_id"] == str(test_user["user_id"])
+
+
+def test_principal_loads_orm_user_lazily(db_session, test_user):
+    from app.auth import Principal
+
+    principal = Principal(test_user["user_id"], "testuser", 0).bind(db_session)
+    assert principal._user is None
+    assert principal.user.email == "test@example.com"
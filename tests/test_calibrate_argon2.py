@@ -0,0 +1,37 @@
+from scripts.calibrate_argon2 import bench_params, recommend
+from scripts.stats import percentile
+
+
+def test_percentile_nearest_rank():
+    samples = [float(i) for i in range(1, 101)]
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 99) == 99.0
+    assert percentile([5.0], 99) == 5.0
+
+
+def test_bench_params_reports_latency():
+    r = bench_params(1, 1024, 1, iterations=2)
+    assert r["memory_cost"] == 1024
+    assert r["verify_p99_ms"] > 0
+    assert r["hash_p99_ms"] >= r["hash_p50_ms"]
+
+
+def test_recommend_picks_strongest_within_budget():
+    def res(t, m, p, verify_ms):
+        return {
+            "time_cost": t,
+            "memory_cost": m,
+            "parallelism": p,
+            "verify_p99_ms": verify_ms,
+            "hash_rss_mib": None,
+        }
+
+    results = [
+        res(1, 65536, 1, 80.0),
+        res(3, 65536, 1, 200.0),
+        res(3, 262144, 1, 700.0),  # слишком медленно
+        res(1, 524288, 1, 250.0),  # не влезает в память
+    ]
+    best = recommend(results, target_ms=300, memory_budget_mib=300)
+    assert (best["time_cost"], best["memory_cost"]) == (3, 65536)
+    assert recommend(results, target_ms=10, memory_budget_mib=300) is None
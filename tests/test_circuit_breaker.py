@@ -0,0 +1,101 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import circuit_breaker as cb
+from app.circuit_breaker import CircuitBreakers, CircuitOpenError
+from app.http_client import SafeHttpClient
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    t = {"now": 1000.0}
+    monkeypatch.setattr(CircuitBreakers, "_now", lambda self: t["now"])
+    return t
+
+
+def _fail(breakers, host, n):
+    for _ in range(n):
+        probe = breakers.before_call(host)
+        breakers.record(host, False, probe)
+
+
+def test_opens_after_failure_rate_and_fails_fast(clock, monkeypatch):
+    monkeypatch.setattr(cb, "BREAKER_MIN_CALLS", 4)
+    breakers = CircuitBreakers()
+    breakers.record("a:443", True)
+    _fail(breakers, "a:443", 3)
+    assert breakers.snapshot()["a:443"]["state"] == cb.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breakers.before_call("a:443")
+    # Другие хосты не затронуты
+    assert breakers.before_call("b:443") is False
+
+
+def test_half_open_probe_closes_or_reopens(clock, monkeypatch):
+    monkeypatch.setattr(cb, "BREAKER_MIN_CALLS", 2)
+    monkeypatch.setattr(cb, "BREAKER_OPEN_SECONDS", 5)
+    breakers = CircuitBreakers()
+    _fail(breakers, "a:443", 2)
+
+    clock["now"] += 5
+    assert breakers.before_call("a:443") is True  # проба
+    with pytest.raises(CircuitOpenError):
+        breakers.before_call("a:443")  # вторая параллельная проба запрещена
+    breakers.record("a:443", False, probe=True)
+    state = breakers.snapshot()["a:443"]
+    assert state["state"] == cb.OPEN
+    assert state["retry_after"] == 10  # остывание удвоилось
+
+    clock["now"] += 10
+    assert breakers.before_call("a:443") is True
+    breakers.record("a:443", True, probe=True)
+    assert breakers.snapshot()["a:443"]["state"] == cb.CLOSED
+
+
+def test_failures_outside_window_are_forgotten(clock, monkeypatch):
+    monkeypatch.setattr(cb, "BREAKER_MIN_CALLS", 3)
+    breakers = CircuitBreakers()
+    _fail(breakers, "a:443", 2)
+    clock["now"] += cb.BREAKER_WINDOW_SECONDS + 1
+    _fail(breakers, "a:443", 1)
+    assert breakers.snapshot()["a:443"]["state"] == cb.CLOSED
+
+
+def test_client_stops_calling_dead_host(monkeypatch):
+    monkeypatch.setattr("app.http_client._BACKOFF_BASE", 0.0, raising=True)
+    monkeypatch.setattr("app.http_client._MAX_RETRIES", 3, raising=True)
+    monkeypatch.setattr(cb, "BREAKER_MIN_CALLS", 3)
+    calls = {"n": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls["n"] += 1
+        raise httpx.ConnectError("down", request=request)
+
+    async def run():
+        client = SafeHttpClient(
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+        try:
+            # Третья неудача открывает breaker, четвертая попытка отклоняется сразу
+            with pytest.raises(CircuitOpenError):
+                await client.request("GET", "https://down.test/")
+            assert calls["n"] == 3
+            with pytest.raises(CircuitOpenError):
+                await client.request("GET", "https://down.test/")
+            assert calls["n"] == 3
+            assert client.breaker_states()["down.test:443"]["state"] == cb.OPEN
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+
+
+def test_breakers_endpoint_without_client(client, auth_token):
+    assert client.get("/api/external/breakers").status_code == 401
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    r = client.get("/api/external/breakers", headers=headers)
+    assert r.status_code == 200
+    assert r.json() == {}
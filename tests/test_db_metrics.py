@@ -0,0 +1,70 @@
+import logging
+
+from app import db_metrics
+
+
+def _create_ideas(client, auth_token, n):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    for i in range(n):
+        r = client.post(
+            "/api/ideas",
+            json={"title": f"Idea {i}", "description": "d"},
+            headers=headers,
+        )
+        assert r.status_code == 201
+    return headers
+
+
+def test_redact_hides_values():
+    assert db_metrics.redact(("secret", 1)) == ["?", "?"]
+    assert db_metrics.redact({"password": "secret"}) == {"password": "?"}
+    assert db_metrics.redact([("a",), ("b",)]) == "<2 parameter sets>"
+    assert db_metrics.redact(None) is None
+
+
+def test_debug_headers_off_by_default(client):
+    r = client.get("/api/ideas")
+    assert "X-DB-Queries" not in r.headers
+    assert "X-DB-Time" not in r.headers
+
+
+def test_debug_headers(client, monkeypatch):
+    monkeypatch.setattr(db_metrics, "DB_DEBUG_HEADERS", True)
+    r = client.get("/api/ideas")
+    assert int(r.headers["X-DB-Queries"]) == 1
+    assert float(r.headers["X-DB-Time"]) >= 0
+
+
+def test_query_counts_per_endpoint(client, auth_token, assert_queries):
+    headers = _create_ideas(client, auth_token, 2)
+    assert_queries(client.get("/api/ideas"), 1)
+    assert_queries(client.get("/api/ideas/1"), 1)
+    # Голос: идея, поиск прежнего голоса, INSERT, refresh
+    assert_queries(
+        client.post("/api/ideas/1/vote", json={"value": "за"}, headers=headers), 4
+    )
+    # Переголосование: идея, прежний голос, UPDATE
+    assert_queries(
+        client.post("/api/ideas/1/vote", json={"value": "против"}, headers=headers),
+        3,
+    )
+    assert_queries(client.delete("/api/ideas/2", headers=headers), 3)
+
+
+def test_list_has_no_n_plus_one(client, auth_token, assert_queries):
+    headers = _create_ideas(client, auth_token, 2)
+    assert_queries(client.get("/api/ideas"), 1)
+    _create_ideas(client, auth_token, 10)
+    for idea_id in range(1, 6):
+        client.post(f"/api/ideas/{idea_id}/vote", json={"value": "за"}, headers=headers)
+    assert_queries(client.get("/api/ideas"), 1)
+
+
+def test_slow_query_log_redacts_parameters(client, monkeypatch, caplog):
+    monkeypatch.setattr(db_metrics, "DB_SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="db"):
+        r = client.get("/api/ideas/424242", headers={"X-Correlation-ID": "slow-cid"})
+    assert r.status_code == 404
+    messages = [rec.getMessage() for rec in caplog.records if rec.name == "db"]
+    assert any("cid=slow-cid" in m and "FROM ideas" in m for m in messages)
+    assert not any("424242" in m for m in messages)
@@ -0,0 +1,150 @@
+import asyncio
+import socket
+
+import httpcore
+import httpx
+import pytest
+
+from app.dns_cache import CachingNetworkBackend, CachingResolver, install_resolver
+from app.http_client import SafeHttpClient
+
+
+class FakeResolver:
+    """Резолвер без сети: имя -> адреса, считает обращения"""
+
+    def __init__(self, table, delay: float = 0.0):
+        self.table = table
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, host, port):
+        self.calls.append(host)
+        await asyncio.sleep(self.delay)
+        if host not in self.table:
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        return self.table[host]
+
+
+def test_positive_entries_expire_after_ttl(monkeypatch):
+    fake = FakeResolver({"api.test": ["10.0.0.1"]})
+    resolver = CachingResolver(fake, ttl=30, negative_ttl=5)
+    now = {"t": 1000.0}
+    monkeypatch.setattr(resolver, "_now", lambda: now["t"])
+
+    async def run():
+        assert await resolver.resolve("api.test", 443) == ["10.0.0.1"]
+        assert await resolver.resolve("API.test", 443) == ["10.0.0.1"]
+        now["t"] += 31
+        await resolver.resolve("api.test", 443)
+
+    asyncio.run(run())
+    assert fake.calls == ["api.test", "api.test"]
+    assert resolver.stats()["hits"] == 1
+
+
+def test_negative_caching(monkeypatch):
+    fake = FakeResolver({})
+    resolver = CachingResolver(fake, ttl=30, negative_ttl=5)
+    now = {"t": 1000.0}
+    monkeypatch.setattr(resolver, "_now", lambda: now["t"])
+
+    async def run():
+        for _ in range(3):
+            with pytest.raises(httpcore.ConnectError):
+                await resolver.resolve("missing.test", 80)
+        now["t"] += 6
+        with pytest.raises(httpcore.ConnectError):
+            await resolver.resolve("missing.test", 80)
+
+    asyncio.run(run())
+    assert len(fake.calls) == 2
+    assert resolver.stats()["negative_hits"] == 2
+
+
+def test_size_bound_and_concurrent_lookups():
+    fake = FakeResolver({f"h{i}.test": [f"10.0.0.{i}"] for i in range(5)}, delay=0.05)
+    resolver = CachingResolver(fake, max_entries=2)
+
+    async def run():
+        results = await asyncio.gather(
+            *(resolver.resolve("h0.test", 80) for _ in range(10))
+        )
+        assert all(r == ["10.0.0.0"] for r in results)
+        for i in range(1, 5):
+            await resolver.resolve(f"h{i}.test", 80)
+
+    asyncio.run(run())
+    assert fake.calls.count("h0.test") == 1
+    assert resolver.stats()["entries"] == 2
+
+
+async def _start_server():
+    stats = {"connections": 0}
+
+    async def handle(reader, writer):
+        stats["connections"] += 1
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: close\r\n\r\nok"
+        )
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1], stats
+
+
+def test_timed_out_lookup_does_not_fail_other_waiters():
+    fake = FakeResolver({"api.test": ["10.0.0.1"]}, delay=0.1)
+    resolver = CachingResolver(fake, ttl=30, negative_ttl=5)
+
+    async def lookup(budget):
+        # Как в connect_tcp: поиск ограничен таймаутом подключения
+        async with asyncio.timeout(budget):
+            return await resolver.resolve("api.test", 443)
+
+    async def run():
+        return await asyncio.gather(lookup(0.05), lookup(5), return_exceptions=True)
+
+    leader, follower = asyncio.run(run())
+    assert isinstance(leader, TimeoutError)
+    assert follower == ["10.0.0.1"]
+    assert fake.calls == ["api.test"]
+
+
+def test_client_resolves_through_cache_on_new_connections():
+    fake = FakeResolver({"svc.internal": ["127.0.0.1"]})
+
+    async def run():
+        server, port, stats = await _start_server()
+        client = SafeHttpClient(resolver=CachingResolver(fake))
+        try:
+            for _ in range(3):
+                r = await client.request("GET", f"http://svc.internal:{port}/")
+                assert r.status_code == 200 and r.text == "ok"
+            # Сервер закрывает соединения: каждый запрос — новое подключение
+            assert stats["connections"] == 3
+            with pytest.raises(httpx.ConnectError):
+                await client.request(
+                    "GET", f"http://nowhere.internal:{port}/", deadline=1
+                )
+        finally:
+            await client.aclose()
+            server.close()
+
+    asyncio.run(run())
+    assert fake.calls.count("svc.internal") == 1
+    # Ретраи после ошибки резолва не ходят в резолвер повторно
+    assert fake.calls.count("nowhere.internal") == 1
+
+
+def test_install_resolver_skips_unknown_transport_internals():
+    transport = httpx.AsyncHTTPTransport()
+    assert install_resolver(transport, CachingResolver(FakeResolver({})))
+    assert isinstance(transport._pool._network_backend, CachingNetworkBackend)
+
+    # Другая версия httpcore: у пула нет ожидаемого атрибута — пул не трогаем
+    transport = httpx.AsyncHTTPTransport()
+    del transport._pool._network_backend
+    assert not install_resolver(transport, CachingResolver(FakeResolver({})))
+    assert not hasattr(transport._pool, "_network_backend")
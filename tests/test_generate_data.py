@@ -0,0 +1,44 @@
+from collections import Counter
+
+from sqlalchemy import create_engine, func, select
+
+from app import models
+from scripts.generate_data import generate, rank_permutation
+
+
+def test_rank_permutation_is_bijection():
+    for n in (1, 2, 10, 97, 1000):
+        step = rank_permutation(n)
+        assert sorted((r * step) % n for r in range(n)) == list(range(n))
+
+
+def test_generate_zipf_votes_and_append(tmp_path):
+    url = f"sqlite:///{tmp_path / 'gen.db'}"
+    result = generate(
+        url, users=50, ideas=40, votes=600, workers=2, password_hash="hash"
+    )
+    assert result == {"users": 50, "ideas": 40, "votes": 600}
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        pairs = conn.execute(select(models.Vote.user_id, models.Vote.idea_id)).all()
+        hashes = conn.scalars(select(models.User.hashed_password).distinct()).all()
+    assert len(set(pairs)) == len(pairs) == 600
+    assert hashes == ["hash"]  # хэш пароля один на всех
+    # Ципф: самая популярная идея набирает в разы больше голосов, чем медиана
+    counts = sorted(Counter(idea for _, idea in pairs).values(), reverse=True)
+    assert counts[0] >= 3 * counts[len(counts) // 2]
+
+    # Повторный запуск дописывает данные после существующих id
+    generate(url, users=10, ideas=5, votes=20, workers=1, password_hash="hash")
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(models.User)) == 60
+        assert conn.scalar(select(func.max(models.Idea.id))) == 45
+        new_votes = conn.execute(
+            select(models.Vote.user_id, models.Vote.idea_id).where(
+                models.Vote.user_id > 50
+            )
+        ).all()
+    assert len(new_votes) == 20
+    assert all(idea > 40 for _, idea in new_votes)
+    engine.dispose()
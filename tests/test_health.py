@@ -22,3 +22,181 @@ def test_startup_db_unavailable(mock_wait_for_db, client):
 
     # Проверяем что wait_for_db вызывалась
     mock_wait_for_db.assert_called_once()
+
+
+def test_wait_for_db_backs_off_without_blocking(monkeypatch):
+    import asyncio
+
+    from sqlalchemy.exc import OperationalError
+
+    from app import main
+
+    calls = {"n": 0}
+    delays = []
+
+    def flaky_probe():
+        calls["n"] += 1
+        if calls["n"] <= 3:
+            raise OperationalError("SELECT 1", {}, Exception("down"))
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(main, "_probe_db", flaky_probe)
+    monkeypatch.setattr(main.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(main, "DB_WAIT_BACKOFF_BASE", 0.1)
+    monkeypatch.setattr(main, "DB_WAIT_BACKOFF_MAX", 0.3)
+
+    assert asyncio.run(main.wait_for_db()) is True
+    assert calls["n"] == 4
+    # Экспоненциальный рост с джиттером в пределах [d/2, d] и потолком
+    assert 0.05 <= delays[0] <= 0.1
+    assert 0.1 <= delays[1] <= 0.2
+    assert 0.15 <= delays[2] <= 0.3
+
+
+def test_wait_for_db_gives_up_after_timeout(monkeypatch):
+    import asyncio
+
+    from sqlalchemy.exc import OperationalError
+
+    from app import main
+
+    def down():
+        raise OperationalError("SELECT 1", {}, Exception("down"))
+
+    monkeypatch.setattr(main, "_probe_db", down)
+    monkeypatch.setattr(main, "DB_WAIT_TIMEOUT", 0.05)
+    monkeypatch.setattr(main, "DB_WAIT_BACKOFF_BASE", 0.01)
+
+    assert asyncio.run(main.wait_for_db()) is False
+
+
+def test_schema_ddl_skipped_when_current(tmp_path):
+    from sqlalchemy import create_engine
+
+    from app.main import ensure_schema
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    assert ensure_schema(engine) is True
+    assert ensure_schema(engine) is False
+
+
+def test_schema_upgrade_adds_missing_indexes(tmp_path):
+    from sqlalchemy import create_engine, inspect, text
+
+    from app.main import ensure_schema
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    ensure_schema(engine)
+    # БД предыдущей версии: таблицы есть, нового индекса еще нет
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_votes_user_id_id"))
+        conn.execute(text("UPDATE schema_version SET version = version - 1"))
+    assert ensure_schema(engine) is True
+    indexes = {i["name"] for i in inspect(engine).get_indexes("votes")}
+    assert "ix_votes_user_id_id" in indexes
+
+
+def test_schema_upgrade_adds_missing_columns(tmp_path):
+    from sqlalchemy import create_engine, inspect, text
+
+    from app.main import ensure_schema
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    with engine.begin() as conn:
+        # Таблица ideas из версии без колонки version
+        conn.execute(
+            text(
+                "CREATE TABLE ideas (id INTEGER PRIMARY KEY, title VARCHAR, "
+                "description VARCHAR, owner_id INTEGER)"
+            )
+        )
+        conn.execute(text("INSERT INTO ideas (title) VALUES ('old')"))
+    assert ensure_schema(engine) is True
+    assert "version" in {c["name"] for c in inspect(engine).get_columns("ideas")}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version FROM ideas")).scalar() == 1
+
+
+def test_schema_upgrade_adds_token_version(tmp_path):
+    from sqlalchemy import create_engine, inspect, text
+
+    from app.main import ensure_schema
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    with engine.begin() as conn:
+        # Таблица users до появления token_version
+        conn.execute(
+            text(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR, "
+                "email VARCHAR, hashed_password VARCHAR, is_active BOOLEAN)"
+            )
+        )
+        conn.execute(text("INSERT INTO users (username) VALUES ('old')"))
+    assert ensure_schema(engine) is True
+    assert "token_version" in {c["name"] for c in inspect(engine).get_columns("users")}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT token_version FROM users")).scalar() == 0
+
+
+def test_schema_version_never_goes_back(tmp_path):
+    from sqlalchemy import create_engine, text
+
+    from app import models
+    from app.main import ensure_schema
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    ensure_schema(engine)
+    # Более новый воркер уже обновил схему: старый код версию не понижает
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE schema_version SET version = version + 1"))
+    assert ensure_schema(engine) is True
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, version FROM schema_version")).all()
+    assert rows == [(1, models.SCHEMA_VERSION + 1)]
+
+
+def test_add_missing_columns_tolerates_concurrent_worker(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine, inspect, text
+
+    from app import main
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    main.ensure_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE ideas DROP COLUMN version"))
+
+    # Между проверкой и ALTER колонку добавил другой воркер
+    real_inspect = main.inspect
+    raced = []
+
+    class RacingInspector:
+        def __init__(self, bind):
+            self.bind = bind
+
+        def get_columns(self, table):
+            columns = real_inspect(self.bind).get_columns(table)
+            if table == "ideas" and not raced:
+                raced.append(table)
+                with self.bind.begin() as conn:
+                    conn.execute(
+                        text("ALTER TABLE ideas ADD COLUMN version INTEGER DEFAULT 1")
+                    )
+            return columns
+
+    def racing_inspect(bind):
+        return RacingInspector(bind)
+
+    monkeypatch.setattr(main, "inspect", racing_inspect)
+    main._add_missing_columns(engine)
+    assert raced == ["ideas"]
+    assert "version" in {c["name"] for c in inspect(engine).get_columns("ideas")}
+
+
+def test_startup_timings_reported(client):
+    from app.main import app
+
+    timings = app.state.startup_timings
+    assert set(timings) == {"imports", "db_wait", "schema"}
+    assert all(v >= 0 for v in timings.values())
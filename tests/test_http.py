@@ -57,3 +57,81 @@ def test_timeout_retries_then_raises(monkeypatch):
             await client.aclose()
 
     asyncio.run(run())
+
+
+def test_stream_prefix_caps_body():
+    sent = {"chunks": 0}
+
+    async def body():
+        for _ in range(1000):
+            sent["chunks"] += 1
+            yield b"x" * 1024
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=body(), request=request)
+
+    async def run():
+        client = SafeHttpClient(
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+        try:
+            r = await client.stream_prefix(
+                "GET", "https://example.test/big", prefix_bytes=10, max_bytes=8 * 1024
+            )
+            assert r.status_code == 200
+            assert r.prefix == b"x" * 10
+            assert r.bytes_read == 8 * 1024
+            assert r.truncated
+            # Остаток тела не вычитывался
+            assert sent["chunks"] < 1000
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+
+
+def test_stream_prefix_read_deadline(monkeypatch):
+    monkeypatch.setattr("app.http_client._MAX_RETRIES", 0, raising=True)
+
+    async def slow_body():
+        yield b"start"
+        await asyncio.sleep(1)
+        yield b"never"
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=slow_body(), request=request)
+
+    async def run():
+        client = SafeHttpClient(
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+        try:
+            with pytest.raises(httpx.ReadTimeout):
+                await client.stream_prefix(
+                    "GET", "https://example.test/slow", read_deadline=0.05
+                )
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+
+
+def test_external_ping_uses_streaming(client):
+    from app.main import app
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, text="привет " * 100, request=request)
+
+    app.state.http_client = SafeHttpClient(
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    try:
+        r = client.get("/api/external/ping", params={"url": "https://example.test/"})
+    finally:
+        del app.state.http_client
+    assert r.status_code == 200
+    body = r.json()
+    assert len(body["snippet"]) == 200
+    assert body["snippet"].startswith("привет")
+    assert body["length"] == len(("привет " * 100).encode())
+    assert body["truncated"] is False
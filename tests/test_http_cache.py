@@ -0,0 +1,238 @@
+import asyncio
+
+import httpx
+
+from app.http_cache import ResponseCache, freshness_lifetime
+from app.http_client import SafeHttpClient
+
+
+def _client(handler, cache=None):
+    return SafeHttpClient(
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        cache=cache or ResponseCache(max_entries=16, max_bytes=1024),
+    )
+
+
+def test_freshness_lifetime_rules():
+    assert freshness_lifetime(httpx.Headers({"cache-control": "max-age=60"})) == 60
+    assert (
+        freshness_lifetime(httpx.Headers({"cache-control": "max-age=60", "age": "15"}))
+        == 45
+    )
+    assert freshness_lifetime(httpx.Headers({"cache-control": "no-store"})) is None
+    assert freshness_lifetime(httpx.Headers({"cache-control": "private"})) is None
+    # Без явной свежести храним только то, что можно ревалидировать
+    assert freshness_lifetime(httpx.Headers({})) is None
+    assert freshness_lifetime(httpx.Headers({"etag": '"v1"'})) == 0
+    # s-maxage=0 для общего кэша важнее max-age
+    headers = httpx.Headers({"cache-control": "s-maxage=0, max-age=60"})
+    assert freshness_lifetime(headers) == 0
+    assert freshness_lifetime(httpx.Headers({"vary": "*"})) is None
+
+
+def test_max_age_served_from_cache():
+    calls = {"n": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls["n"] += 1
+        return httpx.Response(
+            200, text="hello", headers={"Cache-Control": "max-age=60"}, request=request
+        )
+
+    async def run():
+        client = _client(handler)
+        try:
+            for _ in range(3):
+                resp = await client.request("GET", "https://cache.test/a")
+                assert resp.text == "hello"
+            # POST и запросы с Authorization мимо кэша
+            await client.request("POST", "https://cache.test/a")
+            await client.request(
+                "GET", "https://cache.test/a", headers={"Authorization": "Bearer x"}
+            )
+            return client.cache_stats()
+        finally:
+            await client.aclose()
+
+    stats = asyncio.run(run())
+    assert calls["n"] == 3
+    assert stats["hits"] == 2 and stats["misses"] == 1
+    assert stats["bytes_saved"] == 10
+    assert stats["hit_ratio"] == round(2 / 3, 4)
+
+
+def test_vary_keys_cache_by_listed_request_headers():
+    calls = {"n": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls["n"] += 1
+        return httpx.Response(
+            200,
+            text=request.headers.get("accept-language", "default"),
+            headers={"Cache-Control": "max-age=60", "Vary": "Accept-Language"},
+            request=request,
+        )
+
+    async def run():
+        client = _client(handler)
+        url = "https://cache.test/i18n"
+        try:
+            texts = []
+            for lang in ("ru", "en", "ru", "en", None):
+                headers = {"Accept-Language": lang} if lang else None
+                resp = await client.request("GET", url, headers=headers)
+                texts.append(resp.text)
+            return texts
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == ["ru", "en", "ru", "en", "default"]
+    # Первый запрос еще не знает про Vary; дальше — по записи на вариант
+    assert calls["n"] == 3
+
+
+def test_revalidation_with_etag():
+    seen = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"'}, request=request)
+        return httpx.Response(
+            200,
+            text="body-v1",
+            headers={"ETag": '"v1"', "Cache-Control": "no-cache"},
+            request=request,
+        )
+
+    async def run():
+        client = _client(handler)
+        try:
+            first = await client.request("GET", "https://cache.test/e")
+            second = await client.request("GET", "https://cache.test/e")
+            assert first.text == second.text == "body-v1"
+            assert second.status_code == 200
+            return client.cache_stats()
+        finally:
+            await client.aclose()
+
+    stats = asyncio.run(run())
+    assert seen == [None, '"v1"']
+    assert stats["revalidated"] == 1 and stats["bytes_saved"] == len("body-v1")
+
+
+def test_concurrent_misses_collapse():
+    calls = {"n": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls["n"] += 1
+        await asyncio.sleep(0.05)
+        return httpx.Response(
+            200, text="x", headers={"Cache-Control": "max-age=60"}, request=request
+        )
+
+    async def run():
+        client = _client(handler)
+        try:
+            results = await asyncio.gather(
+                *(client.request("GET", "https://cache.test/c") for _ in range(5))
+            )
+            assert all(r.text == "x" for r in results)
+            return client.cache_stats()
+        finally:
+            await client.aclose()
+
+    stats = asyncio.run(run())
+    assert calls["n"] == 1
+    assert stats["coalesced"] == 4
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    calls = {"n": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls["n"] += 1
+        await asyncio.sleep(0.1)
+        return httpx.Response(
+            200, text="x", headers={"Cache-Control": "max-age=60"}, request=request
+        )
+
+    async def run():
+        client = _client(handler)
+        try:
+            leader = asyncio.create_task(client.request("GET", "https://cache.test/c"))
+            await asyncio.sleep(0.01)
+            follower = asyncio.create_task(
+                client.request("GET", "https://cache.test/c")
+            )
+            await asyncio.sleep(0.01)
+            # Клиент ведущего запроса отключился
+            leader.cancel()
+            assert (await follower).text == "x"
+            assert leader.cancelled()
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+    assert calls["n"] == 1
+
+
+def test_cache_bounded_by_entries_and_bytes():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        size = int(request.url.params["size"])
+        return httpx.Response(
+            200, content=b"a" * size, headers={"Cache-Control": "max-age=60"}
+        )
+
+    async def run():
+        cache = ResponseCache(max_entries=2, max_bytes=100)
+        client = _client(handler, cache)
+        try:
+            for i, size in enumerate((10, 20, 30)):
+                await client.request("GET", f"https://cache.test/{i}?size={size}")
+            assert cache.stats()["entries"] == 2  # вытеснена самая старая
+            await client.request("GET", "https://cache.test/big?size=500")
+            assert cache.stats()["entries"] == 2  # больше лимита — не храним
+            await client.request("GET", "https://cache.test/3?size=90")
+            assert cache.bytes <= 100
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+
+
+def test_stream_prefix_uses_cache():
+    calls = {"n": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls["n"] += 1
+        return httpx.Response(
+            200, text="pong" * 10, headers={"Cache-Control": "max-age=30"}
+        )
+
+    async def run():
+        client = _client(handler)
+        try:
+            a = await client.stream_prefix(
+                "GET", "https://cache.test/p", prefix_bytes=8
+            )
+            b = await client.stream_prefix(
+                "GET", "https://cache.test/p", prefix_bytes=8
+            )
+            assert a.prefix == b.prefix == b"pongpong"
+            assert b.bytes_read == 40
+            # Другие лимиты чтения — другой ключ
+            await client.stream_prefix("GET", "https://cache.test/p", prefix_bytes=4)
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+    assert calls["n"] == 2
+
+
+def test_cache_endpoint_requires_auth(client, auth_token):
+    assert client.get("/api/external/cache").status_code == 401
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    r = client.get("/api/external/cache", headers=headers)
+    assert r.status_code == 200
+    assert "enabled" in r.json() or "hit_ratio" in r.json()
@@ -0,0 +1,136 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.http_client import DeadlineExceeded, RetryBudget, SafeHttpClient
+
+
+def _client(handler):
+    return SafeHttpClient(
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+
+
+def test_deadline_from_headers():
+    from app.http_client import deadline_from_headers
+
+    assert deadline_from_headers({"X-Request-Timeout-Ms": "1500"}) == 1.5
+    assert deadline_from_headers({"X-Request-Timeout-Ms": "abc"}) is None
+    assert deadline_from_headers({"X-Request-Timeout-Ms": "0"}) is None
+    assert deadline_from_headers({}) is None
+
+
+def test_retries_stop_when_deadline_too_close(monkeypatch):
+    monkeypatch.setattr("app.http_client._BACKOFF_BASE", 0.2, raising=True)
+    monkeypatch.setattr("app.http_client._MAX_RETRIES", 10, raising=True)
+    monkeypatch.setattr("app.http_client._MIN_ATTEMPT_SECONDS", 0.05, raising=True)
+    calls = {"n": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls["n"] += 1
+        return httpx.Response(503, request=request)
+
+    async def run():
+        client = _client(handler)
+        try:
+            t0 = time.monotonic()
+            resp = await client.request("GET", "https://slow.test/", deadline=0.5)
+            elapsed = time.monotonic() - t0
+            # Последний ответ отдается как есть, без выхода за дедлайн
+            assert resp.status_code == 503
+            assert elapsed < 0.5
+            assert 2 <= calls["n"] <= 3
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+
+
+def test_waiting_for_slot_respects_deadline(monkeypatch):
+    monkeypatch.setattr("app.http_client._CONCURRENCY_LIMIT", 1, raising=True)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.5)
+        return httpx.Response(200, request=request)
+
+    async def run():
+        client = _client(handler)
+        try:
+            busy = asyncio.create_task(client.request("GET", "https://a.test/"))
+            await asyncio.sleep(0.01)
+            with pytest.raises(DeadlineExceeded):
+                await client.request("GET", "https://b.test/", deadline=0.1)
+            await busy
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+
+
+def test_deadline_bounds_slowly_trickled_body():
+    class Trickle(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            # Каждый байт укладывается в таймаут чтения, весь ответ — нет
+            for _ in range(100):
+                await asyncio.sleep(0.05)
+                yield b"x"
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, stream=Trickle(), request=request)
+
+    async def run():
+        client = _client(handler)
+        try:
+            t0 = time.monotonic()
+            with pytest.raises(DeadlineExceeded):
+                await client.request(
+                    "GET", "https://trickle.test/", timeout=10, deadline=0.3
+                )
+            assert time.monotonic() - t0 < 1.0
+            t0 = time.monotonic()
+            with pytest.raises(DeadlineExceeded):
+                await client.stream_prefix(
+                    "GET", "https://trickle.test/", read_deadline=10, deadline=0.3
+                )
+            assert time.monotonic() - t0 < 1.0
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+
+
+def test_retry_budget_limits_amplification(monkeypatch):
+    monkeypatch.setattr("app.http_client._BACKOFF_BASE", 0.0, raising=True)
+    monkeypatch.setattr("app.http_client._MAX_RETRIES", 5, raising=True)
+    # Breaker здесь не проверяем — пусть не открывается
+    monkeypatch.setattr("app.circuit_breaker.BREAKER_MIN_CALLS", 1000, raising=True)
+    calls = {"n": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls["n"] += 1
+        return httpx.Response(500, request=request)
+
+    async def run():
+        client = _client(handler)
+        client._retry_budget = RetryBudget(ratio=0.1, min_tokens=2)
+        try:
+            for _ in range(10):
+                await client.request("GET", "https://down.test/")
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+    # 10 вызовов + 2 стартовых ретрая + ~1 ретрай из пополнения 10 * 0.1
+    assert calls["n"] <= 13
+
+
+def test_retry_budget_refills_with_traffic():
+    budget = RetryBudget(ratio=0.5, min_tokens=1)
+    assert budget.try_withdraw()
+    assert not budget.try_withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.try_withdraw()
+    assert budget.denied == 1
@@ -0,0 +1,151 @@
+import asyncio
+import json
+
+import httpx
+
+from app.http_client import DeadlineExceeded, SafeHttpClient
+
+
+def _client(handler):
+    return SafeHttpClient(
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+
+
+async def _delayed(request: httpx.Request) -> httpx.Response:
+    await asyncio.sleep(float(request.url.params.get("delay", "0")))
+    return httpx.Response(200, text=request.url.path, request=request)
+
+
+def test_map_yields_as_completed_and_gather_keeps_order():
+    urls = [
+        "https://a.test/slow?delay=0.2",
+        "https://b.test/fast?delay=0.01",
+        "https://c.test/mid?delay=0.1",
+    ]
+
+    async def run():
+        client = _client(_delayed)
+        try:
+            streamed = [r.index async for r in client.map(urls)]
+            gathered = await client.gather(urls)
+            return streamed, gathered
+        finally:
+            await client.aclose()
+
+    streamed, gathered = asyncio.run(run())
+    assert streamed == [1, 2, 0]
+    assert [r.response.text for r in gathered] == ["/slow", "/fast", "/mid"]
+
+
+def test_map_bounds_concurrency_and_pulls_items_lazily():
+    state = {"active": 0, "peak": 0, "pulled": 0, "done": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        state["done"] += 1
+        return httpx.Response(200, request=request)
+
+    def urls():
+        for i in range(30):
+            state["pulled"] += 1
+            yield f"https://host{i % 10}.test/{i}"
+
+    async def run():
+        client = _client(handler)
+        try:
+            seen = 0
+            async for result in client.map(urls(), concurrency=3):
+                assert result.ok
+                seen += 1
+                # Вперед берется не больше окна конкурентности
+                assert state["pulled"] <= state["done"] + 3
+            return seen
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == 30
+    assert state["peak"] <= 3
+
+
+def test_map_per_item_deadline_does_not_fail_batch():
+    async def run():
+        client = _client(_delayed)
+        try:
+            return await client.gather(
+                ["https://a.test/ok", "https://b.test/hang?delay=5"], deadline=0.2
+            )
+        finally:
+            await client.aclose()
+
+    ok, hung = asyncio.run(run())
+    assert ok.ok and ok.response.status_code == 200
+    assert isinstance(hung.error, DeadlineExceeded)
+    assert hung.elapsed < 1
+
+
+def test_map_cancels_pending_on_early_exit():
+    cancelled = {"n": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/first":
+            return httpx.Response(200, request=request)
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled["n"] += 1
+            raise
+        return httpx.Response(200, request=request)
+
+    async def run():
+        client = _client(handler)
+        try:
+            results = client.map(
+                ["https://a.test/first", "https://b.test/x", "https://c.test/y"]
+            )
+            async for _ in results:
+                break
+            await results.aclose()
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+    assert cancelled["n"] == 2
+
+
+def test_external_ping_batch_streams_ndjson(client):
+    from app.main import app
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "down.test":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, text="pong", request=request)
+
+    app.state.http_client = SafeHttpClient(
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    try:
+        r = client.post(
+            "/api/external/ping/batch",
+            json={"urls": ["https://up.test/", "https://down.test/"]},
+        )
+    finally:
+        del app.state.http_client
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    items = sorted(
+        (json.loads(line) for line in r.text.splitlines()), key=lambda i: i["index"]
+    )
+    assert items[0]["status_code"] == 200 and items[0]["snippet"] == "pong"
+    assert items[1]["url"] == "https://down.test/" and "error" in items[1]
+
+
+def test_external_ping_batch_limits_size(client):
+    r = client.post(
+        "/api/external/ping/batch",
+        json={"urls": [f"https://h{i}.test/" for i in range(101)]},
+    )
+    assert r.status_code == 422
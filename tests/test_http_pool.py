@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import httpx
+
+from app.http_client import SafeHttpClient
+
+
+async def _start_server(delay: float = 0.0):
+    """Минимальный локальный HTTP/1.1 сервер с keep-alive"""
+    stats = {"connections": 0, "requests": 0}
+
+    async def handle(reader, writer):
+        stats["connections"] += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                if not head:
+                    break
+                stats["requests"] += 1
+                await asyncio.sleep(delay)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n"
+                    b"Connection: keep-alive\r\n\r\nok"
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}", stats
+
+
+def test_keepalive_reuses_connection():
+    async def run():
+        server, base, stats = await _start_server()
+        client = SafeHttpClient(
+            limits=httpx.Limits(max_connections=5, keepalive_expiry=30)
+        )
+        try:
+            for _ in range(3):
+                r = await client.request("GET", f"{base}/")
+                assert r.status_code == 200
+            assert stats["requests"] == 3
+            assert stats["connections"] == 1
+        finally:
+            await client.aclose()
+            server.close()
+
+    asyncio.run(run())
+
+
+def test_slow_host_does_not_starve_others(monkeypatch):
+    monkeypatch.setattr("app.http_client._CONCURRENCY_LIMIT", 4, raising=True)
+
+    async def run():
+        slow_server, slow, _ = await _start_server(delay=0.5)
+        fast_server, fast, _ = await _start_server()
+        client = SafeHttpClient(per_host_limit=2)
+        try:
+            slow_calls = [
+                asyncio.create_task(client.request("GET", f"{slow}/")) for _ in range(6)
+            ]
+            await asyncio.sleep(0.05)
+            t0 = time.monotonic()
+            r = await client.request("GET", f"{fast}/")
+            elapsed = time.monotonic() - t0
+            assert r.status_code == 200
+            # Медленный хост занимает максимум 2 из 4 глобальных слотов
+            assert elapsed < 0.3
+            await asyncio.gather(*slow_calls)
+        finally:
+            await client.aclose()
+            slow_server.close()
+            fast_server.close()
+
+    asyncio.run(run())
+
+
+def test_backoff_sleep_releases_global_slot(monkeypatch):
+    monkeypatch.setattr("app.http_client._CONCURRENCY_LIMIT", 1, raising=True)
+    monkeypatch.setattr("app.http_client._BACKOFF_BASE", 0.5, raising=True)
+    monkeypatch.setattr("app.http_client._MAX_RETRIES", 1, raising=True)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "flaky.test":
+            return httpx.Response(503, request=request)
+        return httpx.Response(200, request=request)
+
+    async def run():
+        client = SafeHttpClient(
+            client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+        try:
+            flaky = asyncio.create_task(client.request("GET", "https://flaky.test/"))
+            await asyncio.sleep(0.05)  # flaky ушел в backoff
+            t0 = time.monotonic()
+            r = await client.request("GET", "https://ok.test/")
+            assert r.status_code == 200
+            assert time.monotonic() - t0 < 0.3
+            assert (await flaky).status_code == 503
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
@@ -0,0 +1,109 @@
+from app.crud.crud_users import create_user
+from app.schemas import UserCreate
+
+
+def _login(client, db_session, username):
+    create_user(
+        db_session,
+        UserCreate(
+            username=username, email=f"{username}@example.com", password="pass12345"
+        ),
+    )
+    r = client.post("/api/token", data={"username": username, "password": "pass12345"})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def _seed(client, db_session):
+    """Идеи 1..3; голоса: 1 -> +1, 2 -> +2, 3 -> -1 (и один воздержавшийся)"""
+    voters = [_login(client, db_session, f"voter{i}") for i in range(3)]
+    for i in range(3):
+        client.post(
+            "/api/ideas",
+            json={"title": f"Idea {i}", "description": "d"},
+            headers=voters[0],
+        )
+    for headers, votes in zip(
+        voters,
+        (
+            {1: "за", 2: "за", 3: "против"},
+            {2: "за", 3: "воздержаться"},
+            {},
+        ),
+    ):
+        for idea_id, value in votes.items():
+            client.post(
+                f"/api/ideas/{idea_id}/vote", json={"value": value}, headers=headers
+            )
+    return voters
+
+
+def test_plain_idea_unchanged(client, db_session):
+    _seed(client, db_session)
+    body = client.get("/api/ideas/1").json()
+    assert set(body) == {"id", "title", "description", "owner_id"}
+
+
+def test_idea_with_scores_and_rank(client, db_session, assert_queries):
+    _seed(client, db_session)
+    r = client.get("/api/ideas/3", params={"scores": "true"})
+    assert_queries(r, 1)
+    body = r.json()
+    assert (body["up_votes"], body["down_votes"], body["abstain_votes"]) == (0, 1, 1)
+    assert body["score"] == -1
+    assert "rank" not in body
+
+    ranks = {}
+    for idea_id in (1, 2, 3):
+        r = client.get(f"/api/ideas/{idea_id}", params={"rank": "true"})
+        assert_queries(r, 1)
+        assert "ETag" not in r.headers
+        ranks[idea_id] = (r.json()["score"], r.json()["rank"])
+    assert ranks == {1: (1, 2), 2: (2, 1), 3: (-1, 3)}
+
+    # Идея без голосов (счет 0) выше идеи с отрицательным счетом
+    client.post(
+        "/api/ideas",
+        json={"title": "Fresh idea", "description": "d"},
+        headers=_login(client, db_session, "author"),
+    )
+    assert client.get("/api/ideas/4", params={"rank": "true"}).json()["rank"] == 3
+    assert client.get("/api/ideas/3", params={"rank": "true"}).json()["rank"] == 4
+    assert client.get("/api/ideas/42", params={"rank": "true"}).status_code == 404
+
+
+def test_etag_follows_idea_version_and_votes(client, db_session, assert_queries):
+    voters = _seed(client, db_session)
+    r = client.get("/api/ideas/1", params={"scores": "true"})
+    etag = r.headers["ETag"]
+    assert r.headers["Cache-Control"] == "no-cache"
+    assert etag != client.get("/api/ideas/1").headers["ETag"]  # разные варианты
+
+    r = client.get(
+        "/api/ideas/1", params={"scores": "true"}, headers={"If-None-Match": etag}
+    )
+    assert r.status_code == 304
+    assert_queries(r, 1)  # версия и счетчики одним запросом, тело не отдается
+
+    # Голос меняет счет — и ETag варианта со scores; строку идеи он не трогает
+    plain_etag = client.get("/api/ideas/1").headers["ETag"]
+    client.post("/api/ideas/1/vote", json={"value": "против"}, headers=voters[2])
+    assert client.get("/api/ideas/1").headers["ETag"] == plain_etag
+    r = client.get(
+        "/api/ideas/1", params={"scores": "true"}, headers={"If-None-Match": etag}
+    )
+    assert r.status_code == 200
+    assert r.json()["score"] == 0
+    assert r.headers["ETag"] != etag
+
+    # Правка идеи тоже
+    etag = r.headers["ETag"]
+    client.put(
+        "/api/ideas/1",
+        json={"title": "Idea 0 v2", "description": "d"},
+        headers=voters[0],
+    )
+    r = client.get(
+        "/api/ideas/1", params={"scores": "true"}, headers={"If-None-Match": etag}
+    )
+    assert r.status_code == 200
+    assert r.json()["title"] == "Idea 0 v2"
@@ -0,0 +1,8 @@
+from scripts import importtime
+
+
+def test_app_import_within_budget_and_lazy():
+    rows = importtime.collect("app.main")
+    # Тяжелые зависимости грузятся при первом использовании, а не при импорте
+    assert importtime.imported_lazy_modules(rows) == []
+    assert importtime.total_ms(rows) <= importtime.DEFAULT_BUDGET_MS
@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+from app.crud import crud_users
+from scripts.loadtest import (
+    BUDGETS_PATH,
+    DEFAULT_MIX,
+    ROUTES,
+    asgi_clients,
+    check_budgets,
+    run_load,
+)
+
+
+def test_load_run_reports_every_route(client, monkeypatch):
+    from app import main as app_main
+    from app.routers import users as users_router
+
+    # Лимиты и стоимость Argon2 здесь не предмет измерения
+    monkeypatch.setattr(app_main, "RATE_LIMIT_POST_PER_MIN_PER_IP", 10_000)
+    monkeypatch.setattr(app_main, "RATE_LIMIT_LOGIN_PER_10MIN_PER_IP", 10_000)
+    monkeypatch.setattr(users_router, "LOGIN_PER_10MIN_PER_ACCOUNT", 10_000)
+    monkeypatch.setattr(
+        crud_users, "_pwd_context", crud_users.build_pwd_context(1, 1024, 1)
+    )
+
+    report = asyncio.run(
+        run_load(
+            asgi_clients(client.app),
+            concurrency=1,
+            requests=60,
+            ideas=3,
+            mix={op: 1 for op in DEFAULT_MIX},
+        )
+    )
+    assert report["requests"] == 60
+    assert set(report["routes"]) == set(ROUTES.values())
+    for stats in report["routes"].values():
+        assert stats["errors"] == 0
+        assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+
+    assert check_budgets(report, {"routes": {}}) == []
+    violations = check_budgets(
+        report, {"routes": {"GET /api/ideas": {"p50_ms": 0}}, "min_total_rps": 1e9}
+    )
+    assert len(violations) == 2
+
+
+def test_checked_in_budgets_cover_all_routes():
+    budgets = json.loads(BUDGETS_PATH.read_text())
+    assert set(budgets["routes"]) == set(ROUTES.values())
@@ -0,0 +1,48 @@
+import json
+
+from scripts.microbench import compare, main, parse_sizes
+
+
+def test_parse_sizes():
+    assert parse_sizes("10x5x20,100X50x1000") == [(10, 5, 20), (100, 50, 1000)]
+
+
+def test_microbench_writes_comparable_json(tmp_path):
+    output = tmp_path / "bench.json"
+    code = main(
+        [
+            "--database-url",
+            f"sqlite:///{tmp_path / 'bench.db'}",
+            "--sizes",
+            "20x10x500",
+            "--iterations",
+            "5",
+            "--warmup",
+            "1",
+            "--output",
+            str(output),
+        ]
+    )
+    assert code == 0
+    report = json.loads(output.read_text())
+    assert report["dialect"] == "sqlite"
+    (run,) = report["runs"]
+    # Голосов не больше, чем пар (пользователь, идея)
+    assert (run["ideas"], run["users"], run["votes"]) == (20, 10, 200)
+    assert set(run["functions"]) == {
+        "crud_ideas.get_ideas_with_scores",
+        "crud_ideas.vote_idea",
+        "crud_users.get_user_by_username",
+        "InMemoryTokenBuckets.try_acquire",
+        "routers.ideas._validate_idea_input",
+    }
+    for stats in run["functions"].values():
+        assert 0 < stats["min_us"] <= stats["median_us"] <= stats["p95_us"]
+
+    overhead = report["overhead"]
+    assert len(overhead["functions"]) == 5
+    # Готовые запросы не добавляют записей в кэш компиляции после прогрева
+    assert overhead["compiled_cache_growth"] == 0
+
+    lines = compare(report, report)
+    assert len(lines) == 10 and all("(+0.0%)" in line for line in lines)
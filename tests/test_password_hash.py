@@ -27,3 +27,25 @@ def test_long_password_not_truncated(db_session):
 
     assert verify_password(password_long, user.hashed_password)
     assert not verify_password("p" * 119, user.hashed_password)
+
+
+def test_login_rehashes_when_argon2_params_change(client, db_session, monkeypatch):
+    from app.crud import crud_users
+
+    user_data = UserCreate(
+        username="carol", email="c@example.com", password="S3cureP@ss!"
+    )
+    user: User = create_user(db_session, user_data)
+    assert "m=262144" in user.hashed_password
+
+    # Новые параметры из окружения -> needs_update при следующем логине
+    monkeypatch.setattr(
+        crud_users, "_pwd_context", crud_users.build_pwd_context(1, 8192, 1)
+    )
+    r = client.post("/api/token", data={"username": "carol", "password": "S3cureP@ss!"})
+    assert r.status_code == 200
+
+    db_session.refresh(user)
+    assert "m=8192" in user.hashed_password
+    assert "t=1" in user.hashed_password
+    assert verify_password("S3cureP@ss!", user.hashed_password)
@@ -0,0 +1,67 @@
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import main as app_main
+from app import profiling
+
+
+def _profiled_app(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_SECRET", "s3cret")
+    profiling.profiles.clear()
+    test_app = FastAPI()
+
+    @test_app.get("/busy")
+    def busy():
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+        return {"ok": True}
+
+    test_app.middleware("http")(app_main.correlation_id_middleware)
+    app_main.install_profiling(test_app)
+    return TestClient(test_app)
+
+
+def test_profiling_not_installed_by_default(client):
+    assert all(
+        m.kwargs.get("dispatch") is not app_main.profiling_middleware
+        for m in app_main.app.user_middleware
+    )
+    r = client.get("/internal/profiles", headers={"X-Profile-Token": ""})
+    assert r.status_code == 404
+
+
+def test_profiled_request_serves_collapsed_stacks(monkeypatch):
+    client = _profiled_app(monkeypatch)
+    headers = {"X-Profile-Token": "s3cret", "X-Correlation-ID": "cid-1"}
+    r = client.get("/busy", headers=headers)
+    assert r.status_code == 200
+    assert r.headers["X-Profile"] == "/internal/profiles/cid-1"
+
+    r = client.get("/internal/profiles/cid-1", headers=headers)
+    assert r.status_code == 200
+    lines = r.text.splitlines()
+    assert lines
+    # "кадр;кадр;...;лист N" — sync-обработчик виден в стеке потока из пула
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    busy = sum(int(line.rsplit(" ", 1)[1]) for line in lines if ";busy (" in line)
+    assert busy >= 5
+
+    summaries = client.get("/internal/profiles", headers=headers).json()
+    assert summaries[0]["correlation_id"] == "cid-1"
+    assert summaries[0]["path"] == "/busy"
+    assert summaries[0]["samples"] > 0
+    assert "collapsed" not in summaries[0]
+
+    # Без секрета профиль не отдается
+    assert client.get("/internal/profiles/cid-1").status_code == 404
+
+
+def test_wrong_token_is_not_profiled(monkeypatch):
+    client = _profiled_app(monkeypatch)
+    r = client.get("/busy", headers={"X-Profile-Token": "wrong"})
+    assert r.status_code == 200
+    assert "X-Profile" not in r.headers
+    assert profiling.profiles.summaries() == []
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+
+from app import models
+from app.crud import crud_tokens, crud_users
+
+
+def _login(client):
+    r = client.post(
+        "/api/token", data={"username": "testuser", "password": "password123"}
+    )
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_refresh_rotates_without_password_check(client, test_user, monkeypatch):
+    tokens = _login(client)
+
+    def fail_verify(*args, **kwargs):
+        raise AssertionError("Argon2 on refresh path")
+
+    monkeypatch.setattr(crud_users, "verify_password", fail_verify)
+    r = client.post(
+        "/api/token/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert r.status_code == 200
+    body = r.json()
+    assert body["refresh_token"] != tokens["refresh_token"]
+
+    headers = {"Authorization": f"Bearer {body['access_token']}"}
+    assert client.get("/api/users/me", headers=headers).status_code == 200
+
+
+def test_refresh_token_stored_hashed(client, test_user, db_session):
+    tokens = _login(client)
+    stored = [t.token_hash for t in db_session.query(models.RefreshToken).all()]
+    assert stored and tokens["refresh_token"] not in stored
+
+
+def test_reuse_revokes_whole_family(client, test_user):
+    tokens = _login(client)
+    first = tokens["refresh_token"]
+    second = client.post("/api/token/refresh", json={"refresh_token": first}).json()
+
+    # Повторное использование уже обмененного токена
+    r = client.post("/api/token/refresh", json={"refresh_token": first})
+    assert r.status_code == 401
+    # Вся цепочка отозвана, включая свежий токен
+    r = client.post(
+        "/api/token/refresh", json={"refresh_token": second["refresh_token"]}
+    )
+    assert r.status_code == 401
+
+
+def test_revoke_tokens_invalidates_refresh(client, test_user, db_session):
+    tokens = _login(client)
+    user = crud_users.get_user_by_username(db_session, "testuser")
+    crud_users.revoke_tokens(db_session, user)
+
+    r = client.post(
+        "/api/token/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert r.status_code == 401
+
+
+def test_unknown_refresh_token(client):
+    r = client.post("/api/token/refresh", json={"refresh_token": "nope"})
+    assert r.status_code == 401
+    assert r.headers["content-type"].startswith("application/problem+json")
+
+
+def _token(db_session, user_id, name, family="f", used=False, revoked=False, days=1):
+    db_token = models.RefreshToken(
+        user_id=user_id,
+        token_hash=name,
+        family_id=family,
+        expires_at=datetime.utcnow() + timedelta(days=days),
+        used=used,
+        revoked=revoked,
+    )
+    db_session.add(db_token)
+    db_session.commit()
+    return db_token
+
+
+def test_prune_refresh_tokens(db_session, test_user):
+    uid = test_user["user_id"]
+    _token(db_session, uid, "expired", family="a", days=-1)
+    _token(db_session, uid, "revoked", family="b", revoked=True)
+    # Живая цепочка: использованный нужен для обнаружения повтора
+    _token(db_session, uid, "live-used", family="c", used=True)
+    _token(db_session, uid, "live", family="c")
+    # Цепочка без действующего токена
+    _token(db_session, uid, "dead-used", family="d", used=True)
+    _token(db_session, uid, "dead-expired", family="d", days=-1)
+
+    crud_tokens.prune_refresh_tokens(db_session, datetime.utcnow())
+    db_session.expire_all()
+    left = {t.token_hash for t in db_session.query(models.RefreshToken).all()}
+    assert left == {"live-used", "live"}
+
+
+def test_revoke_user_refresh_tokens_touches_only_active(db_session, test_user):
+    uid = test_user["user_id"]
+    active = _token(db_session, uid, "active")
+    expired = _token(db_session, uid, "expired", days=-1)
+
+    crud_tokens.revoke_user_refresh_tokens(db_session, uid)
+    db_session.expire_all()
+    assert active.revoked is True
+    assert expired.revoked is False
@@ -0,0 +1,122 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine, insert
+
+from app import database, models
+from app.routers import ideas as ideas_router
+
+
+def _replica(path, title):
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(models.Idea),
+            [{"id": 1, "title": title, "description": "d", "owner_id": 1}],
+        )
+    return engine
+
+
+@pytest.fixture
+def replica_set(tmp_path, monkeypatch):
+    engines = [
+        _replica(tmp_path / "a.db", "from replica A"),
+        _replica(tmp_path / "b.db", "from replica B"),
+    ]
+    rs = database.ReplicaSet(engines, eject_seconds=30, read_your_writes=5)
+    clock = {"now": time.monotonic(), "wall": time.time()}
+    rs._now = lambda: clock["now"]
+    rs._wall_now = lambda: clock["wall"]
+    rs.clock = clock
+    monkeypatch.setattr(database, "replicas", rs)
+    monkeypatch.setattr(ideas_router, "replicas", rs)
+    yield rs
+    for engine in engines:
+        engine.dispose()
+
+
+def _title(client, **kwargs):
+    r = client.get("/api/ideas/1", **kwargs)
+    return r.json()["title"] if r.status_code == 200 else r.status_code
+
+
+def test_reads_round_robin_over_replicas(client, replica_set):
+    titles = [_title(client) for _ in range(4)]
+    assert titles == ["from replica A", "from replica B"] * 2
+    assert [i["title"] for i in client.get("/api/ideas").json()] in (
+        ["from replica A"],
+        ["from replica B"],
+    )
+
+
+def test_unreachable_replica_is_ejected(client, replica_set, tmp_path):
+    # Реплика B недоступна: файл БД не открыть (каталога больше нет)
+    replica_set.engines[1].dispose()
+    (tmp_path / "b.db").rename(tmp_path / "b.db.bak")
+    (tmp_path / "b.db").mkdir()
+
+    # Подключение проверяется до обработчика: чтение уходит на живую реплику
+    results = [_title(client) for _ in range(4)]
+    assert results == ["from replica A"] * 4
+    assert replica_set.healthy() == [0]
+
+    replica_set.clock["now"] += 31
+    assert replica_set.healthy() == [0, 1]
+
+
+def test_query_error_does_not_eject_replica(client, replica_set):
+    # Соединение живо, ошибка в самом запросе (нет таблицы) — реплика остается
+    with replica_set.engines[1].begin() as conn:
+        conn.exec_driver_sql("DROP TABLE ideas")
+    assert _title(client) == "from replica A"
+    assert _title(client) == 500
+    assert replica_set.healthy() == [0, 1]
+
+
+def test_all_replicas_down_falls_back_to_primary(client, replica_set, auth_token):
+    client.post(
+        "/api/ideas",
+        json={"title": "On primary", "description": "d"},
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+    replica_set.eject(0)
+    replica_set.eject(1)
+    assert _title(client) == "On primary"
+
+
+def test_unreachable_replicas_fall_back_to_primary(client, replica_set, tmp_path):
+    for i, name in enumerate(("a.db", "b.db")):
+        replica_set.engines[i].dispose()
+        (tmp_path / name).rename(tmp_path / f"{name}.bak")
+        (tmp_path / name).mkdir()
+    assert _title(client) == 404  # на основной БД идеи нет, но ответ не 500
+    assert replica_set.healthy() == []
+
+
+def test_read_your_own_writes(client, replica_set, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    r = client.post(
+        "/api/ideas", json={"title": "My new idea", "description": "d"}, headers=headers
+    )
+    assert r.status_code == 201
+    mark = r.headers[database.READ_YOUR_WRITES_HEADER]
+    assert r.cookies[database.READ_YOUR_WRITES_COOKIE] == mark
+
+    # Автор с меткой (cookie клиента) сразу видит свою запись из основной БД
+    assert _title(client) == "My new idea"
+    client.cookies.clear()
+    assert _title(client) in ("from replica A", "from replica B")
+    # Метка заголовком — для клиентов без cookie; решение не зависит от процесса
+    other_worker = {database.READ_YOUR_WRITES_HEADER: mark}
+    assert _title(client, headers=other_worker) == "My new idea"
+
+    replica_set.clock["wall"] += 6
+    assert _title(client, headers=other_worker) in ("from replica A", "from replica B")
+
+
+def test_forged_write_mark_is_ignored(client, replica_set):
+    stamp = str(int(replica_set.clock["wall"] * 1000))
+    forged = {database.READ_YOUR_WRITES_HEADER: f"{stamp}.{'0' * 32}"}
+    assert _title(client, headers=forged) in ("from replica A", "from replica B")
+    assert not replica_set.wants_primary("garbage")
@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+
+from app.crud import crud_tokens
+from app.revocation import BloomFilter, RevocationList, revocation_list
+
+
+def _login(client):
+    r = client.post(
+        "/api/token", data={"username": "testuser", "password": "password123"}
+    )
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, fp_rate=0.01)
+    keys = [f"jti-{i}" for i in range(1000)]
+    for k in keys:
+        bloom.add(k)
+    assert all(k in bloom for k in keys)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300  # ~1% ожидаемо
+
+
+def test_logout_revokes_access_and_refresh(client, test_user):
+    tokens = _login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    r = client.post(
+        "/api/logout", json={"refresh_token": tokens["refresh_token"]}, headers=headers
+    )
+    assert r.status_code == 204
+
+    assert client.get("/api/users/me", headers=headers).status_code == 401
+    r = client.post(
+        "/api/token/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert r.status_code == 401
+
+
+def test_revoke_other_session_token(client, test_user):
+    first = _login(client)["access_token"]
+    second = _login(client)["access_token"]
+
+    r = client.post(
+        "/api/token/revoke",
+        json={"token": second},
+        headers={"Authorization": f"Bearer {first}"},
+    )
+    assert r.status_code == 204
+    assert (
+        client.get(
+            "/api/users/me", headers={"Authorization": f"Bearer {second}"}
+        ).status_code
+        == 401
+    )
+    assert (
+        client.get(
+            "/api/users/me", headers={"Authorization": f"Bearer {first}"}
+        ).status_code
+        == 200
+    )
+
+
+def test_not_revoked_token_skips_db(client, auth_token, monkeypatch):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    assert client.get("/api/users/me", headers=headers).status_code == 200
+
+    def fail_lookup(*args, **kwargs):
+        raise AssertionError("denylist queried on bloom miss")
+
+    monkeypatch.setattr(crud_tokens, "is_jti_revoked", fail_lookup)
+    assert client.get("/api/users/me", headers=headers).status_code == 200
+    assert revocation_list.bloom_negatives >= 1
+
+
+def test_sync_picks_up_other_workers_revocations(db_session, test_user, monkeypatch):
+    worker = RevocationList(capacity=100, fp_rate=0.01)
+    now = {"t": 1000.0}
+    monkeypatch.setattr(worker, "_now", lambda: now["t"])
+    worker.sync(db_session)
+    assert not worker.is_revoked(db_session, "jti-x")
+
+    # Другой воркер записал отзыв в таблицу
+    crud_tokens.revoke_jti(
+        db_session,
+        jti="jti-x",
+        user_id=test_user["user_id"],
+        expires_at=datetime.utcnow() + timedelta(minutes=5),
+    )
+    now["t"] += 60
+    assert worker.is_revoked(db_session, "jti-x")
+
+
+def test_sync_picks_up_lower_id_committed_late(db_session, test_user, monkeypatch):
+    from app import models
+
+    worker = RevocationList(capacity=100, fp_rate=0.01)
+    now = {"t": 1000.0}
+    monkeypatch.setattr(worker, "_now", lambda: now["t"])
+    expires_at = datetime.utcnow() + timedelta(minutes=5)
+    user_id = test_user["user_id"]
+    db_session.add(
+        models.RevokedToken(
+            id=10, jti="jti-late-b", user_id=user_id, expires_at=expires_at
+        )
+    )
+    db_session.commit()
+    worker.sync(db_session)
+    now["t"] += 60
+    worker.sync(db_session)
+    assert worker.is_revoked(db_session, "jti-late-b")
+
+    # Транзакция с меньшим id закоммитилась уже после синхронизации
+    db_session.add(
+        models.RevokedToken(
+            id=5, jti="jti-late-a", user_id=user_id, expires_at=expires_at
+        )
+    )
+    db_session.commit()
+    now["t"] += 60
+    assert worker.is_revoked(db_session, "jti-late-a")
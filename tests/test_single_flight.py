@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from app.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    calls = {"n": 0}
+
+    async def work():
+        calls["n"] += 1
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(3)))
+        assert results == ["done"] * 3
+        assert "k" not in flight
+
+    asyncio.run(run())
+    assert calls["n"] == 1
+
+
+def test_timed_out_caller_leaves_others_waiting():
+    async def work():
+        await asyncio.sleep(0.1)
+        return "done"
+
+    async def run():
+        flight = SingleFlight()
+
+        async def call(budget):
+            async with asyncio.timeout(budget):
+                return await flight.do("k", work)
+
+        results = await asyncio.gather(call(0.02), call(5), return_exceptions=True)
+        assert isinstance(results[0], TimeoutError)
+        assert results[1] == "done"
+
+    asyncio.run(run())
+
+
+def test_work_cancelled_when_nobody_waits():
+    state = {"cancelled": False}
+
+    async def work():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    async def run():
+        flight = SingleFlight()
+        task = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # Следующий вызов начинает работу заново, а не ждет отмененную
+        assert "k" not in flight
+        await asyncio.sleep(0)
+        assert state["cancelled"]
+
+    asyncio.run(run())
+
+
+def test_error_is_shared_by_all_callers():
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(
+            *(flight.do("k", work) for _ in range(2)), return_exceptions=True
+        )
+        assert all(isinstance(r, ValueError) for r in results)
+
+    asyncio.run(run())
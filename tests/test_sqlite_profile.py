@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import create_engine
+
+from app import database
+from scripts.sqlite_bench import PROFILES, run_profile
+
+
+def _pragmas(engine, *names):
+    with engine.connect() as conn:
+        return {n: conn.exec_driver_sql(f"PRAGMA {n}").scalar() for n in names}
+
+
+def test_sqlite_profile_applied_on_connect(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    assert database.install_sqlite_pragmas(engine) is True
+    assert _pragmas(
+        engine,
+        "journal_mode",
+        "synchronous",
+        "busy_timeout",
+        "cache_size",
+        "temp_store",
+        "mmap_size",
+    ) == {
+        "journal_mode": "wal",
+        "synchronous": 1,  # NORMAL
+        "busy_timeout": 5000,
+        "cache_size": -65536,
+        "temp_store": 2,  # MEMORY
+        "mmap_size": 256 * 1024 * 1024,
+    }
+    engine.dispose()
+
+
+def test_sqlite_profile_is_configurable(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    # Пустое значение — умолчание SQLite
+    database.install_sqlite_pragmas(
+        engine, {"journal_mode": "", "synchronous": "FULL", "busy_timeout": "250"}
+    )
+    assert _pragmas(engine, "journal_mode", "synchronous", "busy_timeout") == {
+        "journal_mode": "delete",
+        "synchronous": 2,
+        "busy_timeout": 250,
+    }
+    engine.dispose()
+
+
+def test_sqlite_profile_rejects_unsafe_values(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    with pytest.raises(ValueError):
+        database.install_sqlite_pragmas(engine, {"journal_mode": "WAL; DROP TABLE x"})
+
+
+def test_concurrency_benchmark_runs(tmp_path):
+    result = run_profile(
+        tmp_path / "bench.db",
+        PROFILES["tuned"],
+        readers=2,
+        writers=1,
+        duration=0.3,
+        ideas=10,
+        users=5,
+        votes=20,
+    )
+    assert result["journal_mode"] == "wal"
+    assert result["read"]["ops"] > 0 and result["write"]["ops"] > 0
+    assert result["read"]["errors"] == result["write"]["errors"] == 0
@@ -0,0 +1,50 @@
+from app.auth import Principal
+from app.crud import crud_users
+from app.token_cache import VerifiedTokenCache, token_cache
+
+
+def test_cached_token_skips_db_lookup(client, auth_token, monkeypatch):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    assert client.get("/api/users/me", headers=headers).status_code == 200
+
+    def fail_lookup(*args, **kwargs):
+        raise AssertionError("DB lookup on cache hit")
+
+    monkeypatch.setattr(crud_users, "get_user_by_username", fail_lookup)
+    monkeypatch.setattr(crud_users, "get_token_state", fail_lookup)
+    r = client.get("/api/users/me", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["username"] == "testuser"
+    assert token_cache.hits >= 1
+
+
+def test_deactivated_user_is_evicted(client, auth_token, db_session):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    assert client.get("/api/users/me", headers=headers).status_code == 200
+    assert len(token_cache) == 1
+
+    user = crud_users.get_user_by_username(db_session, "testuser")
+    crud_users.deactivate_user(db_session, user)
+    assert len(token_cache) == 0
+
+    assert client.get("/api/users/me", headers=headers).status_code == 401
+
+
+def test_entry_expires_with_token(monkeypatch):
+    cache = VerifiedTokenCache(maxsize=10, ttl=60)
+    now = {"t": 1000.0}
+    monkeypatch.setattr(cache, "_now", lambda: now["t"])
+
+    cache.put("tok", Principal(1, "u", 0), token_exp=1005)
+    assert cache.get("tok") is not None
+    now["t"] = 1005.0
+    assert cache.get("tok") is None
+
+
+def test_cache_is_bounded():
+    cache = VerifiedTokenCache(maxsize=2, ttl=60)
+    for i in range(3):
+        cache.put(f"t{i}", Principal(i, f"u{i}", 0), token_exp=None)
+    assert len(cache) == 2
+    assert cache.get("t0") is None
+    assert cache.get("t2").id == 2
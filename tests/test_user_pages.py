@@ -0,0 +1,80 @@
+from app.crud.crud_users import create_user
+from app.schemas import UserCreate
+
+
+def _auth(client, username):
+    r = client.post("/api/token", data={"username": username, "password": "pass12345"})
+    assert r.status_code == 200
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def _setup(client, db_session, ideas=5):
+    for name in ("alice", "bob"):
+        create_user(
+            db_session,
+            UserCreate(
+                username=name, email=f"{name}@example.com", password="pass12345"
+            ),
+        )
+    alice, bob = _auth(client, "alice"), _auth(client, "bob")
+    for i in range(ideas):
+        client.post(
+            "/api/ideas",
+            json={"title": f"Alice {i}", "description": "d"},
+            headers=alice,
+        )
+    client.post(
+        "/api/ideas", json={"title": "Bob idea", "description": "d"}, headers=bob
+    )
+    return alice, bob
+
+
+def test_my_ideas_keyset_pagination(client, db_session, assert_queries):
+    alice, bob = _setup(client, db_session)
+    r = client.get("/api/users/me/ideas", params={"limit": 2}, headers=alice)
+    assert r.status_code == 200
+    assert_queries(r, 1)
+    page = r.json()
+    assert [i["title"] for i in page["items"]] == ["Alice 4", "Alice 3"]
+
+    titles = [i["title"] for i in page["items"]]
+    while page["next_cursor"] is not None:
+        page = client.get(
+            "/api/users/me/ideas",
+            params={"limit": 2, "cursor": page["next_cursor"]},
+            headers=alice,
+        ).json()
+        titles += [i["title"] for i in page["items"]]
+    assert titles == [f"Alice {i}" for i in range(4, -1, -1)]
+
+    page = client.get("/api/users/me/ideas", headers=bob).json()
+    assert [i["title"] for i in page["items"]] == ["Bob idea"]
+    assert page["next_cursor"] is None
+
+
+def test_my_votes_include_idea_title(client, db_session, assert_queries):
+    alice, bob = _setup(client, db_session, ideas=3)
+    for idea_id, value in ((1, "за"), (2, "против"), (3, "воздержаться")):
+        client.post(f"/api/ideas/{idea_id}/vote", json={"value": value}, headers=bob)
+
+    r = client.get("/api/users/me/votes", params={"limit": 2}, headers=bob)
+    assert_queries(r, 1)
+    page = r.json()
+    assert [(v["idea_id"], v["value"], v["idea_title"]) for v in page["items"]] == [
+        (3, "воздержаться", "Alice 2"),
+        (2, "против", "Alice 1"),
+    ]
+    page = client.get(
+        "/api/users/me/votes",
+        params={"cursor": page["next_cursor"]},
+        headers=bob,
+    ).json()
+    assert [v["idea_id"] for v in page["items"]] == [1]
+    assert page["next_cursor"] is None
+
+    assert client.get("/api/users/me/votes", headers=alice).json()["items"] == []
+
+
+def test_my_pages_require_auth(client):
+    assert client.get("/api/users/me/ideas").status_code == 401
+    assert client.get("/api/users/me/votes").status_code == 401
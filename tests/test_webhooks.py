@@ -0,0 +1,274 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import webhooks
+from app.dns_cache import CachingResolver
+from app.http_client import SafeHttpClient, build_async_client
+from app.webhooks import Subscription, WebhookDispatcher, sign
+
+
+class Receiver:
+    """Локальный приемник вебхуков: запоминает запросы, может отвечать ошибками"""
+
+    def __init__(self, fail_first: int = 0):
+        self.deliveries = []
+        self.fail_first = fail_first
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                if receiver.fail_first > 0:
+                    receiver.fail_first -= 1
+                    self.send_response(503)
+                else:
+                    receiver.deliveries.append((dict(self.headers), body))
+                    self.send_response(204)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def events(self):
+        return [e for _, body in self.deliveries for e in json.loads(body)["events"]]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def receiver():
+    r = Receiver()
+    yield r
+    r.close()
+
+
+def _dispatcher(subs, **kwargs):
+    async def load():
+        return subs
+
+    kwargs.setdefault("linger", 0.05)
+    # Приемник в тестах слушает 127.0.0.1
+    kwargs.setdefault("allow_private_targets", True)
+    kwargs.setdefault("client", SafeHttpClient())
+    return WebhookDispatcher(load_subscriptions=load, **kwargs)
+
+
+async def _wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+
+def test_batches_coalesces_and_signs(receiver):
+    sub = Subscription(1, receiver.url, "s3cret", "*")
+    dispatcher = _dispatcher([sub], batch_size=10)
+
+    async def run():
+        await dispatcher.start()
+        dispatcher.publish("idea.created", {"idea_id": 1}, key=("c", 1))
+        for value in ("за", "против", "за"):
+            dispatcher.publish(
+                "idea.voted", {"idea_id": 1, "value": value}, key=("v", 1, 7)
+            )
+        await _wait_for(lambda: receiver.deliveries)
+        await dispatcher.stop()
+
+    asyncio.run(run())
+    assert len(receiver.deliveries) == 1  # одна доставка на батч
+    headers, body = receiver.deliveries[0]
+    assert headers[webhooks.SIGNATURE_HEADER] == sign(
+        "s3cret", headers[webhooks.TIMESTAMP_HEADER], body
+    )
+    events = receiver.events()
+    assert [e["type"] for e in events] == ["idea.created", "idea.voted"]
+    assert events[1]["data"]["value"] == "за" and events[1]["coalesced"] == 3
+    stats = dispatcher.stats()
+    assert stats["coalesced"] == 2 and stats["delivered_events"] == 2
+    assert stats["queue_depth"] == 0
+    assert stats["latency_ms"]["max"] > 0
+
+
+def test_batch_size_and_event_filter(receiver):
+    subs = [
+        Subscription(1, receiver.url, "a", "idea.created"),
+        Subscription(2, receiver.url, "b", "idea.deleted"),
+    ]
+    dispatcher = _dispatcher(subs, batch_size=2, linger=5)
+
+    async def run():
+        await dispatcher.start()
+        for i in range(4):
+            dispatcher.publish("idea.created", {"idea_id": i})
+        # Полные батчи уходят сразу, не дожидаясь linger
+        await _wait_for(lambda: len(receiver.deliveries) == 2)
+        await dispatcher.stop()
+
+    asyncio.run(run())
+    assert [len(json.loads(b)["events"]) for _, b in receiver.deliveries] == [2, 2]
+    assert {json.loads(b)["subscription_id"] for _, b in receiver.deliveries} == {1}
+
+
+def test_delivery_retries_on_5xx(monkeypatch):
+    monkeypatch.setattr("app.http_client._BACKOFF_BASE", 0.01, raising=True)
+    receiver = Receiver(fail_first=2)
+    dispatcher = _dispatcher([Subscription(1, receiver.url, "k", "*")])
+
+    async def run():
+        await dispatcher.start()
+        dispatcher.publish("idea.deleted", {"idea_id": 5})
+        await _wait_for(lambda: receiver.deliveries)
+        await dispatcher.stop()
+
+    try:
+        asyncio.run(run())
+    finally:
+        receiver.close()
+    assert len(receiver.deliveries) == 1
+    assert dispatcher.stats()["failed_batches"] == 0
+
+
+def test_publish_never_blocks():
+    dispatcher = _dispatcher([], queue_max=2)
+    # Не запущен — событие отбрасывается, исключений нет
+    dispatcher.publish("idea.created", {"idea_id": 1})
+    assert dispatcher.stats()["dropped"] == 1
+
+    async def run():
+        await dispatcher.start()
+        for i in range(5):
+            dispatcher.publish("idea.created", {"idea_id": i})
+        # Очередь ограничена: лишнее отбрасывается, а не ждет
+        stats = dispatcher.stats()
+        await dispatcher.stop()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["published"] == 2
+    assert stats["dropped"] == 4
+
+
+def test_api_subscription_receives_idea_events(
+    client, db_session, auth_token, receiver, monkeypatch
+):
+    # Диспетчер читает подписки своей сессией — из той же тестовой БД
+    monkeypatch.setattr(
+        webhooks.dispatcher, "session_factory", sessionmaker(bind=db_session.get_bind())
+    )
+    monkeypatch.setattr(webhooks.dispatcher, "linger", 0.05)
+    monkeypatch.setattr(webhooks.dispatcher, "allow_private_targets", True)
+    monkeypatch.setattr(webhooks, "WEBHOOK_ALLOW_PRIVATE_TARGETS", True)
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    r = client.post(
+        "/api/webhooks",
+        json={"url": receiver.url, "events": ["idea.created", "idea.voted"]},
+        headers=headers,
+    )
+    assert r.status_code == 201
+    assert r.json()["secret"]
+    sub_id = r.json()["id"]
+
+    idea = client.post(
+        "/api/ideas",
+        json={"title": "Webhook idea", "description": "d"},
+        headers=headers,
+    ).json()
+    client.post(f"/api/ideas/{idea['id']}/vote", json={"value": "за"}, headers=headers)
+
+    deadline = time.monotonic() + 3
+    while len(receiver.events()) < 2 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert {e["type"] for e in receiver.events()} == {"idea.created", "idea.voted"}
+    voted = next(e for e in receiver.events() if e["type"] == "idea.voted")
+    assert voted["data"] == {"idea_id": idea["id"], "value": "за"}
+
+    listed = client.get("/api/webhooks", headers=headers).json()
+    assert [w["id"] for w in listed] == [sub_id] and "secret" not in listed[0]
+    assert client.get("/api/webhooks/stats").status_code == 401
+    stats = client.get("/api/webhooks/stats", headers=headers).json()
+    assert stats["delivered_events"] >= 2
+    assert client.delete(f"/api/webhooks/{sub_id}", headers=headers).status_code == 204
+
+
+def test_api_rejects_bad_subscription(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    for payload in (
+        {"url": "ftp://example.test/"},
+        {"url": "https://example.test/", "events": ["idea.unknown"]},
+        # Loopback, частные сети, link-local (метаданные облака)
+        {"url": "http://127.0.0.1:8000/hook"},
+        {"url": "http://localhost/hook"},
+        {"url": "http://[::1]/hook"},
+        {"url": "http://10.0.0.5/hook"},
+        {"url": "http://169.254.169.254/latest/meta-data/"},
+    ):
+        r = client.post("/api/webhooks", json=payload, headers=headers)
+        assert r.status_code == 422
+
+
+def test_check_target_rejects_non_public_addresses():
+    for address in ("127.0.0.1", "10.1.2.3", "192.168.0.1", "169.254.169.254", "::1"):
+        assert not webhooks.is_public_address(address)
+    assert not webhooks.is_public_address("::ffff:127.0.0.1")
+    assert webhooks.is_public_address("93.184.216.34")
+    with pytest.raises(ValueError):
+        webhooks.check_target("http://127.0.0.1/hook")
+
+
+def test_delivery_to_private_address_is_refused(receiver):
+    # Собственный клиент диспетчера проверяет адрес при подключении
+    dispatcher = _dispatcher(
+        [Subscription(1, receiver.url, "k", "*")],
+        allow_private_targets=False,
+        client=None,
+    )
+
+    async def run():
+        await dispatcher.start()
+        dispatcher.publish("idea.created", {"idea_id": 1})
+        await _wait_for(lambda: dispatcher.failed_batches == 1)
+        await dispatcher.stop()
+
+    asyncio.run(run())
+    assert receiver.deliveries == []
+
+
+def test_rebound_hostname_is_refused_at_connect_time(receiver):
+    # Имя прошло проверку при подписке, а к доставке резолвится в loopback
+    port = receiver.url.split(":")[2].split("/")[0]
+
+    async def rebound(host, port):
+        return ["127.0.0.1"]
+
+    resolver = CachingResolver(rebound)
+    http = SafeHttpClient(
+        client=build_async_client(
+            resolver=resolver, address_filter=webhooks.is_public_address
+        )
+    )
+
+    async def run():
+        try:
+            with pytest.raises(httpx.ConnectError):
+                await http.request(
+                    "POST", f"http://hooks.test:{port}/hook", content=b"{}"
+                )
+        finally:
+            await http.aclose()
+
+    asyncio.run(run())
+    assert receiver.deliveries == []